@@ -1,32 +1,22 @@
-from flask import Flask, g
-from flask_cors import CORS
+import atexit
+import os
 
+from flask import Flask, g, jsonify, request
+
+from lib.cache import ResponseCache
+from lib.cors import AllowedOrigins
 from lib.db import Db
+from lib.ingest import ReviewWriter
+from lib.learners import READ_METHODS, InvalidLearner, Learners, TooManyLearners
+from lib.metrics import RequestMetrics
+from lib.vocabulary import VocabularyIndex
 
 import routes.words
 import routes.groups
 import routes.study_sessions
 import routes.dashboard
 import routes.study_activities
-
-def get_allowed_origins(app):
-    try:
-        cursor = app.db.cursor()
-        cursor.execute('SELECT url FROM study_activities')
-        urls = cursor.fetchall()
-        # Convert URLs to origins (e.g., https://example.com/app -> https://example.com)
-        origins = set()
-        for url in urls:
-            try:
-                from urllib.parse import urlparse
-                parsed = urlparse(url['url'])
-                origin = f"{parsed.scheme}://{parsed.netloc}"
-                origins.add(origin)
-            except:
-                continue
-        return list(origins) if origins else ["*"]
-    except:
-        return ["*"]  # Fallback to allow all origins if there's an error
+import routes.metrics
 
 def create_app(test_config=None):
     app = Flask(__name__)
@@ -35,32 +25,124 @@ def create_app(test_config=None):
         app.config.from_mapping(
             DATABASE='words.db'
         )
+        # Any config key can be set from the environment with a FLASK_ prefix,
+        # e.g. FLASK_STUDY_TIMEZONE=Europe/Madrid or FLASK_LEARNER_SHARDING=true
+        # (values are parsed as JSON where they can be)
+        app.config.from_prefixed_env()
     else:
         app.config.update(test_config)
     
     # Initialize database first since we need it for CORS configuration
-    app.db = Db(database=app.config['DATABASE'])
+    app.db = Db(
+        database=app.config['DATABASE'],
+        pool_size=app.config.get('DB_POOL_SIZE', 8),
+        pragmas=app.config.get('DB_PRAGMAS'),
+        timezone=app.config.get('STUDY_TIMEZONE', 'UTC'),
+        write_retries=app.config.get('DB_WRITE_RETRIES', 3)
+    )
     
-    # Get allowed origins from study_activities table
-    allowed_origins = get_allowed_origins(app)
+    # Each learner's study history in a database file of their own, with the
+    # shared vocabulary attached read-only (see lib/learners.py)
+    app.learners = None
+    if app.config.get('LEARNER_SHARDING', False):
+        app.learners = Learners(
+            app.db,
+            directory=app.config.get('LEARNER_DB_DIR') or os.path.join(os.path.dirname(os.path.abspath(app.db.database)), 'learners'),
+            header=app.config.get('LEARNER_HEADER', 'X-Learner-Id'),
+            max_open=app.config.get('LEARNER_DB_MAX_OPEN', 64),
+            max_files=app.config.get('LEARNER_DB_MAX_FILES', 10000),
+            pool_size=app.config.get('LEARNER_DB_POOL_SIZE', 2),
+            pragmas=app.config.get('DB_PRAGMAS'),
+            logger=app.logger
+        )
     
-    # In development, add localhost to allowed origins
-    if app.debug:
-        allowed_origins.extend(["http://localhost:8080", "http://127.0.0.1:8080"])
+    # Cache for read endpoints, invalidated by the write handlers
+    app.cache = ResponseCache(
+        max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024),
+        ttl=app.config.get('RESPONSE_CACHE_TTL', 60),
+        enabled=app.config.get('RESPONSE_CACHE_ENABLED', True),
+        # Learners share URLs, so their cached responses are told apart by header
+        vary_headers=(app.learners.header,) if app.learners is not None else ()
+    )
     
-    # Configure CORS with combined origins
-    CORS(app, resources={
-        r"/*": {
-            "origins": allowed_origins,
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
-        }
-    })
+    # Optional in-memory copy of the vocabulary for the word listings, built on
+    # first use; over VOCABULARY_INDEX_MAX_BYTES the routes keep using SQLite
+    app.vocabulary = None
+    if app.config.get('VOCABULARY_INDEX_ENABLED', False):
+        app.vocabulary = VocabularyIndex(
+            app.db,
+            app.cache,
+            max_bytes=app.config.get('VOCABULARY_INDEX_MAX_BYTES', 256 * 1024 * 1024),
+            ttl=app.config.get('VOCABULARY_INDEX_TTL', 60)
+        )
+    
+    # Review batches are written inline ('sync') or queued for a group-committing
+    # writer thread, acknowledged once queued ('async') or once committed ('durable').
+    # The writer thread serves the shared database only; learner databases
+    # have a write lock each and are written inline.
+    app.review_writer = None
+    ingest_mode = app.config.get('REVIEW_INGEST_MODE', 'sync')
+    if ingest_mode != 'sync' and app.learners is None:
+        app.review_writer = ReviewWriter(
+            app.db,
+            app.cache,
+            mode=ingest_mode,
+            max_queue=app.config.get('REVIEW_INGEST_QUEUE_SIZE', 1000),
+            max_batches_per_commit=app.config.get('REVIEW_INGEST_MAX_BATCHES_PER_COMMIT', 256),
+            enqueue_timeout=app.config.get('REVIEW_INGEST_ENQUEUE_TIMEOUT', 0.5),
+            commit_timeout=app.config.get('REVIEW_INGEST_COMMIT_TIMEOUT', 10.0),
+            vocabulary=app.vocabulary
+        )
+        # Flush queued batches on shutdown
+        atexit.register(app.review_writer.close)
+    
+    # Per-route latency and SQL histograms served at /metrics
+    app.metrics = RequestMetrics(
+        slow_request_threshold=app.config.get('SLOW_REQUEST_THRESHOLD', 0.5),
+        logger=app.logger
+    )
+    
+    # Origins of the study activities, looked up on the first cross-origin
+    # request rather than here, so creating the app never touches the database
+    app.allowed_origins = AllowedOrigins(
+        app.db,
+        app.cache,
+        ttl=app.config.get('CORS_ORIGINS_TTL', 60),
+        # In development, also allow the local frontend
+        extra=["http://localhost:8080", "http://127.0.0.1:8080"] if app.debug else ()
+    )
+    app.after_request(app.allowed_origins.apply)
+
+    @app.before_request
+    def start_request_metrics():
+        app.metrics.start_request()
+
+    if app.learners is not None:
+        @app.before_request
+        def identify_learner():
+            try:
+                g.learner_id = app.learners.learner_id()
+                # Only writes create a learner's file; refuse them past the cap
+                if request.method not in READ_METHODS:
+                    app.learners.check_limit(g.learner_id)
+            except InvalidLearner as e:
+                return jsonify({"error": str(e)}), 400
+            except TooManyLearners as e:
+                return jsonify({"error": str(e)}), 403
+
+    # Streamed bodies run after this, so their statements are not counted
+    @app.after_request
+    def finish_request_metrics(response):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        app.metrics.finish_request(request.method, route, response.status_code)
+        return response
 
-    # Close database connection
+    # Return the database connection to the pool
     @app.teardown_appcontext
     def close_db(exception):
         app.db.close()
+        if app.learners is not None:
+            app.learners.close()
 
     # load routes -----------
     routes.words.load(app)
@@ -68,10 +150,17 @@ def create_app(test_config=None):
     routes.study_sessions.load(app)
     routes.dashboard.load(app)
     routes.study_activities.load(app)
+    routes.metrics.load(app)
     
     return app
 
-app = create_app()
+# `app` is created on first access (e.g. by a WSGI server loading app:app),
+# so importing this module for create_app() does not build a second app
+def __getattr__(name):
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""Review write throughput with one shared database vs one database per learner.
+
+Several worker processes, one learner each, submit small review batches
+through their own app at the same time, like the workers of a WSGI server.
+With a shared database they take turns on its write lock; with
+LEARNER_SHARDING each learner commits to their own file. Prints reviews/second
+for both layouts.
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+
+def app_config(directory, sharding):
+  config = {
+    'TESTING': True,
+    'DATABASE': os.path.join(directory, 'words.db'),
+    'RESPONSE_CACHE_ENABLED': False,
+    'SLOW_REQUEST_THRESHOLD': None,
+    # Every commit reaches the disk, as it would for durable review writes
+    'DB_PRAGMAS': {'synchronous': 'FULL'},
+  }
+  if sharding:
+    config.update(LEARNER_SHARDING=True, LEARNER_DB_DIR=os.path.join(directory, 'learners'))
+  return config
+
+def submit_batches(config, learner_id, word_ids, batches, batch_size, start):
+  app = create_app(config)
+  client = app.test_client()
+  headers = {'X-Learner-Id': learner_id}
+  response = client.post('/api/study_sessions', json={'group_id': 1, 'study_activity_id': 1}, headers=headers)
+  session_id = response.get_json()['study_session']['id']
+  start.wait()
+  for _ in range(batches):
+    reviews = [{'word_id': random.choice(word_ids), 'is_correct': random.random() < 0.7} for _ in range(batch_size)]
+    response = client.post(f'/api/study_sessions/{session_id}/review', json={'reviews': reviews}, headers=headers)
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+def run_layout(sharding, learners, batches, batch_size):
+  directory = tempfile.mkdtemp()
+  try:
+    config = app_config(directory, sharding)
+    app = create_app(config)
+    app.db.init(app)
+    with app.app_context():
+      cursor = app.db.cursor()
+      cursor.execute('SELECT id FROM words')
+      word_ids = [row['id'] for row in cursor.fetchall()]
+    app.db.close_all()
+
+    context = multiprocessing.get_context('spawn')
+    start = context.Barrier(learners + 1)
+    workers = [
+      context.Process(target=submit_batches, args=(config, f'learner-{i}', word_ids, batches, batch_size, start))
+      for i in range(learners)
+    ]
+    for worker in workers:
+      worker.start()
+    # Time the reviews only, not the workers' imports and app setup
+    start.wait()
+    started = time.perf_counter()
+    for worker in workers:
+      worker.join()
+    elapsed = time.perf_counter() - started
+    assert all(worker.exitcode == 0 for worker in workers), 'a worker failed'
+
+    reviews = learners * batches * batch_size
+    return {
+      'layout': 'per-learner' if sharding else 'shared',
+      'learners': learners,
+      'seconds': round(elapsed, 4),
+      'reviews_per_second': round(reviews / elapsed)
+    }
+  finally:
+    shutil.rmtree(directory, ignore_errors=True)
+
+def run(learners=8, batches=100, batch_size=10):
+  return [run_layout(sharding, learners, batches, batch_size) for sharding in (False, True)]
+
+def main(learners=8, batches=100):
+  for result in run(learners, batches):
+    print(f"{result['layout']:>12}  {result['learners']} learners  {result['reviews_per_second']:>10,} reviews/s  ({result['seconds']:.2f}s)")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,81 @@
+"""GET /groups/<id>/words/raw: spliced words.raw_json against decoding parts per row.
+
+The legacy path is what the endpoint did before migration 0012: fetch every
+column, json.loads the parts of each word and jsonify the whole list. The
+spliced path joins the pre-serialized rows. Both run on the largest group of a
+generated database, whose migrations are brought up to date first.
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import jsonify
+
+from app import create_app
+from benchmarks import generate
+from migrate import run_migrations
+
+def legacy_body(cursor, group_id):
+  cursor.execute('''
+    SELECT w.* FROM words w JOIN word_groups wg ON w.id = wg.word_id WHERE wg.group_id = ?
+  ''', (group_id,))
+  return jsonify({'words': [{
+    'id': word['id'],
+    'spanish': word['spanish'],
+    'pronunciation': word['pronunciation'],
+    'english': word['english'],
+    'parts': json.loads(word['parts'])
+  } for word in cursor.fetchall()]}).get_data()
+
+def spliced_body(cursor, group_id):
+  cursor.execute('''
+    SELECT w.raw_json FROM words w JOIN word_groups wg ON w.id = wg.word_id WHERE wg.group_id = ?
+  ''', (group_id,))
+  return ('{"words":[' + ','.join(word[0] for word in cursor.fetchall()) + ']}').encode('utf-8')
+
+def best_of(function, iterations):
+  timings = []
+  for _ in range(iterations):
+    started = time.perf_counter()
+    function()
+    timings.append(time.perf_counter() - started)
+  return min(timings)
+
+def run(path, iterations=10):
+  run_migrations(path)
+  conn = sqlite3.connect(path)
+  group_id, words = conn.execute('SELECT id, words_count FROM groups ORDER BY words_count DESC LIMIT 1').fetchone()
+  conn.close()
+
+  app = create_app({'DATABASE': path, 'RESPONSE_CACHE_ENABLED': False})
+  client = app.test_client()
+  with app.app_context():
+    cursor = app.db.read_cursor()
+    # Same words either way, whatever the key order and spacing
+    assert json.loads(legacy_body(cursor, group_id)) == json.loads(spliced_body(cursor, group_id))
+    legacy = best_of(lambda: legacy_body(cursor, group_id), iterations)
+    spliced = best_of(lambda: spliced_body(cursor, group_id), iterations)
+  route = best_of(lambda: client.get(f'/groups/{group_id}/words/raw').get_data(), iterations)
+  app.db.close_all()
+
+  return {
+    'group_id': group_id,
+    'words': words,
+    'legacy_ms': round(legacy * 1000, 2),
+    'spliced_ms': round(spliced * 1000, 2),
+    'speedup': round(legacy / spliced, 1) if spliced else None,
+    'route_ms': round(route * 1000, 2),
+  }
+
+def main(scale='small', path=None, iterations=10):
+  path = path or generate.database_path(scale)
+  if not os.path.exists(path):
+    generate.main(scale, path)
+  print(json.dumps(run(path, iterations), indent=2))
+
+if __name__ == '__main__':
+  main(*sys.argv[1:2])
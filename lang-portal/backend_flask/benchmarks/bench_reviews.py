@@ -0,0 +1,69 @@
+"""Throughput of POST /api/study_sessions/<id>/review at several batch sizes.
+
+Runs against a freshly seeded temporary database through the Flask test
+client and prints reviews/second for each batch size.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+
+BATCH_SIZES = (10, 1000, 100000)
+
+def seeded_app(db_path):
+  app = create_app({'TESTING': True, 'DATABASE': db_path})
+  app.db.init(app)
+  return app
+
+def run(batch_sizes=BATCH_SIZES, repeat=3):
+  db_fd, db_path = tempfile.mkstemp(suffix='.db')
+  os.close(db_fd)
+  try:
+    app = seeded_app(db_path)
+    client = app.test_client()
+
+    with app.app_context():
+      cursor = app.db.cursor()
+      cursor.execute('SELECT id FROM words')
+      word_ids = [row['id'] for row in cursor.fetchall()]
+
+    response = client.post('/api/study_sessions', json={'group_id': 1, 'study_activity_id': 1})
+    session_id = response.get_json()['study_session']['id']
+
+    results = []
+    for batch_size in batch_sizes:
+      payload = json.dumps({'reviews': [
+        {'word_id': random.choice(word_ids), 'is_correct': random.random() < 0.7}
+        for _ in range(batch_size)
+      ]})
+      timings = []
+      for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.post(f'/api/study_sessions/{session_id}/review',
+                               data=payload, content_type='application/json')
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 201, response.get_data(as_text=True)
+      best = min(timings)
+      results.append({
+        'batch_size': batch_size,
+        'best_seconds': round(best, 6),
+        'reviews_per_second': round(batch_size / best)
+      })
+    return results
+  finally:
+    for suffix in ('', '-wal', '-shm'):
+      if os.path.exists(db_path + suffix):
+        os.unlink(db_path + suffix)
+
+def main():
+  for result in run():
+    print(f"{result['batch_size']:>8} reviews/batch  {result['reviews_per_second']:>10,} reviews/s  ({result['best_seconds']:.4f}s)")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,247 @@
+"""Latency, query count and memory of every route against a generated database.
+
+Each route is driven through the Flask test client, against a scratch copy
+of the database so the write routes leave the original as it was and runs
+stay comparable. Memory is the process's peak RSS for the whole run, plus
+the peak Python allocation of one request per route. The report is JSON, so a run can be saved and diffed
+against a baseline:
+
+  uv run -m invoke bench-routes --scale small --output baseline.json
+  uv run -m invoke bench-routes --scale small --baseline baseline.json
+"""
+import contextlib
+import json
+import os
+import platform
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import g
+
+from app import create_app
+from benchmarks import generate
+from migrate import run_migrations
+
+# Routes that are not benchmarked, with the reason
+SKIPPED = {
+  'reset_study_sessions': 'destructive: deletes the whole study history',
+}
+
+# A route regresses when its p95 grows by more than this factor
+REGRESSION_TOLERANCE = 1.25
+
+def route_requests(counts):
+  """One (name, method, path, options) per request, covering every route."""
+  word_id = counts['words'] // 2
+  group_id = counts['groups'] // 2
+  session_id = counts['sessions'] // 2
+  last_page = (counts['words'] + 49) // 50
+  reviews = {'reviews': [{'word_id': word_id + i, 'is_correct': i % 3 != 0} for i in range(20)]}
+  # Words 1..5000 (or all of them), added to and then removed from one group
+  member_ids = list(range(1, min(counts['words'], 5000) + 1))
+  return [
+    ('words', 'GET', '/words', {}),
+    ('words_last_page', 'GET', '/words', {'query_string': {'page': last_page}}),
+    ('words_by_wrong_count', 'GET', '/words', {'query_string': {'sort_by': 'wrong_count', 'order': 'desc'}}),
+    ('words_cursor', 'GET', '/words', {'query_string': {'cursor': ''}}),
+    ('words_search', 'GET', '/words/search', {'query_string': {'q': f'palabra{word_id // 10}'}}),
+    ('word', 'GET', f'/words/{word_id}', {}),
+    ('groups', 'GET', '/groups', {}),
+    ('group', 'GET', f'/groups/{group_id}', {}),
+    ('group_words', 'GET', f'/groups/{group_id}/words', {}),
+    ('group_words_raw', 'GET', f'/groups/{group_id}/words/raw', {}),
+    ('group_words_add', 'POST', f'/groups/{group_id}/words', {'json': {'word_ids': member_ids}}),
+    ('group_words_remove', 'DELETE', f'/groups/{group_id}/words',
+     {'data': '\n'.join(map(str, member_ids)), 'content_type': 'text/plain'}),
+    ('group_study_sessions', 'GET', f'/groups/{group_id}/study_sessions',
+     {'query_string': {'sort_by': 'reviewItemsCount'}}),
+    ('study_activities', 'GET', '/api/study_activities', {}),
+    ('study_activity', 'GET', '/api/study_activities/1', {}),
+    ('study_activity_sessions', 'GET', '/api/study_activities/1/sessions', {}),
+    ('study_activity_launch', 'GET', '/api/study_activities/1/launch', {}),
+    ('study_sessions', 'GET', '/api/study_sessions', {}),
+    ('study_session', 'GET', f'/api/study_sessions/{session_id}', {}),
+    ('next_words', 'GET', f'/api/study_sessions/{session_id}/next_words', {}),
+    ('create_study_session', 'POST', '/api/study_sessions',
+     {'json': {'group_id': group_id, 'study_activity_id': 1}}),
+    ('submit_reviews', 'POST', f'/api/study_sessions/{session_id}/review', {'json': reviews}),
+    ('end_study_session', 'POST', f'/api/study_sessions/{session_id}/end', {}),
+    ('dashboard_recent_session', 'GET', '/dashboard/recent_session', {}),
+    ('dashboard_stats', 'GET', '/dashboard/stats', {}),
+    ('metrics', 'GET', '/metrics', {}),
+  ]
+
+def percentile(sorted_values, fraction):
+  # Nearest-rank percentile
+  index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+  return sorted_values[index]
+
+def peak_rss_kb():
+  # The process's high-water mark so far, so it is reported for the whole
+  # run only. ru_maxrss is in kilobytes on Linux and bytes on macOS
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return peak // 1024 if sys.platform == 'darwin' else peak
+
+def peak_alloc_kb(client, method, url, options):
+  """Peak Python memory allocated while serving one request, in KiB.
+
+  Measured on a request of its own, since tracing slows the timed ones.
+  SQLite's page cache is allocated outside Python and not included.
+  """
+  tracemalloc.start()
+  try:
+    client.open(url, method=method, **options).get_data()
+    return tracemalloc.get_traced_memory()[1] // 1024
+  finally:
+    tracemalloc.stop()
+
+def table_counts(path):
+  conn = sqlite3.connect(path)
+  try:
+    return {
+      table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+      for table in ('words', 'groups', 'word_groups', 'study_sessions', 'word_review_items')
+    }
+  finally:
+    conn.close()
+
+def instrument(app, statements):
+  """Collect the number of SQL statements each request runs (trigger bodies excluded)."""
+  # From the request's QueryStats (lib/metrics.py), so GET requests keep to
+  # the read-only pool instead of borrowing the writer to trace it. As on
+  # /metrics, statements run while a streamed body is sent are not counted.
+  @app.after_request
+  def count_queries(response):
+    stats = g.get('query_stats')
+    statements.append(stats.statements if stats is not None else 0)
+    return response
+
+def scratch_copy(path):
+  """Copy the database next to it with SQLite's backup API (WAL contents
+  included) and bring the copy up to the latest migration."""
+  fd, copy = tempfile.mkstemp(prefix='bench-routes-', suffix='.db', dir=os.path.dirname(os.path.abspath(path)))
+  os.close(fd)
+  source, target = sqlite3.connect(path), sqlite3.connect(copy)
+  try:
+    source.backup(target)
+  finally:
+    source.close()
+    target.close()
+  # Progress goes to stderr, keeping stdout for the JSON report
+  with contextlib.redirect_stdout(sys.stderr):
+    run_migrations(copy)
+  return copy
+
+def remove_database(path):
+  for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(path + suffix):
+      os.unlink(path + suffix)
+
+def coverage(app, requests):
+  """Endpoints of the app's routes that no benchmark request reaches."""
+  adapter = app.url_map.bind('localhost')
+  covered = {adapter.match(path, method)[0] for _, method, path, _ in requests}
+  endpoints = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+  return sorted(endpoints - covered - set(SKIPPED))
+
+def bench(path, iterations=50, warmup=3, cache=False):
+  counts = table_counts(path)
+  scratch = scratch_copy(path)
+  try:
+    return bench_copy(path, scratch, counts, iterations, warmup, cache)
+  finally:
+    remove_database(scratch)
+
+def bench_copy(path, scratch, counts, iterations, warmup, cache):
+  app = create_app({'DATABASE': scratch, 'RESPONSE_CACHE_ENABLED': cache})
+  statements = []
+  instrument(app, statements)
+  client = app.test_client()
+
+  requests = route_requests({
+    'words': counts['words'], 'groups': counts['groups'], 'sessions': counts['study_sessions']
+  })
+  results = []
+  for name, method, url, options in requests:
+    timings = []
+    queries = 0
+    status = None
+    for i in range(warmup + iterations):
+      del statements[:]
+      started = time.perf_counter()
+      response = client.open(url, method=method, **options)
+      response.get_data()  # drain streamed bodies inside the timing
+      elapsed = time.perf_counter() - started
+      status = response.status_code
+      if i >= warmup:
+        timings.append(elapsed)
+        queries += sum(statements)
+    timings.sort()
+    results.append({
+      'name': name,
+      'method': method,
+      'path': url,
+      'status': status,
+      'iterations': iterations,
+      'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+      'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+      'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+      'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+      'queries_per_request': round(queries / iterations, 2),
+      'peak_alloc_kb': peak_alloc_kb(client, method, url, options),
+    })
+  app.db.close_all()
+
+  return {
+    'database': path,
+    'counts': counts,
+    'cache': cache,
+    'python': platform.python_version(),
+    'sqlite': sqlite3.sqlite_version,
+    'routes': results,
+    'skipped': SKIPPED,
+    'uncovered': coverage(app, requests),
+    'peak_rss_kb': peak_rss_kb(),
+  }
+
+def compare(report, baseline, tolerance=REGRESSION_TOLERANCE):
+  """Routes whose p95 grew by more than `tolerance` times the baseline's."""
+  previous = {route['name']: route for route in baseline['routes']}
+  regressions = []
+  for route in report['routes']:
+    before = previous.get(route['name'])
+    if before and route['p95_ms'] > before['p95_ms'] * tolerance:
+      regressions.append({
+        'name': route['name'],
+        'baseline_p95_ms': before['p95_ms'],
+        'p95_ms': route['p95_ms'],
+        'ratio': round(route['p95_ms'] / before['p95_ms'], 2) if before['p95_ms'] else None,
+      })
+  return regressions
+
+def main(scale='small', path=None, iterations=50, cache=False, output=None, baseline=None):
+  path = path or generate.database_path(scale)
+  if not os.path.exists(path):
+    generate.main(scale, path)
+
+  report = bench(path, iterations=iterations, cache=cache)
+  report['scale'] = scale
+  if baseline:
+    with open(baseline) as file:
+      report['regressions'] = compare(report, json.load(file))
+
+  text = json.dumps(report, indent=2)
+  if output:
+    with open(output, 'w') as file:
+      file.write(text + '\n')
+  print(text)
+  return report
+
+if __name__ == '__main__':
+  main(*sys.argv[1:2])
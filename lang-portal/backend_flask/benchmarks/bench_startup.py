@@ -0,0 +1,47 @@
+"""Cold-start time of a worker: importing app.py and creating the app.
+
+Each sample runs in a fresh interpreter, as a new worker would, and also
+counts the SQLite connections opened while starting (expected: none).
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.join(os.path.dirname(__file__), '..')
+
+# Runs in the child interpreter; prints one JSON sample
+SAMPLE = '''
+import json, sqlite3, time
+connects = []
+connect = sqlite3.connect
+sqlite3.connect = lambda *args, **kwargs: connects.append(args) or connect(*args, **kwargs)
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({'DATABASE': %r})
+created = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_ms': (created - imported) * 1000,
+                  'connections': len(connects)}))
+'''
+
+def sample(database):
+  output = subprocess.run(
+    [sys.executable, '-c', SAMPLE % database], cwd=BACKEND, check=True, capture_output=True, text=True
+  ).stdout
+  return json.loads(output.splitlines()[-1])
+
+def run(samples=10, database='words.db'):
+  results = [sample(database) for _ in range(samples)]
+  report = {'samples': samples, 'connections': max(result['connections'] for result in results)}
+  for key in ('import_ms', 'create_ms'):
+    values = sorted(result[key] for result in results)
+    report[key] = {'median': round(statistics.median(values), 2), 'max': round(values[-1], 2)}
+  return report
+
+def main(samples=10):
+  print(json.dumps(run(samples), indent=2))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,134 @@
+"""Generate synthetic SQLite databases at a configurable scale for benchmarks.
+
+Rows are produced inside SQLite with recursive CTEs, so even the large scale
+never materializes in Python. Derived tables (counters, rollups, session
+summaries) are rebuilt from the generated history at the end, exactly as the
+rebuild tasks would do on a real database.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from lib.importer import deferrable_indexes
+from migrate import run_migrations
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+SCALES = {
+  'tiny': {'words': 2000, 'groups': 20, 'sessions': 2000, 'review_items': 20000},
+  'small': {'words': 20000, 'groups': 200, 'sessions': 20000, 'review_items': 500000},
+  'medium': {'words': 200000, 'groups': 2000, 'sessions': 200000, 'review_items': 5000000},
+  'large': {'words': 1000000, 'groups': 10000, 'sessions': 1000000, 'review_items': 50000000},
+}
+
+# Sessions and reviews are spread over the year before generation
+MINUTES_PER_YEAR = 525600
+
+SEQUENCE = 'WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)'
+
+def database_path(scale):
+  return os.path.join(DATA_DIR, f'{scale}.db')
+
+def counts_for(scale, **overrides):
+  counts = dict(SCALES[scale])
+  counts.update({name: value for name, value in overrides.items() if value is not None})
+  return counts
+
+def generate(path, counts, log=print):
+  """Create a database at `path` with the row counts in `counts`."""
+  for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(path + suffix):
+      os.unlink(path + suffix)
+  os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+  app = create_app({'DATABASE': path, 'RESPONSE_CACHE_ENABLED': False})
+  with app.app_context():
+    cursor = app.db.cursor()
+    app.db.setup_tables(cursor)
+    run_migrations(path)
+    app.db.import_study_activities_json(cursor=cursor, data_json_path='seed/study_activities.json')
+    cursor.execute('SELECT COUNT(*) FROM study_activities')
+    activities = cursor.fetchone()[0]
+
+    # Nothing reads the database while it is generated
+    cursor.execute('PRAGMA synchronous = OFF')
+
+    def step(name, sql, params=(), tables=()):
+      started = time.perf_counter()
+      with app.db.transaction() as cursor:
+        deferred = deferrable_indexes(cursor, tables)
+        for index_name, _ in deferred:
+          cursor.execute(f'DROP INDEX {index_name}')
+        cursor.execute(sql, params)
+        # rowcount is -1 for statements starting with WITH; changes() skips trigger writes
+        rows = cursor.execute('SELECT changes()').fetchone()[0]
+        for _, index_sql in deferred:
+          cursor.execute(index_sql)
+      log(f'{name}: {rows:,} rows in {time.perf_counter() - started:.1f}s')
+
+    step('words', f'''
+      {SEQUENCE}
+      INSERT INTO words (spanish, pronunciation, english, parts)
+      SELECT 'palabra' || n, 'pa-LA-bra-' || n, 'word ' || n,
+        '[{{"spanish":"pa","pronunciation":["pa"]}},{{"spanish":"labra","pronunciation":["la","bra"]}}]'
+      FROM seq
+    ''', (counts['words'],))
+
+    step('groups', f'''
+      {SEQUENCE}
+      INSERT INTO groups (name, words_count) SELECT 'Group ' || n, 0 FROM seq
+    ''', (counts['groups'],))
+
+    # Every word belongs to one group, round robin
+    step('word_groups', f'''
+      {SEQUENCE}
+      INSERT INTO word_groups (word_id, group_id) SELECT n, (n - 1) % ? + 1 FROM seq
+    ''', (counts['words'], counts['groups']), tables=['word_groups'])
+
+    step('study_sessions', f'''
+      {SEQUENCE}
+      INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+      SELECT (n - 1) % ? + 1, (n - 1) % ? + 1,
+        strftime('%Y-%m-%dT%H:%M:%SZ', 'now', '-' || (n % {MINUTES_PER_YEAR}) || ' minutes')
+      FROM seq
+    ''', (counts['sessions'], counts['groups'], activities), tables=['study_sessions'])
+
+    # Reviews land within half an hour after their session started; words are
+    # scattered with a multiplicative hash so every word gets some history
+    step('word_review_items', f'''
+      {SEQUENCE}
+      INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+      SELECT
+        (n * 2654435761) % ? + 1,
+        s,
+        CASE WHEN n % 10 < 7 THEN 1 ELSE 0 END,
+        strftime('%Y-%m-%dT%H:%M:%SZ', 'now', '-' || (s % {MINUTES_PER_YEAR}) || ' minutes', '+' || (n % 1800) || ' seconds')
+      FROM (SELECT n, (n - 1) % ? + 1 AS s FROM seq)
+    ''', (counts['review_items'], counts['words'], counts['sessions']), tables=['word_review_items'])
+
+    for name in ('word_reviews', 'study_stats'):
+      started = time.perf_counter()
+      app.db.rebuild(app.db.cursor(), name)
+      log(f'rebuild {name}: {time.perf_counter() - started:.1f}s')
+
+    app.db.cursor().execute('ANALYZE')
+  app.db.close_all()
+  return path
+
+def main(scale='small', path=None, force=False, **overrides):
+  path = path or database_path(scale)
+  if os.path.exists(path) and not force:
+    print(f'{path} already exists (pass --force to regenerate)')
+    return path
+  counts = counts_for(scale, **overrides)
+  print(f'Generating {path}: ' + ', '.join(f'{name}={count:,}' for name, count in counts.items()))
+  started = time.perf_counter()
+  generate(path, counts)
+  print(f'Done in {time.perf_counter() - started:.1f}s')
+  return path
+
+if __name__ == '__main__':
+  main(*sys.argv[1:2])
@@ -0,0 +1,105 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, make_response, request
+
+class ResponseCache:
+  """In-process LRU cache of successful GET responses.
+
+  Entries are keyed by path, normalized query args, the Accept header and
+  any `vary_headers` (e.g. the learner id), and remember the version of every table the view reads. Write handlers bump
+  those versions through invalidate(), so a stale entry is dropped the next
+  time it is looked up. The TTL bounds staleness for writes this process never sees (other
+  workers, invoke tasks) and for views that depend on the current date.
+  """
+
+  def __init__(self, max_entries=1024, ttl=60.0, enabled=True, vary_headers=()):
+    self.max_entries = max_entries
+    self.ttl = ttl
+    self.enabled = enabled
+    # Request headers (besides Accept) whose value is part of the key
+    self.vary_headers = tuple(vary_headers)
+    self._entries = OrderedDict()
+    self._versions = {}
+    self._lock = threading.Lock()
+    self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+  def cached(self, *tables):
+    """Cache a GET view whose output depends only on `tables` and the request."""
+    def decorator(view):
+      @functools.wraps(view)
+      def wrapper(*args, **kwargs):
+        if not self.enabled or request.method != 'GET':
+          return view(*args, **kwargs)
+
+        # Accept is part of the key because views may negotiate the format
+        key = (
+          request.path, tuple(sorted(request.args.items(multi=True))), request.headers.get('Accept'),
+          tuple(request.headers.get(header) for header in self.vary_headers)
+        )
+        versions = self._table_versions(tables)
+        entry = self._get(key, versions)
+        if entry is not None:
+          body, status, content_type = entry
+          response = Response(body, status=status, content_type=content_type)
+          response.headers['X-Cache'] = 'HIT'
+          return response
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+          self._set(key, versions, (response.get_data(), response.status_code, response.content_type))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+      return wrapper
+    return decorator
+
+  def invalidate(self, *tables):
+    """Bump the version of each written table, orphaning entries that read it."""
+    with self._lock:
+      for table in tables:
+        self._versions[table] = self._versions.get(table, 0) + 1
+
+  def versions(self, *tables):
+    """Current versions of `tables`; they change whenever one is invalidated."""
+    return self._table_versions(tables)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def stats(self):
+    with self._lock:
+      stats = dict(self._stats)
+      stats['entries'] = len(self._entries)
+    stats['max_entries'] = self.max_entries
+    return stats
+
+  def _table_versions(self, tables):
+    with self._lock:
+      return tuple(self._versions.get(table, 0) for table in tables)
+
+  def _get(self, key, versions):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self._stats['misses'] += 1
+        return None
+      expires_at, entry_versions, value = entry
+      if entry_versions != versions or expires_at <= time.monotonic():
+        del self._entries[key]
+        self._stats['invalidations' if entry_versions != versions else 'expirations'] += 1
+        self._stats['misses'] += 1
+        return None
+      self._entries.move_to_end(key)
+      self._stats['hits'] += 1
+      return value
+
+  def _set(self, key, versions, value):
+    with self._lock:
+      self._entries[key] = (time.monotonic() + self.ttl, versions, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+        self._stats['evictions'] += 1
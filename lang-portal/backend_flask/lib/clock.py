@@ -0,0 +1,39 @@
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# Timestamps are stored in UTC as YYYY-MM-DDTHH:MM:SSZ. What counts as a study
+# "day" depends on the school's timezone (the STUDY_TIMEZONE config), so day
+# boundaries are worked out here rather than with SQLite's UTC-only date().
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+def utc_timestamp(moment=None):
+  moment = moment or datetime.now(timezone.utc)
+  return moment.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+def parse_timestamp(timestamp):
+  # Also accepts SQLite's CURRENT_TIMESTAMP format; naive values are UTC
+  moment = datetime.fromisoformat(timestamp)
+  if moment.tzinfo is None:
+    moment = moment.replace(tzinfo=timezone.utc)
+  return moment
+
+def study_day(timestamp, tz):
+  """The local calendar day (YYYY-MM-DD) a stored timestamp falls on."""
+  return parse_timestamp(timestamp).astimezone(tz).date().isoformat()
+
+def today(tz):
+  return datetime.now(tz).date()
+
+def days_between(earlier, later):
+  return (date.fromisoformat(later) - date.fromisoformat(earlier)).days
+
+def days_ago(tz, days):
+  return (today(tz) - timedelta(days=days)).isoformat()
+
+def get_timezone(name):
+  return ZoneInfo(name or 'UTC')
+
+def seconds_between(earlier, later):
+  """Whole seconds from one stored timestamp to another."""
+  return int((parse_timestamp(later) - parse_timestamp(earlier)).total_seconds())
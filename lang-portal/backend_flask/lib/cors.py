@@ -0,0 +1,77 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+from flask import request
+
+# Cross-origin access for every route: an origin is allowed when a study
+# activity is served from it.
+# The origins are read from study_activities on first use, not at startup, and
+# re-read once the table is invalidated in the response cache, or after `ttl`
+# seconds for changes made by other processes (invoke tasks).
+
+ALLOW_METHODS = 'GET, POST, PUT, DELETE, OPTIONS'
+ALLOW_HEADERS = 'Content-Type, Authorization'
+
+def origin_of(url):
+  """https://example.com/app -> https://example.com"""
+  parsed = urlparse(url or '')
+  if not parsed.scheme or not parsed.netloc:
+    return None
+  return f'{parsed.scheme}://{parsed.netloc}'
+
+class AllowedOrigins:
+  def __init__(self, db, cache, ttl=60.0, extra=()):
+    self.db = db
+    self.cache = cache
+    self.ttl = ttl
+    self.extra = frozenset(extra)  # always allowed, e.g. the dev server
+    self._origins = None
+    self._versions = None
+    self._expires_at = 0.0
+    self._lock = threading.Lock()
+    self._stats = {'loads': 0}
+
+  def get(self):
+    """The allowed origins, or None when any origin is allowed."""
+    versions = self.cache.versions('study_activities')
+    with self._lock:
+      if self._versions == versions and time.monotonic() < self._expires_at:
+        return self._origins
+    try:
+      cursor = self.db.read_cursor()
+      cursor.execute('SELECT url FROM study_activities')
+      origins = {origin_of(row['url']) for row in cursor.fetchall()} - {None}
+    except Exception:
+      # The database is not set up yet: allow any origin, and look again next time
+      return None
+    # Without activities there is nothing to restrict to
+    origins = frozenset(origins | self.extra) if origins else None
+    with self._lock:
+      self._origins = origins
+      self._versions = versions
+      self._expires_at = time.monotonic() + self.ttl
+      self._stats['loads'] += 1
+    return origins
+
+  def apply(self, response):
+    """after_request hook: add CORS headers for an allowed origin, unless the view set its own."""
+    origin = request.headers.get('Origin')
+    if origin is None or 'Access-Control-Allow-Origin' in response.headers:
+      return response
+    origins = self.get()
+    if origins is None:
+      response.headers['Access-Control-Allow-Origin'] = '*'
+    elif origin in origins:
+      response.headers['Access-Control-Allow-Origin'] = origin
+      response.vary.add('Origin')
+    else:
+      return response
+    if request.method == 'OPTIONS':
+      response.headers['Access-Control-Allow-Methods'] = ALLOW_METHODS
+      response.headers['Access-Control-Allow-Headers'] = ALLOW_HEADERS
+    return response
+
+  def stats(self):
+    with self._lock:
+      return dict(self._stats)
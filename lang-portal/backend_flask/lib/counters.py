@@ -0,0 +1,7 @@
+# Row totals kept in table_counters by triggers (migration 0011), so paginated
+# listings do not COUNT(*) the whole table on every page.
+
+def row_count(cursor, table):
+  cursor.execute('SELECT row_count FROM table_counters WHERE name = ?', (table,))
+  row = cursor.fetchone()
+  return row[0] if row else 0
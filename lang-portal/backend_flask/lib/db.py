@@ -1,18 +1,96 @@
-import sqlite3
 import json
 import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
 from flask import g
 
+from lib.clock import get_timezone, study_day
+from lib.importer import import_words, iter_json_objects
+from lib.metrics import InstrumentedConnection
+from lib.pool import ConnectionPool
+
+# BEGIN IMMEDIATE already waits busy_timeout for the write lock; when another
+# process still holds it after that, retry this many more times with backoff
+WRITE_RETRIES = 3
+WRITE_RETRY_DELAY = 0.05
+
+def is_busy(error):
+  return (getattr(error, 'sqlite_errorcode', 0) & 0xff) == sqlite3.SQLITE_BUSY
+
+def begin_immediate(connection, retries=WRITE_RETRIES):
+  """Open a write transaction, taking the write lock up front."""
+  for attempt in range(retries + 1):
+    try:
+      connection.execute('BEGIN IMMEDIATE')
+      return
+    except sqlite3.OperationalError as e:
+      if not is_busy(e) or attempt == retries:
+        raise
+      time.sleep(WRITE_RETRY_DELAY * 2 ** attempt)
+
+def is_sql_int(value):
+  """Whether `value` binds as an SQLite INTEGER: a (non-bool) int within 64 bits."""
+  return isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63
+
+def file_uri(path):
+  return 'file:' + quote(os.path.abspath(path))
+
+def read_only_uri(path):
+  return file_uri(path) + '?mode=ro'
+
 class Db:
-  def __init__(self, database='words.db'):
-    self.database = os.environ.get('DATABASE_PATH', database)
-    self.connection = None
+  # Attribute of `g` holding the context's writer ('<key>_reader' the reader)
+  context_key = 'db'
 
+  def __init__(self, database='words.db', pool_size=8, pragmas=None, timezone='UTC', write_retries=WRITE_RETRIES):
+    self.database = os.environ.get('DATABASE_PATH', database)
+    self.timezone = get_timezone(timezone)
+    self.write_retries = write_retries
+    self.pool, self.writer = self.open_pools(self.database, pool_size, pragmas)
+
+  def open_pools(self, database, pool_size, pragmas, attach=None):
+    """The read-only pool and the single-writer pool for `database`.
+
+    `attach` maps schema names to databases attached read-only to every
+    connection of both pools.
+    """
+    options = {
+      # study_day(timestamp) lets SQL group by the same local days as lib/stats.py
+      'functions': {'study_day': lambda timestamp: study_day(timestamp, self.timezone)},
+      # Statements and rows are counted into the current request (lib/metrics.py)
+      'factory': InstrumentedConnection,
+      'attach': {name: read_only_uri(path) for name, path in (attach or {}).items()},
+    }
+    # Read-only connections for the GET handlers; with WAL they read a
+    # snapshot without waiting on the writer. Only a writer can set journal_mode.
+    pool = ConnectionPool(
+      read_only_uri(database),
+      max_size=pool_size,
+      pragmas={**(pragmas or {}), 'journal_mode': None},
+      uri=True,
+      **options
+    )
+    # A single read-write connection: writers queue for it here rather than
+    # on the SQLite lock. Attaching by URI needs a URI connection.
+    writer = ConnectionPool(
+      file_uri(database) if attach else database,
+      max_size=1,
+      pragmas=pragmas,
+      uri=bool(attach),
+      **options
+    )
+    return pool, writer
+
+  def study_day(self, timestamp):
+    return study_day(timestamp, self.timezone)
+
+  # Borrow the writer for the rest of the app context (tasks, imports, rebuilds)
   def get(self):
-    if 'db' not in g:
-      g.db = sqlite3.connect(self.database)
-      g.db.row_factory = sqlite3.Row  # Return rows as dictionaries
-    return g.db
+    if self.context_key not in g:
+      setattr(g, self.context_key, self.writer.acquire())
+    return g.get(self.context_key)
 
   def commit(self):
     self.get().commit()
@@ -22,10 +100,52 @@ class Db:
     connection = self.get()
     return connection.cursor()
 
+  # Borrow a read-only connection for the rest of the app context
+  def reader(self):
+    key = self.context_key + '_reader'
+    if key not in g:
+      setattr(g, key, self.pool.acquire())
+    return g.get(key)
+
+  def read_cursor(self):
+    return self.reader().cursor()
+
+  # Run a block of writes as one explicit transaction: committed when the
+  # block finishes, rolled back if it raises. Handlers hold the writer for the
+  # block only; a context that already borrowed it with get() keeps it.
+  @contextmanager
+  def transaction(self):
+    held = self.context_key in g
+    connection = g.get(self.context_key) if held else self.writer.acquire()
+    try:
+      begin_immediate(connection, self.write_retries)
+      cursor = connection.cursor()
+      try:
+        yield cursor
+      except Exception:
+        connection.rollback()
+        raise
+      connection.commit()
+    finally:
+      if not held:
+        self.writer.release(connection)
+
+  # Return the context's connections to their pools (they stay open for reuse)
   def close(self):
-    db = g.pop('db', None)
-    if db is not None:
-      db.close()
+    for key, pool in ((self.context_key, self.writer), (self.context_key + '_reader', self.pool)):
+      connection = g.pop(key, None)
+      if connection is not None:
+        pool.release(connection)
+
+  def close_all(self):
+    self.pool.close_all()
+    self.writer.close_all()
+
+  def pool_stats(self):
+    return self.pool.stats()
+
+  def writer_stats(self):
+    return self.writer.stats()
 
   # Function to load SQL from a file
   def sql(self, filepath):
@@ -60,6 +180,15 @@ class Db:
     cursor.execute(self.sql('setup/create_table_study_sessions.sql'))
     self.get().commit()
 
+  # Recompute a derived table from its source rows (sql/rebuild/<name>.sql)
+  # in a single transaction, so readers never see it half-built
+  def rebuild(self, cursor, name):
+    try:
+      cursor.executescript('BEGIN;\n' + self.sql(f'rebuild/{name}.sql') + '\nCOMMIT;')
+    except Exception:
+      self.get().rollback()
+      raise
+
   def import_study_activities_json(self,cursor,data_json_path):
     study_actvities = self.load_json(data_json_path)
     for activity in study_actvities:
@@ -68,53 +197,31 @@ class Db:
       ''', (activity['name'],activity['url'],activity['preview_url'],))
     self.get().commit()
 
-  def import_word_json(self,cursor,group_name,data_json_path):
+  def import_word_json(self, cursor, group_name, data_json_path, batch_size=5000, progress=None):
       # Insert a new group
       cursor.execute('''
         INSERT INTO groups (name) VALUES (?)
       ''', (group_name,))
+      group_id = cursor.lastrowid
       self.get().commit()
 
-      # Get the ID of the group
-      cursor.execute('SELECT id FROM groups WHERE name = ?', (group_name,))
-      core_verbs_group_id = cursor.fetchone()[0]
-
-      # Insert some sample words (verbs) from JSON file and associate with the group
-      words = self.load_json(data_json_path)
-
-      for word in words:
-        # Insert the word into the words table
-        cursor.execute('''
-          INSERT INTO words (spanish, pronunciation, english, parts) VALUES (?, ?, ?, ?)
-        ''', (word['spanish'], word['pronunciation'], word['english'], json.dumps(word['parts'])))
-        
-        # Get the last inserted word's ID
-        word_id = cursor.lastrowid
-
-        # Insert the word-group relationship into word_groups table
-        cursor.execute('''
-          INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)
-        ''', (word_id, core_verbs_group_id))
-      self.get().commit()
+      # Stream the words from the JSON file and merge them into the group
+      with open(data_json_path, 'r', encoding='utf-8') as file:
+        count = import_words(self.get(), iter_json_objects(file), group_id, batch_size=batch_size, progress=progress)
 
-      # Update the words_count in the groups table by counting all words in the group
-      cursor.execute('''
-        UPDATE groups
-        SET words_count = (
-          SELECT COUNT(*) FROM word_groups WHERE group_id = ?
-        )
-        WHERE id = ?
-      ''', (core_verbs_group_id, core_verbs_group_id))
-
-      self.get().commit()
-
-      print(f"Successfully added {len(words)} verbs to the '{group_name}' group.")
+      print(f"Successfully added {count} verbs to the '{group_name}' group.")
+      return group_id
 
   # Initialize the database with sample data
   def init(self, app):
     with app.app_context():
       cursor = self.cursor()
       self.setup_tables(cursor)
+
+      # Bring the new schema up to the latest migration before seeding
+      from migrate import run_migrations
+      run_migrations(self.database)
+
       self.import_word_json(
         cursor=cursor,
         group_name='Core Verbs',
@@ -130,6 +237,3 @@ class Db:
         cursor=cursor,
         data_json_path='seed/study_activities.json'
       )
-
-# Create an instance of the Db class
-db = Db()
@@ -0,0 +1,139 @@
+import json
+import time
+
+# Bulk vocabulary import. Words are parsed incrementally from the file, staged
+# in a temp table batch by batch and merged with set-based statements, all in
+# one transaction, so multi-million word files load without holding them in
+# memory or paying a round trip per word.
+
+READ_SIZE = 1 << 16
+
+def iter_json_objects(file, read_size=READ_SIZE):
+  """Yield the objects of a JSON array (or NDJSON stream) without loading the whole file."""
+  decoder = json.JSONDecoder()
+  buffer = ''
+  pos = 0
+  eof = False
+  started = False
+  in_array = False
+  while True:
+    # Skip whitespace and the array punctuation between objects
+    while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+      pos += 1
+    if pos < len(buffer) and not started and buffer[pos] == '[':
+      started = in_array = True
+      pos += 1
+      continue
+    if pos < len(buffer) and buffer[pos] == ']':
+      return
+
+    if pos < len(buffer):
+      try:
+        value, end = decoder.raw_decode(buffer, pos)
+      except json.JSONDecodeError:
+        if eof:
+          raise
+        value = None
+      # A value that reaches the end of the buffer may be cut short (e.g. a
+      # number), so only accept it once more input follows it
+      if value is not None and (end < len(buffer) or eof):
+        started = True
+        pos = end
+        yield value
+        continue
+    elif eof:
+      if in_array:
+        raise ValueError('Unexpected end of file inside the JSON array')
+      return
+
+    chunk = file.read(read_size)
+    if not chunk:
+      eof = True
+    buffer = buffer[pos:] + chunk
+    pos = 0
+
+def deferrable_indexes(cursor, tables):
+  """The (name, sql) of non-unique indexes on `tables`, safe to drop during a load."""
+  indexes = []
+  for table in tables:
+    cursor.execute(f'PRAGMA index_list({table})')
+    # Rows are (seq, name, unique, origin, partial); origin 'c' is CREATE INDEX
+    for _, name, unique, origin, _ in cursor.fetchall():
+      if unique or origin != 'c':
+        continue
+      cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+      indexes.append((name, cursor.fetchone()[0]))
+  return indexes
+
+def import_words(connection, words, group_id, batch_size=5000, defer_indexes=True, progress=None):
+  """Upsert `words` on (spanish, english) and add them all to `group_id`.
+
+  Runs as a single transaction. With `defer_indexes`, non-unique indexes on
+  words and word_groups are dropped for the load and rebuilt once at the end,
+  which is far cheaper than maintaining them row by row. `progress` is called
+  with (rows imported, seconds elapsed) after every batch. Returns the number
+  of rows read.
+  """
+  cursor = connection.cursor()
+  started_at = time.perf_counter()
+  imported = 0
+
+  cursor.execute('''
+    CREATE TEMP TABLE IF NOT EXISTS import_words (
+      spanish TEXT NOT NULL,
+      pronunciation TEXT NOT NULL,
+      english TEXT NOT NULL,
+      parts TEXT NOT NULL
+    )
+  ''')
+  cursor.execute('BEGIN')
+  try:
+    deferred = deferrable_indexes(cursor, ['words', 'word_groups']) if defer_indexes else []
+    for name, _ in deferred:
+      cursor.execute(f'DROP INDEX {name}')
+
+    batch = []
+    for word in words:
+      # Minified, as SQLite's json() writes it (migration 0012)
+      batch.append((word['spanish'], word['pronunciation'], word['english'], json.dumps(word['parts'], separators=(',', ':'), ensure_ascii=False)))
+      if len(batch) >= batch_size:
+        merge_batch(cursor, batch, group_id)
+        imported += len(batch)
+        batch = []
+        if progress:
+          progress(imported, time.perf_counter() - started_at)
+    if batch:
+      merge_batch(cursor, batch, group_id)
+      imported += len(batch)
+      if progress:
+        progress(imported, time.perf_counter() - started_at)
+
+    for _, sql in deferred:
+      cursor.execute(sql)
+  except Exception:
+    connection.rollback()
+    raise
+  connection.commit()
+  cursor.execute('DROP TABLE IF EXISTS temp.import_words')
+  return imported
+
+def merge_batch(cursor, batch, group_id):
+  cursor.execute('DELETE FROM temp.import_words')
+  cursor.executemany(
+    'INSERT INTO temp.import_words (spanish, pronunciation, english, parts) VALUES (?, ?, ?, ?)',
+    batch
+  )
+  # "WHERE true" keeps SQLite from reading ON CONFLICT as a join constraint
+  cursor.execute('''
+    INSERT INTO words (spanish, pronunciation, english, parts)
+    SELECT spanish, pronunciation, english, parts FROM temp.import_words WHERE true
+    ON CONFLICT (spanish, english) DO UPDATE SET
+      pronunciation = excluded.pronunciation,
+      parts = excluded.parts
+  ''')
+  cursor.execute('''
+    INSERT OR IGNORE INTO word_groups (word_id, group_id)
+    SELECT w.id, ?
+    FROM temp.import_words i
+    JOIN words w ON w.spanish = i.spanish AND w.english = i.english
+  ''', (group_id,))
@@ -0,0 +1,219 @@
+import queue
+import threading
+import time
+
+from lib.db import begin_immediate
+from lib.metrics import Histogram, LATENCY_BUCKETS, COUNT_BUCKETS, render_gauges
+from lib.reviews import invalidate_reviews, record_reviews
+
+# Write-behind ingestion for review batches (REVIEW_INGEST_MODE 'async' or
+# 'durable'). Handlers validate a batch and queue it; one writer thread drains
+# the queue and commits everything waiting in a single transaction, so
+# concurrent submissions share one fsync instead of queueing on the lock.
+
+class QueueFull(Exception):
+  pass
+
+class CommitTimeout(Exception):
+  pass
+
+class PendingBatch:
+  def __init__(self, study_session_id, reviews, reviewed_at, day):
+    self.study_session_id = study_session_id
+    self.reviews = reviews
+    self.reviewed_at = reviewed_at
+    self.day = day
+    self.error = None
+    # Set under the writer's lock: `claimed` once a commit includes the batch,
+    # `cancelled` if its submitter gave up first, so it is never written
+    self.claimed = False
+    self.cancelled = False
+    self.done = threading.Event()
+
+_STOP = object()
+
+class ReviewWriter:
+  """A bounded queue of review batches and the thread that group-commits them.
+
+  `mode` is 'async' (acknowledge once queued) or 'durable' (acknowledge once
+  committed). Submitting to a full queue waits up to `enqueue_timeout`
+  seconds, then raises QueueFull so the handler can shed load. A durable
+  submit waits up to `commit_timeout` seconds for the commit, then raises
+  CommitTimeout; a batch the writer has not picked up by then is dropped.
+  """
+
+  def __init__(self, db, cache, mode='async', max_queue=1000, max_batches_per_commit=256,
+               enqueue_timeout=0.5, commit_timeout=10.0, autostart=True, vocabulary=None):
+    self.db = db
+    self.cache = cache
+    self.vocabulary = vocabulary
+    self.mode = mode
+    self.max_batches_per_commit = max_batches_per_commit
+    self.enqueue_timeout = enqueue_timeout
+    self.commit_timeout = commit_timeout
+    self.autostart = autostart
+    self._queue = queue.Queue(max_queue)
+    self._thread = None
+    self._start_lock = threading.Lock()
+    self._lock = threading.Lock()
+    self._stats = {'enqueued': 0, 'rejected': 0, 'flushes': 0, 'batches_written': 0,
+                   'reviews_written': 0, 'batches_failed': 0, 'timed_out': 0}
+    self.flush_seconds = Histogram('review_ingest_flush_seconds', 'Time to commit one group of review batches', (), LATENCY_BUCKETS)
+    self.flush_batches = Histogram('review_ingest_batches_per_flush', 'Review batches committed per transaction', (), COUNT_BUCKETS)
+
+  def start(self):
+    # Started on first use rather than at app creation, so forked workers
+    # each get their own thread
+    with self._start_lock:
+      if self._thread is None or not self._thread.is_alive():
+        self._thread = threading.Thread(target=self._run, name='review-writer', daemon=True)
+        self._thread.start()
+
+  def submit(self, study_session_id, reviews, reviewed_at, day):
+    """Queue a validated batch; in durable mode, wait for it to be committed."""
+    if self.autostart:
+      self.start()
+    batch = PendingBatch(study_session_id, reviews, reviewed_at, day)
+    try:
+      self._queue.put(batch, timeout=self.enqueue_timeout)
+    except queue.Full:
+      with self._lock:
+        self._stats['rejected'] += 1
+      raise QueueFull('Review queue is full')
+    with self._lock:
+      self._stats['enqueued'] += 1
+    if self.mode == 'durable':
+      if not batch.done.wait(self.commit_timeout):
+        with self._lock:
+          self._stats['timed_out'] += 1
+          if not batch.claimed:
+            batch.cancelled = True
+        raise CommitTimeout('Review batch was not committed in time')
+      if batch.error is not None:
+        raise batch.error
+    return batch
+
+  def flush(self):
+    """Block until every batch queued so far has been written."""
+    if self._thread is None or not self._thread.is_alive():
+      self._drain()
+    self._queue.join()
+
+  def close(self, timeout=30.0):
+    """Write whatever is still queued and stop the writer thread (e.g. at exit)."""
+    if self._thread is not None and self._thread.is_alive():
+      self._queue.put(_STOP)
+      self._thread.join(timeout)
+    self._drain()
+
+  def stats(self):
+    with self._lock:
+      stats = dict(self._stats)
+    stats['queue_depth'] = self._queue.qsize()
+    stats['queue_capacity'] = self._queue.maxsize
+    return stats
+
+  def render_metrics(self):
+    with self._lock:
+      lines = self.flush_seconds.render() + self.flush_batches.render()
+    return lines + render_gauges('review_ingest', 'Review ingestion queue', self.stats())
+
+  def _run(self):
+    while True:
+      item = self._queue.get()
+      if item is _STOP:
+        self._queue.task_done()
+        return
+      # Group commit: everything already waiting goes into the same transaction
+      group = [item]
+      stop = False
+      while len(group) < self.max_batches_per_commit:
+        try:
+          item = self._queue.get_nowait()
+        except queue.Empty:
+          break
+        if item is _STOP:
+          self._queue.task_done()
+          stop = True
+          break
+        group.append(item)
+      self._write(group)
+      if stop:
+        return
+
+  def _drain(self):
+    # Write leftovers from the calling thread (no writer thread running)
+    while True:
+      group = []
+      while len(group) < self.max_batches_per_commit:
+        try:
+          item = self._queue.get_nowait()
+        except queue.Empty:
+          break
+        if item is _STOP:
+          self._queue.task_done()
+          continue
+        group.append(item)
+      if not group:
+        return
+      self._write(group)
+
+  def _write(self, group):
+    with self._lock:
+      for batch in group:
+        batch.claimed = not batch.cancelled
+    cancelled = [batch for batch in group if batch.cancelled]
+    group = [batch for batch in group if not batch.cancelled]
+    for batch in cancelled:
+      self._queue.task_done()
+    if not group:
+      return
+
+    started = time.perf_counter()
+    try:
+      connection = self.db.writer.acquire()
+    except Exception as e:
+      connection = None
+      for batch in group:
+        batch.error = e
+    if connection is not None:
+      try:
+        try:
+          self._commit(connection, group)
+        except Exception:
+          # One bad batch (e.g. its session was reset meanwhile) must not drop
+          # the others, so retry them one transaction each
+          for batch in group:
+            try:
+              self._commit(connection, [batch])
+            except Exception as e:
+              batch.error = e
+      finally:
+        self.db.writer.release(connection)
+
+    written = [batch for batch in group if batch.error is None]
+    if written:
+      invalidate_reviews(self.cache, self.vocabulary,
+                         {word_id for batch in written for word_id, _ in batch.reviews})
+    elapsed = time.perf_counter() - started
+    with self._lock:
+      self._stats['flushes'] += 1
+      self._stats['batches_written'] += len(written)
+      self._stats['reviews_written'] += sum(len(batch.reviews) for batch in written)
+      self._stats['batches_failed'] += len(group) - len(written)
+      self.flush_seconds.observe((), elapsed)
+      self.flush_batches.observe((), len(group))
+    for batch in group:
+      batch.done.set()
+      self._queue.task_done()
+
+  def _commit(self, connection, group):
+    begin_immediate(connection, self.db.write_retries)
+    cursor = connection.cursor()
+    try:
+      for batch in group:
+        record_reviews(cursor, batch.study_session_id, batch.reviews, batch.reviewed_at, batch.day)
+    except Exception:
+      connection.rollback()
+      raise
+    connection.commit()
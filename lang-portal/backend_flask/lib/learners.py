@@ -0,0 +1,255 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from flask import g, request
+
+from lib.db import Db
+
+# Per-learner study history (LEARNER_SHARDING). Each learner's sessions,
+# reviews, schedules and rollups live in a database file of their own, found
+# by hashing the learner id, with the shared vocabulary attached read-only as
+# `vocabulary`. Learners never wait on each other's write lock, and the
+# dashboard only reads the caller's file. The header is not authenticated, so
+# only writes create a file, up to `max_files`; reads for a learner without
+# one see a shared, empty, read-only database.
+
+LEARNER_MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sql', 'learner_migrations')
+MAX_LEARNER_ID_LENGTH = 128
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+EMPTY_DB_NAME = 'empty.db'
+
+class InvalidLearner(ValueError):
+  pass
+
+class TooManyLearners(Exception):
+  pass
+
+def learner_digest(learner_id):
+  return hashlib.sha256(learner_id.encode('utf-8')).hexdigest()
+
+def learner_path(directory, learner_id):
+  digest = learner_digest(learner_id)
+  # Fanned out over 256 directories, so none of them holds every learner
+  return os.path.join(directory, digest[:2], digest + '.db')
+
+class LearnerDb(Db):
+  """One learner's database, used like app.db by the study routes."""
+
+  def __init__(self, path, vocabulary, timezone, pool_size=2, pragmas=None, write_retries=3):
+    self.database = path
+    self.timezone = timezone
+    self.write_retries = write_retries
+    # Distinct per learner, so one app context can hold several
+    self.context_key = 'learner_db_' + os.path.basename(path)[:16]
+    self.pool, self.writer = self.open_pools(path, pool_size, pragmas, attach={'vocabulary': vocabulary})
+    # Kept by Learners under its lock: app contexts holding this database, and
+    # whether it was evicted (closed once the last of them lets go)
+    self.users = 0
+    self.evicted = False
+
+class OpeningDb:
+  """A learner database being created by one thread while others wait for it."""
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.error = None
+
+class Learners:
+  """Identifies the learner of a request and keeps their databases open.
+
+  The learner comes from the `header` request header (`default` when it is
+  absent). Up to `max_open` learner databases stay open, least recently used
+  evicted first. A learner's file is created and migrated by their first
+  write, while there are fewer than `max_files`; until then they read the
+  empty database. There is never more than one LearnerDb (and so one writer)
+  per file: an evicted database still in use stays registered until it is
+  released.
+  """
+
+  def __init__(self, db, directory, header='X-Learner-Id', default='default', max_open=64, max_files=10000,
+               pool_size=2, pragmas=None, logger=None):
+    self.db = db
+    self.directory = directory
+    self.header = header
+    self.default = default
+    self.max_open = max_open
+    self.max_files = max_files
+    self.pool_size = pool_size
+    self.pragmas = pragmas
+    self.logger = logger or logging.getLogger(__name__)
+    self.empty_path = os.path.join(directory, EMPTY_DB_NAME)
+    self._files = None  # learner files on disk, counted on first use
+    self._open = OrderedDict()  # path -> LearnerDb, least recently used first
+    self._evicted = {}  # path -> LearnerDb evicted while in use
+    self._opening = {}  # path -> OpeningDb
+    self._lock = threading.Lock()
+    self._stats = {'opened': 0, 'closed': 0, 'hits': 0, 'created': 0}
+
+  def learner_id(self):
+    learner_id = request.headers.get(self.header, self.default).strip()
+    if not learner_id or len(learner_id) > MAX_LEARNER_ID_LENGTH:
+      raise InvalidLearner(f'{self.header} must be 1 to {MAX_LEARNER_ID_LENGTH} characters')
+    return learner_id
+
+  def check_limit(self, learner_id):
+    """Raise TooManyLearners if a write by `learner_id` would need a file past `max_files`."""
+    path = learner_path(self.directory, learner_id)
+    if path not in self._open and not os.path.exists(path) and self._file_count() >= self.max_files:
+      raise TooManyLearners(f'No more than {self.max_files} learners can be stored')
+
+  def current(self):
+    """The database of the request's learner (see before_request in app.py)."""
+    used = g.setdefault('learner_dbs', {})
+    if g.learner_id not in used:
+      used[g.learner_id] = self.get(g.learner_id, create=request.method not in READ_METHODS)
+    return used[g.learner_id]
+
+  def get(self, learner_id, create=True):
+    """Borrow the learner's database, opening it if needed; pair with release().
+
+    Without `create`, a learner who has no file yet gets the empty database.
+    """
+    path = learner_path(self.directory, learner_id)
+    if not create and path not in self._open and not os.path.exists(path):
+      path = self.empty_path
+    while True:
+      with self._lock:
+        db = self._open.get(path)
+        if db is None and path in self._evicted:
+          # Still in use since its eviction: bring it back rather than open a second writer
+          db = self._open[path] = self._evicted.pop(path)
+          db.evicted = False
+        if db is not None:
+          self._open.move_to_end(path)
+          db.users += 1
+          self._stats['hits'] += 1
+          evicted = self._evict()
+          break
+        opening = self._opening.get(path)
+        owner = opening is None
+        if owner:
+          opening = self._opening[path] = OpeningDb()
+      if not owner:
+        # Another thread is opening this learner's database; use theirs
+        opening.done.wait()
+        if opening.error is not None:
+          raise opening.error
+        continue
+      # Creating and migrating the file happens outside the lock, so a cold
+      # learner does not hold up everyone else's requests
+      try:
+        db = self._open_db(path)
+      except Exception as e:
+        with self._lock:
+          del self._opening[path]
+        opening.error = e
+        opening.done.set()
+        raise
+      with self._lock:
+        del self._opening[path]
+        self._open[path] = db
+        db.users += 1
+        self._stats['opened'] += 1
+        evicted = self._evict()
+      opening.done.set()
+      break
+    for stale in evicted:
+      stale.close_all()
+    return db
+
+  def _evict(self):
+    # Called under the lock; returns the evicted databases that can be closed now
+    closable = []
+    while len(self._open) > self.max_open:
+      path, db = self._open.popitem(last=False)
+      if db.users:
+        db.evicted = True
+        self._evicted[path] = db
+      else:
+        closable.append(db)
+        self._stats['closed'] += 1
+    return closable
+
+  def release(self, db):
+    """Give back a database from get(); an evicted one closes with its last user."""
+    db.close()
+    with self._lock:
+      db.users -= 1
+      closable = db.evicted and db.users == 0
+      if closable:
+        del self._evicted[db.database]
+        db.evicted = False
+        self._stats['closed'] += 1
+    if closable:
+      db.close_all()
+
+  def _file_count(self):
+    if self._files is None:
+      count = 0
+      if os.path.isdir(self.directory):
+        for entry in os.scandir(self.directory):
+          if entry.is_dir():
+            count += sum(1 for name in os.listdir(entry.path) if name.endswith('.db'))
+      with self._lock:
+        if self._files is None:
+          self._files = count
+    return self._files
+
+  def _open_db(self, path):
+    from migrate import run_migrations
+    empty = path == self.empty_path
+    created = not empty and not os.path.exists(path)
+    if created:
+      self._file_count()
+      with self._lock:
+        if self._files >= self.max_files:
+          raise TooManyLearners(f'No more than {self.max_files} learners can be stored')
+        self._files += 1
+        self._stats['created'] += 1
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    run_migrations(path, LEARNER_MIGRATIONS_DIR, log=self.logger.debug)
+    db = LearnerDb(
+      path,
+      self.db.database,
+      self.db.timezone,
+      pool_size=self.pool_size,
+      # The empty database is shared by every learner without a file
+      pragmas={**(self.pragmas or {}), 'query_only': 1} if empty else self.pragmas,
+      write_retries=self.db.write_retries
+    )
+    try:
+      # Open the writer first: it switches the file to WAL, and while it stays
+      # idle in its pool the read-only connections can share the WAL index
+      db.writer.release(db.writer.acquire())
+    except Exception:
+      db.close_all()
+      raise
+    return db
+
+  # Return the context's learner connections to their pools
+  def close(self):
+    for db in g.pop('learner_dbs', {}).values():
+      self.release(db)
+
+  def close_all(self):
+    with self._lock:
+      dbs = list(self._open.values()) + list(self._evicted.values())
+      self._open.clear()
+      self._evicted.clear()
+    for db in dbs:
+      db.close_all()
+
+  def stats(self):
+    with self._lock:
+      stats = dict(self._stats)
+      stats['open'] = len(self._open)
+    stats['max_open'] = self.max_open
+    return stats
+
+def learner_db(app):
+  """The database holding the current learner's study history: theirs when
+  sharding is on, otherwise the shared one."""
+  return app.learners.current() if app.learners is not None else app.db
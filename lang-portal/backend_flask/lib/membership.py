@@ -0,0 +1,87 @@
+from lib.db import is_sql_int
+
+# Bulk group membership changes. The word ids are staged in a temp table and
+# applied to word_groups with one set-based statement, idempotent against the
+# unique (word_id, group_id) index. The word_groups triggers keep
+# groups.words_count in step inside the same transaction.
+
+# Ids accepted per request; they are held in memory until the writer is free
+MAX_WORD_IDS = 1000000
+STAGE_BATCH_SIZE = 10000
+
+class InvalidWordIds(ValueError):
+  pass
+
+def parse_word_ids(values, limit=MAX_WORD_IDS):
+  """Validate a JSON list of word ids."""
+  if not isinstance(values, list):
+    raise InvalidWordIds("'word_ids' must be an array of word ids")
+  if len(values) > limit:
+    raise InvalidWordIds(f'At most {limit} word ids per request')
+  for value in values:
+    if not is_sql_int(value):
+      raise InvalidWordIds(f'Invalid word id: {value!r}')
+  return values
+
+def read_word_ids(lines, limit=MAX_WORD_IDS):
+  """Read an id file, one word id per line; blank lines are skipped."""
+  word_ids = []
+  for number, line in enumerate(lines, 1):
+    line = line.strip()
+    if not line:
+      continue
+    try:
+      word_id = int(line)
+    except ValueError:
+      raise InvalidWordIds(f'Invalid word id on line {number}')
+    if not is_sql_int(word_id):
+      raise InvalidWordIds(f'Invalid word id on line {number}')
+    word_ids.append(word_id)
+    if len(word_ids) > limit:
+      raise InvalidWordIds(f'At most {limit} word ids per request')
+  return word_ids
+
+def stage_word_ids(cursor, word_ids, batch_size=STAGE_BATCH_SIZE):
+  """Load `word_ids` into temp.group_word_ids (deduplicated); returns how many are distinct."""
+  cursor.execute('CREATE TEMP TABLE IF NOT EXISTS group_word_ids (word_id INTEGER PRIMARY KEY)')
+  cursor.execute('DELETE FROM temp.group_word_ids')
+  for start in range(0, len(word_ids), batch_size):
+    cursor.executemany(
+      'INSERT OR IGNORE INTO temp.group_word_ids (word_id) VALUES (?)',
+      [(word_id,) for word_id in word_ids[start:start + batch_size]]
+    )
+  cursor.execute('SELECT COUNT(*) FROM temp.group_word_ids')
+  return cursor.fetchone()[0]
+
+def find_missing_staged_word(cursor):
+  """The smallest staged id with no word, or None."""
+  cursor.execute('''
+    SELECT t.word_id FROM temp.group_word_ids t
+    WHERE NOT EXISTS (SELECT 1 FROM words w WHERE w.id = t.word_id)
+    ORDER BY t.word_id
+    LIMIT 1
+  ''')
+  row = cursor.fetchone()
+  return row[0] if row else None
+
+def add_staged_words(cursor, group_id):
+  """Add the staged words to the group; returns how many were not members yet."""
+  # WHERE true keeps SQLite from reading ON CONFLICT as a join constraint
+  cursor.execute('''
+    INSERT INTO word_groups (word_id, group_id)
+    SELECT word_id, ? FROM temp.group_word_ids WHERE true
+    ON CONFLICT (word_id, group_id) DO NOTHING
+  ''', (group_id,))
+  return cursor.rowcount
+
+def remove_staged_words(cursor, group_id):
+  """Remove the staged words from the group; returns how many were members."""
+  cursor.execute('''
+    DELETE FROM word_groups
+    WHERE group_id = ? AND word_id IN (SELECT word_id FROM temp.group_word_ids)
+  ''', (group_id,))
+  return cursor.rowcount
+
+def clear_staged_words(cursor):
+  # The table itself stays for the writer connection's next bulk change
+  cursor.execute('DELETE FROM temp.group_word_ids')
@@ -0,0 +1,231 @@
+import sqlite3
+import threading
+import time
+
+from flask import g, has_app_context
+
+# Per-request SQL accounting and Prometheus metrics. Pooled connections are
+# opened as InstrumentedConnection, whose cursors time every statement and
+# count the rows fetched into the current app context's QueryStats. The app
+# folds each request's stats into histograms, served as text at /metrics.
+
+# Statements kept per request for the slow request log
+MAX_LOGGED_STATEMENTS = 50
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+class QueryStats:
+  """What one request asked of SQLite."""
+
+  def __init__(self, capture=False):
+    self.statements = 0
+    self.seconds = 0.0
+    self.rows = 0
+    self.slowest = (0.0, None)
+    self.log = []
+    # With capture on, every (sql, parameters) is kept, e.g. for lib/query_plans.py
+    self.captured = [] if capture else None
+
+  def record(self, sql, seconds, count=1, parameters=None):
+    self.statements += count
+    self.seconds += seconds
+    if seconds > self.slowest[0]:
+      self.slowest = (seconds, sql)
+    if len(self.log) < MAX_LOGGED_STATEMENTS:
+      self.log.append((sql, seconds, count))
+    if self.captured is not None:
+      self.captured.append((sql, parameters))
+
+def current_stats():
+  return g.get('query_stats') if has_app_context() else None
+
+class InstrumentedCursor(sqlite3.Cursor):
+  def execute(self, sql, parameters=()):
+    started = time.perf_counter()
+    try:
+      return super().execute(sql, parameters)
+    finally:
+      self._record(sql, time.perf_counter() - started, parameters=parameters)
+
+  def executemany(self, sql, seq_of_parameters):
+    # Materialize so the batch size can be reported
+    rows = list(seq_of_parameters)
+    started = time.perf_counter()
+    try:
+      return super().executemany(sql, rows)
+    finally:
+      self._record(sql, time.perf_counter() - started, len(rows), rows[0] if rows else None)
+
+  def executescript(self, sql_script):
+    started = time.perf_counter()
+    try:
+      return super().executescript(sql_script)
+    finally:
+      self._record(sql_script, time.perf_counter() - started)
+
+  # Fetching steps the statement, so it counts as SQL time too
+  def fetchone(self):
+    return self._fetched(super().fetchone, lambda row: 0 if row is None else 1)
+
+  def fetchmany(self, *args, **kwargs):
+    return self._fetched(lambda: super(InstrumentedCursor, self).fetchmany(*args, **kwargs), len)
+
+  def fetchall(self):
+    return self._fetched(super().fetchall, len)
+
+  def __next__(self):
+    return self._fetched(super().__next__, lambda row: 1)
+
+  def _fetched(self, fetch, count):
+    stats = current_stats()
+    if stats is None:
+      return fetch()
+    started = time.perf_counter()
+    result = fetch()
+    stats.seconds += time.perf_counter() - started
+    stats.rows += count(result)
+    return result
+
+  def _record(self, sql, seconds, count=1, parameters=None):
+    stats = current_stats()
+    if stats is not None:
+      stats.record(sql, seconds, count, parameters)
+
+class InstrumentedConnection(sqlite3.Connection):
+  """A connection whose cursors (including execute() shortcuts) are instrumented."""
+
+  def cursor(self, factory=InstrumentedCursor):
+    return super().cursor(factory)
+
+  def execute(self, sql, parameters=()):
+    return self.cursor().execute(sql, parameters)
+
+  def executemany(self, sql, seq_of_parameters):
+    return self.cursor().executemany(sql, seq_of_parameters)
+
+  def executescript(self, sql_script):
+    return self.cursor().executescript(sql_script)
+
+def escape_label(value):
+  return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+  if not labels:
+    return ''
+  return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+class Histogram:
+  def __init__(self, name, help, labelnames, buckets):
+    self.name = name
+    self.help = help
+    self.labelnames = labelnames
+    self.buckets = buckets
+    self._series = {}  # label values -> [bucket counts..., sum, count]
+
+  def observe(self, labels, value):
+    series = self._series.get(labels)
+    if series is None:
+      series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+    for i, bound in enumerate(self.buckets):
+      if value <= bound:
+        series[i] += 1
+    series[-2] += value
+    series[-1] += 1
+
+  def render(self):
+    lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+    for labels, series in sorted(self._series.items()):
+      pairs = list(zip(self.labelnames, labels))
+      for bound, count in zip(self.buckets, series):
+        lines.append(f'{self.name}_bucket{format_labels(pairs + [("le", bound)])} {count}')
+      lines.append(f'{self.name}_bucket{format_labels(pairs + [("le", "+Inf")])} {series[-1]}')
+      lines.append(f'{self.name}_sum{format_labels(pairs)} {series[-2]}')
+      lines.append(f'{self.name}_count{format_labels(pairs)} {series[-1]}')
+    return lines
+
+class Counter:
+  def __init__(self, name, help, labelnames):
+    self.name = name
+    self.help = help
+    self.labelnames = labelnames
+    self._series = {}
+
+  def inc(self, labels, amount=1):
+    self._series[labels] = self._series.get(labels, 0) + amount
+
+  def render(self):
+    lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+    for labels, value in sorted(self._series.items()):
+      lines.append(f'{self.name}{format_labels(list(zip(self.labelnames, labels)))} {value}')
+    return lines
+
+def render_gauges(prefix, help, values):
+  lines = []
+  for key, value in sorted(values.items()):
+    name = f'{prefix}_{key}'
+    lines += [f'# HELP {name} {help} ({key})', f'# TYPE {name} gauge', f'{name} {value}']
+  return lines
+
+class RequestMetrics:
+  """Per-route latency and SQL histograms, plus the slow request log."""
+
+  def __init__(self, slow_request_threshold=0.5, logger=None, capture_statements=False):
+    self.slow_request_threshold = slow_request_threshold  # seconds; None disables the log
+    self.logger = logger
+    # (method, route, sql, parameters) of every statement, when capturing
+    self.capture_statements = capture_statements
+    self.captured = []
+    self._lock = threading.Lock()
+    labels = ('method', 'route')
+    self.duration = Histogram('http_request_duration_seconds', 'Request latency', labels + ('status',), LATENCY_BUCKETS)
+    self.sql_duration = Histogram('http_request_sql_duration_seconds', 'Time spent in SQLite per request', labels, LATENCY_BUCKETS)
+    self.sql_statements = Histogram('http_request_sql_statements', 'SQL statements per request', labels, COUNT_BUCKETS)
+    self.sql_rows = Histogram('http_request_sql_rows', 'Rows fetched per request', labels, ROW_BUCKETS)
+    self.slow_requests = Counter('http_slow_requests_total', 'Requests slower than the slow request threshold', labels)
+
+  def start_request(self):
+    g.query_stats = QueryStats(capture=self.capture_statements)
+    g.request_started = time.perf_counter()
+
+  def finish_request(self, method, route, status):
+    """Record the request in the histograms; returns its QueryStats."""
+    stats = g.pop('query_stats', None)
+    started = g.pop('request_started', None)
+    if stats is None or started is None:
+      return None
+    elapsed = time.perf_counter() - started
+    labels = (method, route)
+    with self._lock:
+      self.duration.observe(labels + (str(status),), elapsed)
+      self.sql_duration.observe(labels, stats.seconds)
+      self.sql_statements.observe(labels, stats.statements)
+      self.sql_rows.observe(labels, stats.rows)
+      slow = self.slow_request_threshold is not None and elapsed >= self.slow_request_threshold
+      if slow:
+        self.slow_requests.inc(labels)
+      if stats.captured:
+        self.captured.extend(labels + statement for statement in stats.captured)
+    if slow and self.logger is not None:
+      self.log_slow_request(method, route, status, elapsed, stats)
+    return stats
+
+  def log_slow_request(self, method, route, status, elapsed, stats):
+    statements = '\n'.join(
+      f'  {seconds * 1000:8.2f} ms  x{count}  {" ".join(sql.split())}'
+      for sql, seconds, count in stats.log
+    )
+    self.logger.warning(
+      'Slow request %s %s -> %s in %.1f ms: %d statements, %.1f ms in SQL, %d rows\n%s',
+      method, route, status, elapsed * 1000, stats.statements, stats.seconds * 1000, stats.rows, statements
+    )
+
+  def render(self, extra=()):
+    with self._lock:
+      lines = []
+      for metric in (self.duration, self.sql_duration, self.sql_statements, self.sql_rows, self.slow_requests):
+        lines += metric.render()
+    for prefix, help, values in extra:
+      lines += render_gauges(prefix, help, values)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,43 @@
+import base64
+import json
+
+from lib.db import is_sql_int
+
+class InvalidCursor(ValueError):
+  pass
+
+# Cursors are opaque to clients: a url-safe base64 JSON array holding the sort
+# column and order they were issued for, plus the (sort value, id) of the last
+# row on the page. Keying on id as well keeps the order total when values repeat.
+def encode_cursor(sort_by, order, value, row_id):
+  payload = json.dumps([sort_by, order, value, row_id], separators=(',', ':'))
+  return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort_by, order):
+  try:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    cursor_sort_by, cursor_order, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+  except (ValueError, TypeError):
+    raise InvalidCursor('Invalid cursor')
+  if cursor_sort_by != sort_by or cursor_order != order:
+    raise InvalidCursor('Cursor does not match sort_by/order')
+  # Both are bound as SQL parameters, so anything SQLite cannot bind (a list,
+  # an object, an int past 64 bits) is the client's error, not ours
+  if not is_sql_int(row_id) or not (value is None or isinstance(value, (str, float)) or is_sql_int(value)):
+    raise InvalidCursor('Invalid cursor')
+  return value, row_id
+
+# Row-value comparison so SQLite can seek straight to the next row through the
+# (sort column, id) index instead of scanning and discarding OFFSET rows.
+def keyset_condition(sort_expr, id_expr, order):
+  operator = '>' if order == 'asc' else '<'
+  return f'({sort_expr}, {id_expr}) {operator} (?, ?)'
+
+# Given rows fetched with LIMIT per_page + 1, trim the extra row and build the
+# cursor for the following page (None when this is the last page).
+def next_page(rows, per_page, sort_by, order):
+  if len(rows) <= per_page:
+    return rows, None
+  rows = rows[:per_page]
+  last = rows[-1]
+  return rows, encode_cursor(sort_by, order, last[sort_by], last['id'])
@@ -0,0 +1,108 @@
+import queue
+import sqlite3
+import threading
+
+# Applied once when a connection is opened; override per app with DB_PRAGMAS
+# (a value of None drops a pragma).
+DEFAULT_PRAGMAS = {
+  'journal_mode': 'WAL',      # readers no longer block on the writer
+  'synchronous': 'NORMAL',    # durable at checkpoints, safe with WAL
+  'cache_size': -20000,       # ~20 MB page cache per connection
+  'mmap_size': 268435456,     # 256 MB memory-mapped reads
+  'busy_timeout': 5000,       # wait up to 5s for locks instead of failing
+  'foreign_keys': 'ON',
+}
+
+class PoolTimeout(Exception):
+  pass
+
+class ConnectionPool:
+  """A bounded, thread-safe pool of tuned SQLite connections.
+
+  Connections are opened lazily up to `max_size` and handed out most recently
+  used first, so a busy worker keeps reusing a connection with a warm page cache.
+  """
+
+  def __init__(self, database, max_size=8, pragmas=None, timeout=30.0, functions=None, factory=sqlite3.Connection, uri=False, attach=None):
+    self.database = database
+    self.uri = uri  # database is a file: URI, e.g. with ?mode=ro
+    self.attach = attach or {}  # schema name -> database (a URI when uri is set)
+    self.factory = factory
+    self.max_size = max_size
+    self.timeout = timeout
+    self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+    self.functions = functions or {}  # name -> one-argument SQL function
+    self._idle = queue.LifoQueue()
+    self._slots = threading.BoundedSemaphore(max_size)
+    self._lock = threading.Lock()
+    self._stats = {'opened': 0, 'closed': 0, 'acquired': 0, 'reused': 0, 'waits': 0, 'timeouts': 0, 'in_use': 0}
+
+  def _connect(self):
+    # Pooled connections move between request threads, never shared at once
+    connection = sqlite3.connect(self.database, check_same_thread=False, factory=self.factory, uri=self.uri)
+    connection.row_factory = sqlite3.Row  # Return rows as dictionaries
+    for name, value in self.pragmas.items():
+      if value is not None:
+        connection.execute(f'PRAGMA {name} = {value}')
+    for name, function in self.functions.items():
+      connection.create_function(name, 1, function, deterministic=True)
+    # After the pragmas: an unqualified journal_mode would apply to these too
+    for name, database in self.attach.items():
+      connection.execute(f'ATTACH DATABASE ? AS {name}', (database,))
+    return connection
+
+  def acquire(self):
+    if not self._slots.acquire(blocking=False):
+      with self._lock:
+        self._stats['waits'] += 1
+      if not self._slots.acquire(timeout=self.timeout):
+        with self._lock:
+          self._stats['timeouts'] += 1
+        raise PoolTimeout(f'No database connection available after {self.timeout}s')
+
+    try:
+      connection = self._idle.get_nowait()
+      reused = True
+    except queue.Empty:
+      try:
+        connection = self._connect()
+      except Exception:
+        self._slots.release()
+        raise
+      reused = False
+
+    with self._lock:
+      self._stats['acquired'] += 1
+      self._stats['in_use'] += 1
+      if reused:
+        self._stats['reused'] += 1
+      else:
+        self._stats['opened'] += 1
+    return connection
+
+  def release(self, connection):
+    # Never hand the next request a connection with a pending transaction
+    if connection.in_transaction:
+      connection.rollback()
+    self._idle.put(connection)
+    with self._lock:
+      self._stats['in_use'] -= 1
+    self._slots.release()
+
+  def close_all(self):
+    """Close every idle connection, e.g. before the database file is removed."""
+    while True:
+      try:
+        connection = self._idle.get_nowait()
+      except queue.Empty:
+        break
+      connection.close()
+      with self._lock:
+        self._stats['closed'] += 1
+
+  def stats(self):
+    with self._lock:
+      stats = dict(self._stats)
+    stats['idle'] = self._idle.qsize()
+    stats['max_size'] = self.max_size
+    return stats
@@ -0,0 +1,79 @@
+import re
+
+# Query plan checks for captured statements (see RequestMetrics.capture_statements).
+# Each statement is run through EXPLAIN QUERY PLAN with the parameters it was
+# issued with; a full scan of a large table (through an index too, unless the
+# statement has a LIMIT) or a temp B-tree sort is reported as a problem unless
+# the (route, problem) pair is allowlisted.
+
+# Tables expected to grow with the vocabulary or the study history
+LARGE_TABLES = {
+  'words', 'word_reviews', 'word_groups', 'word_schedules',
+  'study_sessions', 'word_review_items', 'daily_study_stats', 'daily_group_activity',
+}
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b', re.IGNORECASE)
+TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(?:temp\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+SCAN = re.compile(r'^SCAN (\w+)(.*)$')
+TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (.+)$')
+LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+# Words that can follow a table name but are not aliases
+KEYWORDS = {
+  'where', 'join', 'left', 'inner', 'cross', 'on', 'group', 'order', 'limit', 'set',
+  'values', 'select', 'default', 'using', 'natural', 'union', 'as', 'having', 'window',
+}
+
+def table_aliases(sql):
+  """Map every alias (and bare table name) in `sql` to its table."""
+  aliases = {}
+  for table, alias in TABLE_REFERENCE.findall(sql):
+    aliases[table] = table
+    if alias and alias.lower() not in KEYWORDS:
+      aliases[alias] = table
+  return aliases
+
+def explain(cursor, sql, parameters=None):
+  cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters if parameters is not None else ())
+  return [row[3] for row in cursor.fetchall()]
+
+def plan_problems(sql, details, large_tables=LARGE_TABLES):
+  """Problems in one statement's plan, e.g. 'SCAN word_review_items' or 'TEMP B-TREE FOR ORDER BY'."""
+  aliases = table_aliases(sql)
+  limited = LIMIT.search(sql) is not None
+  problems = []
+  for detail in details:
+    scan = SCAN.match(detail)
+    # "SCAN t USING [COVERING] INDEX" walks an index in order and stops at the
+    # LIMIT, but without one it reads every entry; a bare "SCAN t" reads the
+    # whole table
+    if scan and 'VIRTUAL TABLE' not in scan.group(2):
+      table = aliases.get(scan.group(1), scan.group(1))
+      if table in large_tables and 'USING' not in scan.group(2):
+        problems.append(f'SCAN {table}')
+      elif table in large_tables and not limited:
+        problems.append(f'SCAN {table} USING INDEX')
+    temp = TEMP_BTREE.search(detail)
+    if temp:
+      problems.append(f'TEMP B-TREE FOR {temp.group(1)}')
+  return problems
+
+def check_statements(cursor, statements, allowlist=None, large_tables=LARGE_TABLES):
+  """Explain captured (method, route, sql, parameters) tuples.
+
+  Returns one (endpoint, problem, sql) per problem not covered by `allowlist`,
+  a mapping of (endpoint, problem) to the reason it is accepted, where an
+  endpoint is the method and URL rule, e.g. 'GET /words/<int:word_id>'.
+  """
+  allowlist = allowlist or {}
+  failures = []
+  seen = set()
+  for method, route, sql, parameters in statements:
+    if not EXPLAINABLE.match(sql) or (method, route, sql) in seen:
+      continue
+    seen.add((method, route, sql))
+    endpoint = f'{method} {route}'
+    for problem in plan_problems(sql, explain(cursor, sql, parameters), large_tables):
+      if (endpoint, problem) not in allowlist:
+        failures.append((endpoint, problem, ' '.join(sql.split())))
+  return failures
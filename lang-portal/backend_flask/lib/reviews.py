@@ -0,0 +1,95 @@
+import json
+
+from lib.srs import schedule_reviews
+from lib.stats import record_review_stats, word_review_counts
+
+# Write-side bookkeeping for review batches. Callers run these inside the same
+# transaction as the word_review_items inserts so counters never drift.
+
+# Tables a review batch writes, for response cache invalidation
+REVIEW_TABLES = ('word_review_items', 'word_reviews', 'word_schedules', 'study_sessions', 'study_totals', 'daily_study_stats')
+
+def invalidate_reviews(cache, vocabulary, word_ids):
+  """Invalidate the tables review batches for `word_ids` wrote, once committed.
+
+  The vocabulary index, when enabled, is told which words' counters changed.
+  """
+  if vocabulary is None:
+    cache.invalidate(*REVIEW_TABLES)
+    return
+  cache.invalidate(*(table for table in REVIEW_TABLES if table != 'word_reviews'))
+  vocabulary.reviewed(word_ids)
+
+def find_missing_word(cursor, word_ids):
+  """Return a row holding one of `word_ids` that has no row in words, or None if all exist.
+
+  The id is the row's `value`; callers test the row itself, since the id can be NULL.
+  """
+  # A single set lookup: the ids travel as one JSON array parameter, which
+  # also sidesteps SQLite's bound-variable limit on large batches
+  cursor.execute('''
+    SELECT ids.value
+    FROM json_each(?) ids
+    LEFT JOIN words w ON w.id = ids.value
+    WHERE w.id IS NULL
+    LIMIT 1
+  ''', (json.dumps(list(word_ids)),))
+  return cursor.fetchone()
+
+def record_reviews(cursor, study_session_id, reviews, reviewed_at, day):
+  """Insert a validated batch of (word_id, correct) pairs and update the counters and schedules.
+
+  `reviewed_at` is the stored UTC timestamp and `day` the local study day it falls on.
+  """
+  cursor.executemany(
+    'INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)',
+    [(word_id, study_session_id, 1 if correct else 0, reviewed_at) for word_id, correct in reviews]
+  )
+  deltas = fold_reviews(reviews)
+  previous = word_review_counts(cursor, deltas.keys())
+  update_word_reviews(cursor, deltas, reviewed_at)
+  record_review_stats(cursor, deltas, previous, day)
+  schedule_reviews(cursor, reviews, reviewed_at)
+  update_session_summary(cursor, study_session_id, reviews, reviewed_at)
+
+def fold_reviews(reviews):
+  """Fold (word_id, correct) pairs into one (correct, wrong) delta per word."""
+  deltas = {}
+  for word_id, correct in reviews:
+    correct_count, wrong_count = deltas.get(word_id, (0, 0))
+    if correct:
+      correct_count += 1
+    else:
+      wrong_count += 1
+    deltas[word_id] = (correct_count, wrong_count)
+  return deltas
+
+def update_word_reviews(cursor, deltas, reviewed_at):
+  """Upsert the per-word counters, one statement per word in the batch."""
+  cursor.executemany('''
+    INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (word_id) DO UPDATE SET
+      correct_count = correct_count + excluded.correct_count,
+      wrong_count = wrong_count + excluded.wrong_count,
+      last_reviewed = excluded.last_reviewed
+  ''', [
+    (word_id, correct_count, wrong_count, reviewed_at)
+    for word_id, (correct_count, wrong_count) in deltas.items()
+  ])
+
+def update_session_summary(cursor, study_session_id, reviews, reviewed_at):
+  """Advance the session's review counts and activity window by one batch.
+
+  An explicitly ended session (ended_at set) is stretched to cover late batches.
+  """
+  correct_count = sum(1 for _, correct in reviews if correct)
+  cursor.execute('''
+    UPDATE study_sessions SET
+      review_count = review_count + ?,
+      correct_count = correct_count + ?,
+      first_activity_at = COALESCE(first_activity_at, ?),
+      last_activity_at = ?,
+      ended_at = MAX(ended_at, ?)
+    WHERE id = ?
+  ''', (len(reviews), correct_count, reviewed_at, reviewed_at, reviewed_at, study_session_id))
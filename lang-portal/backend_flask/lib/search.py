@@ -0,0 +1,17 @@
+import re
+
+# User input is never passed to MATCH as-is: FTS5 query syntax (quotes,
+# AND/OR/NOT, column filters, parentheses) would turn typos into syntax errors.
+# Each word becomes a quoted term and all terms must match. The last term is a
+# prefix query unless the input ends with a space, so results follow typing.
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+def fts_query(text):
+  """Build an FTS5 MATCH expression from free text, or None if it has no terms."""
+  terms = TERM_PATTERN.findall(text or '')
+  if not terms:
+    return None
+  quoted = [f'"{term}"' for term in terms]
+  if not text[-1].isspace():
+    quoted[-1] += '*'
+  return ' '.join(quoted)
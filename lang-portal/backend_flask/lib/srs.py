@@ -0,0 +1,122 @@
+import json
+from datetime import timedelta
+
+from lib.clock import parse_timestamp, utc_timestamp
+
+# SM-2 spaced repetition. Each word keeps an ease factor, the interval (in
+# days) until its next review and its run of successful repetitions; every
+# review moves due_at forward. The queue of a group is word_groups ordered by
+# the (group_id, due_at) index, so serving the next words is a single seek.
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# Intervals compound, so cap them (and due_at) at about a hundred years
+MAX_INTERVAL_DAYS = 36500
+
+# Reviews are pass/fail, mapped onto SM-2's 0-5 response quality
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+
+def next_schedule(ease, interval_days, repetitions, correct):
+  """Apply one review to (ease, interval_days, repetitions) and return the new state."""
+  quality = CORRECT_QUALITY if correct else WRONG_QUALITY
+  if quality >= 3:
+    if repetitions == 0:
+      interval_days = 1
+    elif repetitions == 1:
+      interval_days = 6
+    else:
+      interval_days = min(MAX_INTERVAL_DAYS, round(interval_days * ease))
+    repetitions += 1
+  else:
+    # A lapse starts the word over, but keeps the (lowered) ease
+    repetitions = 0
+    interval_days = 1
+  ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+  return ease, interval_days, repetitions
+
+def schedule_reviews(cursor, reviews, reviewed_at):
+  """Reschedule every word in a batch of (word_id, correct) pairs, in review order."""
+  word_ids = list(dict.fromkeys(word_id for word_id, _ in reviews))
+  cursor.execute('''
+    SELECT s.word_id, s.ease, s.interval_days, s.repetitions
+    FROM json_each(?) ids
+    JOIN word_schedules s ON s.word_id = ids.value
+  ''', (json.dumps(word_ids),))
+  schedules = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+  for word_id, correct in reviews:
+    state = schedules.get(word_id, (DEFAULT_EASE, 0, 0))
+    schedules[word_id] = next_schedule(*state, correct)
+
+  reviewed = parse_timestamp(reviewed_at)
+  rows = []
+  for word_id in word_ids:
+    ease, interval_days, repetitions = schedules[word_id]
+    due_at = utc_timestamp(reviewed + timedelta(days=interval_days))
+    rows.append((word_id, ease, interval_days, repetitions, due_at, reviewed_at))
+  cursor.executemany('''
+    INSERT INTO word_schedules (word_id, ease, interval_days, repetitions, due_at, reviewed_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (word_id) DO UPDATE SET
+      ease = excluded.ease,
+      interval_days = excluded.interval_days,
+      repetitions = excluded.repetitions,
+      due_at = excluded.due_at,
+      reviewed_at = excluded.reviewed_at
+  ''', rows)
+
+def reset_schedules(cursor, now):
+  """Forget all scheduling state; every word becomes due at `now`."""
+  cursor.execute('''
+    UPDATE word_schedules
+    SET ease = ?, interval_days = 0, repetitions = 0, due_at = ?, reviewed_at = NULL
+  ''', (DEFAULT_EASE, now))
+
+def next_words(cursor, group_id, n):
+  """The `n` words of a group that are due soonest (overdue first)."""
+  cursor.execute('''
+    SELECT w.id, w.spanish, w.pronunciation, w.english, w.parts,
+        s.ease, s.interval_days, s.repetitions, wg.due_at
+    FROM word_groups wg
+    JOIN words w ON w.id = wg.word_id
+    JOIN word_schedules s ON s.word_id = wg.word_id
+    WHERE wg.group_id = ?
+    ORDER BY wg.due_at, wg.word_id
+    LIMIT ?
+  ''', (group_id, n))
+  return cursor.fetchall()
+
+def next_learner_words(cursor, group_id, n, now):
+  """next_words on a learner database (lib/learners.py).
+
+  word_groups.due_at follows the shared schedules, so the group is ordered by
+  the learner's own; a word they never reviewed is due `now`. Both halves are
+  index walks that stop after `n` rows: the learner's schedules soonest due
+  first, keeping the group's words, and the group's unscheduled words by id.
+  The CROSS JOINs keep the schedules as the outer loop, which the planner
+  would otherwise swap for a sort.
+  """
+  cursor.execute('''
+    SELECT w.id, w.spanish, w.pronunciation, w.english, w.parts,
+        s.ease, s.interval_days, s.repetitions, s.due_at
+    FROM word_schedules s
+    CROSS JOIN word_groups wg ON wg.word_id = s.word_id AND wg.group_id = ?
+    CROSS JOIN words w ON w.id = s.word_id
+    ORDER BY s.due_at, s.word_id
+    LIMIT ?
+  ''', (group_id, n))
+  scheduled = cursor.fetchall()
+  cursor.execute('''
+    SELECT w.id, w.spanish, w.pronunciation, w.english, w.parts,
+        ? AS ease, 0 AS interval_days, 0 AS repetitions, ? AS due_at
+    FROM word_groups wg
+    JOIN words w ON w.id = wg.word_id
+    WHERE wg.group_id = ?
+      AND NOT EXISTS (SELECT 1 FROM word_schedules s WHERE s.word_id = wg.word_id)
+    ORDER BY wg.word_id
+    LIMIT ?
+  ''', (DEFAULT_EASE, now, group_id, n))
+  unscheduled = cursor.fetchall()
+  # Merge the two ordered runs
+  return sorted(scheduled + unscheduled, key=lambda word: (word['due_at'], word['id']))[:n]
@@ -0,0 +1,112 @@
+import json
+
+from lib.clock import days_between, today
+
+# Rollups behind /dashboard/stats. Every session and review batch folds itself
+# into daily_study_stats, daily_group_activity and the single study_totals row,
+# so the dashboard never aggregates the review history on read. Days are local
+# to STUDY_TIMEZONE (see lib/clock.study_day) and passed in by the caller.
+
+# A word counts as mastered after enough attempts at a high enough success
+# rate (sql/rebuild/study_stats.sql applies the same thresholds)
+MASTERY_MIN_ATTEMPTS = 5
+MASTERY_MIN_SUCCESS_RATE = 0.8
+
+def is_mastered(correct_count, wrong_count):
+  attempts = correct_count + wrong_count
+  return attempts >= MASTERY_MIN_ATTEMPTS and correct_count * 1.0 / attempts >= MASTERY_MIN_SUCCESS_RATE
+
+def record_session(cursor, group_id, day):
+  """Count a new study session towards its day, its group's activity and the totals."""
+  cursor.execute('''
+    INSERT INTO daily_study_stats (day, sessions_count) VALUES (?, 1)
+    ON CONFLICT (day) DO UPDATE SET sessions_count = sessions_count + 1
+  ''', (day,))
+  cursor.execute('''
+    INSERT INTO daily_group_activity (day, group_id, sessions_count) VALUES (?, ?, 1)
+    ON CONFLICT (day, group_id) DO UPDATE SET sessions_count = sessions_count + 1
+  ''', (day, group_id))
+  cursor.execute('UPDATE study_totals SET sessions_count = sessions_count + 1 WHERE id = 1')
+  record_study_day(cursor, day)
+
+def record_study_day(cursor, day):
+  """Extend, restart or keep the streak for activity on `day`, in O(1).
+
+  The stored current_streak is the run ending on last_study_day; whether that
+  run is still alive is decided when it is read (see current_streak).
+  """
+  cursor.execute('SELECT current_streak, longest_streak, last_study_day FROM study_totals WHERE id = 1')
+  streak, longest, last_day = cursor.fetchone()
+  if last_day is not None and day <= last_day:
+    # Same day, or a late write for a day already counted
+    return
+  if last_day is not None and days_between(last_day, day) == 1:
+    streak += 1
+  else:
+    streak = 1
+  cursor.execute('''
+    UPDATE study_totals SET current_streak = ?, longest_streak = ?, last_study_day = ?
+    WHERE id = 1
+  ''', (streak, max(longest, streak), day))
+
+def current_streak(totals, tz):
+  """The run still alive today: it survives until a whole local day is missed."""
+  last_day = totals['last_study_day']
+  if last_day is None or days_between(last_day, today(tz).isoformat()) > 1:
+    return 0
+  return totals['current_streak']
+
+def word_review_counts(cursor, word_ids):
+  """Current (correct_count, wrong_count) per word, fetched with one set lookup."""
+  cursor.execute('''
+    SELECT r.word_id, r.correct_count, r.wrong_count
+    FROM json_each(?) ids
+    JOIN word_reviews r ON r.word_id = ids.value
+  ''', (json.dumps(list(word_ids)),))
+  return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+def record_review_stats(cursor, deltas, previous, day):
+  """Fold a review batch into the rollups.
+
+  `deltas` maps word_id to the batch's (correct, wrong) counts and `previous`
+  to the word's counters before the batch, which is all it takes to know how
+  many words became studied or mastered.
+  """
+  reviews_count = 0
+  correct_count = 0
+  newly_studied = 0
+  mastered_change = 0
+  for word_id, (correct, wrong) in deltas.items():
+    before_correct, before_wrong = previous.get(word_id, (0, 0))
+    reviews_count += correct + wrong
+    correct_count += correct
+    if before_correct + before_wrong == 0:
+      newly_studied += 1
+    mastered_change += is_mastered(before_correct + correct, before_wrong + wrong) - is_mastered(before_correct, before_wrong)
+
+  cursor.execute('''
+    INSERT INTO daily_study_stats (day, reviews_count, correct_count) VALUES (?, ?, ?)
+    ON CONFLICT (day) DO UPDATE SET
+      reviews_count = reviews_count + excluded.reviews_count,
+      correct_count = correct_count + excluded.correct_count
+  ''', (day, reviews_count, correct_count))
+  cursor.execute('''
+    UPDATE study_totals SET
+      reviews_count = reviews_count + ?,
+      correct_count = correct_count + ?,
+      words_studied = words_studied + ?,
+      mastered_words = mastered_words + ?
+    WHERE id = 1
+  ''', (reviews_count, correct_count, newly_studied, mastered_change))
+  record_study_day(cursor, day)
+
+def reset_study_stats(cursor):
+  cursor.execute('DELETE FROM daily_study_stats')
+  cursor.execute('DELETE FROM daily_group_activity')
+  cursor.execute('''
+    UPDATE study_totals SET
+      sessions_count = 0, reviews_count = 0, correct_count = 0,
+      words_studied = 0, mastered_words = 0,
+      current_streak = 0, longest_streak = 0, last_study_day = NULL
+    WHERE id = 1
+  ''')
@@ -0,0 +1,347 @@
+import bisect
+import json
+import sys
+import threading
+import time
+from array import array
+
+# Optional in-process copy of the vocabulary (VOCABULARY_INDEX). Words are kept
+# as column arrays in id order, with one permutation per sort column listing
+# the positions by (value, id); a desc page walks the same permutation from the
+# end, which is the (value desc, id desc) order SQL returns. /words,
+# /words/<id> and /groups/<id>/words are then answered from memory in
+# O(page size). A snapshot is rebuilt when one of its tables is invalidated in
+# the response cache, or after `ttl` seconds for writes from other processes.
+# Review batches report the words they counted through reviewed(), so when
+# only those changed just their counters are re-read and moved.
+
+SORT_COLUMNS = ('spanish', 'pronunciation', 'english', 'correct_count', 'wrong_count')
+TEXT_COLUMNS = ('spanish', 'pronunciation', 'english')
+COUNT_COLUMNS = ('correct_count', 'wrong_count')
+TABLES = ('words', 'word_reviews', 'word_groups', 'groups')
+# A counter refresh re-sorts a count order outright when more than 1/N of
+# the words changed (e.g. after a reset); fewer are moved one by one
+RESORT_FRACTION = 16
+
+class OverBudget(Exception):
+  pass
+
+def array_bytes(values):
+  return sys.getsizeof(values) if isinstance(values, array) else 0
+
+def list_bytes(values):
+  return sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+
+class VocabularySnapshot:
+  """One immutable copy of the words, their counters and group memberships."""
+
+  def __init__(self, ids, text, counts, groups, memberships):
+    self.ids = ids                  # array of word ids, ascending; a word's position is its index
+    self.text = text                # column -> list of str, by position
+    self.counts = counts            # column -> array of ints, by position
+    self.groups = groups            # group id -> (name, words_count)
+    # (group id, position) pairs sorted both ways, as parallel arrays
+    self.by_group, self.by_word = memberships
+    self.orders = {column: self._sorted(range(len(ids)), column) for column in SORT_COLUMNS}
+    self._group_orders = {}
+    self._shared_bytes = None
+    self._lock = threading.Lock()
+
+  def with_counts(self, counts, changed):
+    """A copy with new counters; the text columns and their orders are shared.
+
+    `changed` lists the positions whose counters differ from this snapshot's.
+    Only those are moved in the count orders, unless so many changed that one
+    sort is cheaper.
+    """
+    snapshot = VocabularySnapshot.__new__(VocabularySnapshot)
+    snapshot.__dict__.update(self.__dict__)
+    snapshot.counts = counts
+    snapshot.orders = dict(self.orders)
+    for column in COUNT_COLUMNS:
+      moved = [position for position in changed if counts[column][position] != self.counts[column][position]]
+      if len(moved) > len(self.ids) // RESORT_FRACTION:
+        snapshot.orders[column] = snapshot._sorted(range(len(self.ids)), column)
+      elif moved:
+        snapshot.orders[column] = self._reordered(self.orders[column], moved, self.counts[column], counts[column])
+    snapshot._group_orders = {key: order for key, order in self._group_orders.items() if key[1] in TEXT_COLUMNS}
+    snapshot._lock = threading.Lock()
+    return snapshot
+
+  @staticmethod
+  def _reordered(order, moved, old_values, new_values):
+    # Positions are in id order, so (value, position) sorts like (value, id).
+    # Take every moved position out first, while the rest still hold their
+    # old values, then put each back at its new place.
+    order = array('l', order)
+    for position in moved:
+      del order[bisect.bisect_left(order, (old_values[position], position), key=lambda p: (old_values[p], p))]
+    for position in moved:
+      order.insert(bisect.bisect_left(order, (new_values[position], position), key=lambda p: (new_values[p], p)), position)
+    return order
+
+  def _column(self, column):
+    return self.text[column] if column in TEXT_COLUMNS else self.counts[column]
+
+  def _sorted(self, positions, column):
+    # `positions` come in id order and the sort is stable, so equal values
+    # stay ordered by id without building (value, id) keys
+    return array('l', sorted(positions, key=self._column(column).__getitem__))
+
+  @property
+  def words_count(self):
+    return len(self.ids)
+
+  def group(self, group_id):
+    """The group's name and words_count, or None when there is no such group."""
+    group = self.groups.get(group_id)
+    if group is None:
+      return None
+    return {'name': group[0], 'words_count': group[1]}
+
+  def position(self, word_id):
+    position = bisect.bisect_left(self.ids, word_id)
+    if position < len(self.ids) and self.ids[position] == word_id:
+      return position
+    return None
+
+  def row(self, position):
+    return {
+      'id': self.ids[position],
+      'spanish': self.text['spanish'][position],
+      'pronunciation': self.text['pronunciation'][position],
+      'english': self.text['english'][position],
+      'correct_count': self.counts['correct_count'][position],
+      'wrong_count': self.counts['wrong_count'][position],
+    }
+
+  def word(self, word_id):
+    """The word's row plus its groups, or None when there is no such word."""
+    position = self.position(word_id)
+    if position is None:
+      return None
+    word = self.row(position)
+    groups_of, positions = self.by_word
+    start = bisect.bisect_left(positions, position)
+    end = bisect.bisect_right(positions, position)
+    word['groups'] = [{'id': group_id, 'name': self.groups[group_id][0]} for group_id in groups_of[start:end]]
+    return word
+
+  def group_order(self, group_id, column):
+    """Positions of the group's words by (column, id), sorted on first use."""
+    key = (group_id, column)
+    order = self._group_orders.get(key)
+    if order is None:
+      group_ids, positions = self.by_group
+      start = bisect.bisect_left(group_ids, group_id)
+      end = bisect.bisect_right(group_ids, group_id)
+      order = self._sorted(positions[start:end], column)
+      with self._lock:
+        self._group_orders[key] = order
+    return order
+
+  def page(self, sort_by, order, limit, offset=0, after=None, group_id=None):
+    """Up to `limit` rows in (sort_by, id) order, like the SQL listings.
+
+    `after` is the (value, id) of a keyset cursor. Returns None when the cursor
+    value cannot be compared with the column, so the caller can ask SQLite.
+    """
+    positions = self.orders[sort_by] if group_id is None else self.group_order(group_id, sort_by)
+    count = len(positions)
+    if after is not None:
+      value, last_id = after
+      expected = str if sort_by in TEXT_COLUMNS else int
+      if not isinstance(value, expected) or isinstance(value, bool) or not isinstance(last_id, int):
+        return None
+      values = self._column(sort_by)
+      ids = self.ids
+      key = lambda position: (values[position], ids[position])
+      if order == 'asc':
+        start = bisect.bisect_right(positions, (value, last_id), key=key)
+      else:
+        start = count - bisect.bisect_left(positions, (value, last_id), key=key)
+    else:
+      start = max(0, offset)
+    ranks = range(start, min(start + limit, count))
+    if order == 'desc':
+      return [self.row(positions[count - 1 - rank]) for rank in ranks]
+    return [self.row(positions[rank]) for rank in ranks]
+
+  def memory_bytes(self):
+    if self._shared_bytes is None:
+      # Walking the strings is O(words), but counter refreshes share them
+      # (and this total) with the snapshot they were made from
+      self._shared_bytes = sum(list_bytes(values) for values in self.text.values())
+      self._shared_bytes += sys.getsizeof(self.groups) + sum(list_bytes(group) for group in self.groups.values())
+    total = self._shared_bytes + array_bytes(self.ids)
+    total += sum(array_bytes(values) for values in self.counts.values())
+    total += sum(array_bytes(order) for order in self.orders.values())
+    total += sum(array_bytes(values) for values in self.by_group + self.by_word)
+    total += sum(array_bytes(order) for order in list(self._group_orders.values()))
+    return total
+
+class VocabularyIndex:
+  """Builds and refreshes the snapshot; falls back (returns None) over budget."""
+
+  def __init__(self, db, cache, max_bytes=256 * 1024 * 1024, ttl=60.0):
+    self.db = db
+    self.cache = cache
+    self.max_bytes = max_bytes
+    self.ttl = ttl
+    # (table versions, expiry, snapshot), replaced as a whole so readers never
+    # see a snapshot paired with another one's versions
+    self._state = (None, 0.0, None)
+    self._lock = threading.Lock()
+    # Words reported by reviewed() since the last refresh, and how many
+    # word_reviews invalidations they account for
+    self._reviewed = set()
+    self._reports = 0
+    self._reviewed_lock = threading.Lock()
+    self._stats = {'loads': 0, 'count_refreshes': 0, 'counters_read': 0, 'over_budget': 0, 'memory_bytes': 0, 'words': 0}
+
+  def _current(self, state, versions):
+    state_versions, expires_at, snapshot = state
+    if time.monotonic() >= expires_at:
+      return False
+    # Over budget, stay on SQLite until the TTL rather than reloading per write
+    return snapshot is None or state_versions == versions
+
+  def reviewed(self, word_ids):
+    """Invalidate word_reviews after a committed write that counted `word_ids`.
+
+    Other word_reviews invalidations (e.g. a reset) re-read every counter.
+    """
+    with self._reviewed_lock:
+      self._reviewed.update(word_ids)
+      self._reports += 1
+      self.cache.invalidate('word_reviews')
+
+  def snapshot(self):
+    """The current snapshot, refreshed if its tables changed; None to use SQLite."""
+    versions = self.cache.versions(*TABLES)
+    state = self._state
+    if not self._current(state, versions):
+      with self._lock:
+        # Take the versions together with the words reported up to them; a
+        # snapshot already current (or over budget) has no use for those
+        with self._reviewed_lock:
+          versions = self.cache.versions(*TABLES)
+          reviewed, reports = self._reviewed, self._reports
+          self._reviewed, self._reports = set(), 0
+        # Another request may have refreshed it while this one waited
+        state = self._state
+        if not self._current(state, versions):
+          state = self._state = self._refresh(state, versions, reviewed, reports)
+    return state[2]
+
+  def _refresh(self, state, versions, reviewed, reports):
+    old_versions, expires_at, old = state
+    cursor = self.db.read_cursor()
+    only_counts = (
+      old is not None and time.monotonic() < expires_at
+      and all(before == after for table, before, after in zip(TABLES, old_versions, versions) if table != 'word_reviews')
+    )
+    try:
+      if only_counts:
+        # Keeps the full load's expiry, so other processes' writes to words
+        # still show up within the TTL
+        review_versions = versions[TABLES.index('word_reviews')] - old_versions[TABLES.index('word_reviews')]
+        if review_versions == reports:
+          snapshot = old.with_counts(*self._load_reviewed_counts(cursor, old, reviewed))
+        else:
+          snapshot = old.with_counts(*self._load_counts(cursor, old))
+        self._stats['count_refreshes'] += 1
+      else:
+        snapshot = self._load(cursor)
+        expires_at = time.monotonic() + self.ttl
+        self._stats['loads'] += 1
+      memory = snapshot.memory_bytes()
+      if memory > self.max_bytes:
+        raise OverBudget()
+    except OverBudget:
+      # Serve from SQLite until the TTL, then measure again
+      snapshot, memory = None, 0
+      expires_at = time.monotonic() + self.ttl
+      self._stats['over_budget'] += 1
+    self._stats['memory_bytes'] = memory
+    self._stats['words'] = snapshot.words_count if snapshot else 0
+    return (versions, expires_at, snapshot)
+
+  def _load(self, cursor):
+    ids = array('q')
+    text = {column: [] for column in TEXT_COLUMNS}
+    counts = {column: array('q') for column in COUNT_COLUMNS}
+    # Stop reading once the strings alone exceed the budget
+    text_bytes = 0
+    cursor.execute('''
+      SELECT w.id, w.spanish, w.pronunciation, w.english, r.correct_count, r.wrong_count
+      FROM words w
+      JOIN word_reviews r ON r.word_id = w.id
+      ORDER BY w.id
+    ''')
+    for word_id, spanish, pronunciation, english, correct_count, wrong_count in cursor:
+      ids.append(word_id)
+      text['spanish'].append(spanish)
+      text['pronunciation'].append(pronunciation)
+      text['english'].append(english)
+      counts['correct_count'].append(correct_count)
+      counts['wrong_count'].append(wrong_count)
+      text_bytes += sys.getsizeof(spanish) + sys.getsizeof(pronunciation) + sys.getsizeof(english)
+      if text_bytes > self.max_bytes:
+        raise OverBudget()
+
+    cursor.execute('SELECT id, name, words_count FROM groups')
+    groups = {group_id: (name, words_count) for group_id, name, words_count in cursor.fetchall()}
+
+    cursor.execute('SELECT group_id, word_id FROM word_groups')
+    pairs = []
+    for group_id, word_id in cursor:
+      position = bisect.bisect_left(ids, word_id)
+      if position < len(ids) and ids[position] == word_id:
+        pairs.append((group_id, position))
+    pairs.sort()
+    by_group = (array('q', (group_id for group_id, _ in pairs)), array('l', (position for _, position in pairs)))
+    pairs.sort(key=lambda pair: (pair[1], pair[0]))
+    by_word = (array('q', (group_id for group_id, _ in pairs)), array('l', (position for _, position in pairs)))
+    return VocabularySnapshot(ids, text, counts, groups, (by_group, by_word))
+
+  def _load_counts(self, cursor, old):
+    """The counters by position, and the positions whose counters changed since `old`."""
+    ids = old.ids
+    counts = {column: array('q', bytes(8 * len(ids))) for column in COUNT_COLUMNS}
+    cursor.execute('SELECT word_id, correct_count, wrong_count FROM word_reviews')
+    for word_id, correct_count, wrong_count in cursor:
+      self._stats['counters_read'] += 1
+      position = bisect.bisect_left(ids, word_id)
+      if position < len(ids) and ids[position] == word_id:
+        counts['correct_count'][position] = correct_count
+        counts['wrong_count'][position] = wrong_count
+    changed = [
+      position for position, (correct_count, wrong_count, old_correct, old_wrong) in enumerate(zip(
+        counts['correct_count'], counts['wrong_count'], old.counts['correct_count'], old.counts['wrong_count']))
+      if correct_count != old_correct or wrong_count != old_wrong
+    ]
+    return counts, changed
+
+  def _load_reviewed_counts(self, cursor, old, word_ids):
+    """Like _load_counts, reading only the counters of `word_ids`."""
+    counts = {column: array('q', old.counts[column]) for column in COUNT_COLUMNS}
+    changed = []
+    cursor.execute('''
+      SELECT r.word_id, r.correct_count, r.wrong_count
+      FROM json_each(?) ids
+      JOIN word_reviews r ON r.word_id = ids.value
+    ''', (json.dumps(sorted(word_ids)),))
+    for word_id, correct_count, wrong_count in cursor:
+      self._stats['counters_read'] += 1
+      position = old.position(word_id)
+      if position is None:
+        continue
+      if (correct_count, wrong_count) != (counts['correct_count'][position], counts['wrong_count'][position]):
+        counts['correct_count'][position] = correct_count
+        counts['wrong_count'][position] = wrong_count
+        changed.append(position)
+    return counts, changed
+
+  def stats(self):
+    return dict(self._stats, max_bytes=self.max_bytes)
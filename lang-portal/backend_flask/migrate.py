@@ -1,29 +1,52 @@
 import sqlite3
 import os
 
-def run_migrations():
-    # Connect to the database
-    db_path = os.path.join(os.path.dirname(__file__), 'word_bank.db')
-    conn = sqlite3.connect(db_path)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'sql', 'migrations')
+
+def applied_migrations(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version TEXT PRIMARY KEY,  -- Migration file name without the .sql extension
+          applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+def run_migrations(database=None, migrations_dir=MIGRATIONS_DIR, log=print):
+    # Default to the same database the app uses (DATABASE_PATH or words.db)
+    if database is None:
+        from app import create_app
+        database = create_app().db.database
+
+    # Autocommit mode, so each migration controls its own transaction
+    conn = sqlite3.connect(database, isolation_level=None)
     conn.row_factory = sqlite3.Row
-    
+
     try:
-        # Get list of migration files
-        migrations_dir = os.path.join(os.path.dirname(__file__), 'sql', 'migrations')
+        applied = applied_migrations(conn)
+
+        # Get list of pending migration files, in version order
         migration_files = sorted([f for f in os.listdir(migrations_dir) if f.endswith('.sql')])
-        
-        # Run each migration
-        for migration_file in migration_files:
-            print(f"Running migration: {migration_file}")
+        pending = [f for f in migration_files if f[:-len('.sql')] not in applied]
+
+        # Run each migration and record it in the same transaction, so a
+        # failure leaves neither a half-applied schema nor a version row
+        for migration_file in pending:
+            log(f"Running migration: {migration_file}")
             with open(os.path.join(migrations_dir, migration_file)) as f:
                 migration_sql = f.read()
-                conn.executescript(migration_sql)
-                conn.commit()
-        
-        print("Migrations completed successfully")
-    except Exception as e:
-        print(f"Error running migrations: {str(e)}")
-        conn.rollback()
+            try:
+                conn.executescript('BEGIN;\n' + migration_sql)
+                conn.execute('INSERT INTO schema_migrations (version) VALUES (?)', (migration_file[:-len('.sql')],))
+                conn.execute('COMMIT')
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                log(f"Error running migration {migration_file}: {str(e)}")
+                raise
+
+        log("Migrations completed successfully")
+        return pending
     finally:
         conn.close()
 
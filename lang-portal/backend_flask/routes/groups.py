@@ -1,13 +1,27 @@
-from flask import request, jsonify, g
-from flask_cors import cross_origin
-import json
+from flask import Response, request, jsonify, g, stream_with_context
+
+from lib.clock import seconds_between
+from lib.counters import row_count
+from lib.learners import learner_db
+from lib.membership import (
+  InvalidWordIds, add_staged_words, clear_staged_words, find_missing_staged_word,
+  parse_word_ids, read_word_ids, remove_staged_words, stage_word_ids
+)
+from lib.pagination import InvalidCursor, decode_cursor, keyset_condition, next_page
+
+# Rows fetched per round trip when streaming /groups/:id/words/raw
+RAW_WORDS_CHUNK_SIZE = 500
+
+def wants_ndjson():
+  # Only an explicit preference counts; "*/*" still gets the JSON document
+  return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
 
 def load(app):
   @app.route('/groups', methods=['GET'])
-  @cross_origin()
+  @app.cache.cached('groups')
   def get_groups():
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
 
       # Get the current page number from query parameters (default is 1)
       page = int(request.args.get('page', 1))
@@ -25,19 +39,18 @@ def load(app):
       if order not in ['asc', 'desc']:
         order = 'asc'
 
-      # Query to fetch groups with sorting and the cached word count
+      # Query to fetch groups with sorting and the cached word count (id breaks ties)
       cursor.execute(f'''
         SELECT id, name, words_count
         FROM groups
-        ORDER BY {sort_by} {order}
+        ORDER BY {sort_by} {order}, id {order}
         LIMIT ? OFFSET ?
       ''', (groups_per_page, offset))
 
       groups = cursor.fetchall()
 
       # Query the total number of groups
-      cursor.execute('SELECT COUNT(*) FROM groups')
-      total_groups = cursor.fetchone()[0]
+      total_groups = row_count(cursor, 'groups')
       total_pages = (total_groups + groups_per_page - 1) // groups_per_page
 
       # Format the response
@@ -59,10 +72,9 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/groups/<int:id>', methods=['GET'])
-  @cross_origin()
   def get_group(id):
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
 
       # Get group details
       cursor.execute('''
@@ -84,55 +96,86 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/groups/<int:id>/words', methods=['GET'])
-  @cross_origin()
   def get_group_words(id):
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
       
       # Get pagination parameters
       page = int(request.args.get('page', 1))
       words_per_page = 10
       offset = (page - 1) * words_per_page
 
+      # An opaque cursor (even an empty one) switches to keyset pagination
+      cursor_param = request.args.get('cursor')
+
       # Get sorting parameters
       sort_by = request.args.get('sort_by', 'spanish')
       order = request.args.get('order', 'asc')
 
       # Validate sort parameters
-      valid_columns = ['spanish', 'pronunciation', 'english', 'correct_count', 'wrong_count']
-      if sort_by not in valid_columns:
+      # Each sort reads the membership's copy of the word's sort key, so pages
+      # walk the (group_id, key, word_id) indexes of migration 0013
+      sort_columns = ['spanish', 'pronunciation', 'english', 'correct_count', 'wrong_count']
+      if sort_by not in sort_columns:
         sort_by = 'spanish'
       if order not in ['asc', 'desc']:
         order = 'asc'
+      sort_expr, id_expr = f'wg.{sort_by}', 'wg.word_id'
+
+      # The in-memory index, when enabled and within budget (see routes/words.py)
+      vocabulary = app.vocabulary.snapshot() if app.vocabulary is not None else None
 
       # First, check if the group exists
-      cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
-      group = cursor.fetchone()
+      if vocabulary is not None:
+        group = vocabulary.group(id)
+      else:
+        cursor.execute('SELECT name, words_count FROM groups WHERE id = ?', (id,))
+        group = cursor.fetchone()
       if not group:
         return jsonify({"error": "Group not found"}), 404
 
-      # Query to fetch words with pagination and sorting
-      cursor.execute(f'''
-        SELECT w.*, 
-               COALESCE(wr.correct_count, 0) as correct_count,
-               COALESCE(wr.wrong_count, 0) as wrong_count
-        FROM words w
-        JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN word_reviews wr ON w.id = wr.word_id
-        WHERE wg.group_id = ?
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (id, words_per_page, offset))
+      after = None
+      if cursor_param:
+        try:
+          after = decode_cursor(cursor_param, sort_by, order)
+        except InvalidCursor as e:
+          return jsonify({"error": str(e)}), 400
+
+      rows = None
+      if vocabulary is not None:
+        rows = vocabulary.page(sort_by, order, words_per_page + 1, offset=offset, after=after, group_id=id)
+
+      if rows is None:
+        keyset = ''
+        params = [id]
+        if after is not None:
+          keyset = 'AND ' + keyset_condition(sort_expr, id_expr, order)
+          params += list(after)
+        if cursor_param is None:
+          pagination = 'LIMIT ? OFFSET ?'
+          params += [words_per_page + 1, offset]
+        else:
+          pagination = 'LIMIT ?'
+          params += [words_per_page + 1]
+
+        # Query to fetch words with pagination and sorting
+        cursor.execute(f'''
+          SELECT w.*, 
+                 wg.correct_count,
+                 wg.wrong_count
+          FROM word_groups wg
+          JOIN words w ON w.id = wg.word_id
+          WHERE wg.group_id = ?
+          {keyset}
+          ORDER BY {sort_expr} {order}, {id_expr} {order}
+          {pagination}
+        ''', params)
+        rows = cursor.fetchall()
       
-      words = cursor.fetchall()
+      words, next_cursor = next_page(rows, words_per_page, sort_by, order)
 
-      # Get total words count for pagination
-      cursor.execute('''
-        SELECT COUNT(*) 
-        FROM word_groups 
-        WHERE group_id = ?
-      ''', (id,))
-      total_words = cursor.fetchone()[0]
+      # Total words for pagination, kept by the word_groups triggers
+      total_words = group['words_count']
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
       # Format the response
@@ -150,16 +193,72 @@ def load(app):
       return jsonify({
         'words': words_data,
         'total_pages': total_pages,
-        'current_page': page
+        'current_page': page if cursor_param is None else None,
+        'next_cursor': next_cursor
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  @app.route('/groups/<int:id>/words', methods=['POST', 'DELETE'])
+  def update_group_words(id):
+    """
+    Add (POST) or remove (DELETE) many words at once.
+
+    The body is either JSON, {"word_ids": [1, 2, ...]}, or a text/plain id
+    file with one word id per line, which is read as it streams in. Adding a
+    member twice or removing a non-member changes nothing. POST fails with 404,
+    and changes nothing, if any id is not a word.
+    """
+    try:
+      cursor = app.db.read_cursor()
+      cursor.execute('SELECT id FROM groups WHERE id = ?', (id,))
+      if not cursor.fetchone():
+        return jsonify({"error": "Group not found"}), 404
+
+      # Read the whole id list before taking the writer
+      try:
+        if request.mimetype == 'text/plain':
+          word_ids = read_word_ids(request.stream)
+        else:
+          data = request.get_json(silent=True)
+          if not isinstance(data, dict) or 'word_ids' not in data:
+            return jsonify({"error": "Invalid request format. 'word_ids' array is required"}), 400
+          word_ids = parse_word_ids(data['word_ids'])
+      except InvalidWordIds as e:
+        return jsonify({"error": str(e)}), 400
+      if not word_ids:
+        return jsonify({"error": "No word ids given"}), 400
+
+      with app.db.transaction() as cursor:
+        staged = stage_word_ids(cursor, word_ids)
+        if request.method == 'POST':
+          missing_word_id = find_missing_staged_word(cursor)
+          if missing_word_id is not None:
+            clear_staged_words(cursor)
+            return jsonify({"error": f"Word with id {missing_word_id} not found"}), 404
+          changed = add_staged_words(cursor, id)
+        else:
+          changed = remove_staged_words(cursor, id)
+        clear_staged_words(cursor)
+        cursor.execute('SELECT words_count FROM groups WHERE id = ?', (id,))
+        words_count = cursor.fetchone()[0]
+      if changed:
+        app.cache.invalidate('word_groups', 'groups')
+
+      return jsonify({
+        "group_id": id,
+        "word_ids_count": staged,
+        "added" if request.method == 'POST' else "removed": changed,
+        "words_count": words_count
       })
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   @app.route('/groups/<int:id>/words/raw', methods=['GET'])
-  @cross_origin()
+  @app.cache.cached('groups', 'words', 'word_groups')
   def get_group_words_raw(id):
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
       
       # First, check if the group exists
       cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
@@ -167,39 +266,40 @@ def load(app):
       if not group:
         return jsonify({"error": "Group not found"}), 404
       
-      # Query to fetch all words in the group with their complete data
-      cursor.execute('''
-        SELECT w.*
+      # Each word's JSON is kept serialized in words.raw_json (migration 0012),
+      # so rows are spliced into the body without decoding or encoding them
+      words_query = '''
+        SELECT w.raw_json
         FROM words w
         JOIN word_groups wg ON w.id = wg.word_id
         WHERE wg.group_id = ?
-      ''', (id,))
+      '''
       
-      words = cursor.fetchall()
+      # Streaming mode: one JSON word per line, read in chunks, so memory stays
+      # flat and the first words go out while the rest are still being read
+      if request.args.get('stream') == '1' or wants_ndjson():
+        def generate():
+          rows = app.db.read_cursor()
+          rows.execute(words_query, (id,))
+          while True:
+            words = rows.fetchmany(RAW_WORDS_CHUNK_SIZE)
+            if not words:
+              break
+            yield ''.join(word[0] + '\n' for word in words)
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
       
-      # Format the response with parsed parts field
-      words_data = []
-      for word in words:
-        parts = json.loads(word["parts"])
-        words_data.append({
-          "id": word["id"],
-          "spanish": word["spanish"],
-          "pronunciation": word["pronunciation"],
-          "english": word["english"],
-          "parts": parts
-        })
+      cursor.execute(words_query, (id,))
+      words = cursor.fetchall()
       
-      return jsonify({
-        'words': words_data
-      })
+      return Response('{"words":[' + ','.join(word[0] for word in words) + ']}', mimetype='application/json')
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   @app.route('/groups/<int:id>/study_sessions', methods=['GET'])
-  @cross_origin()
   def get_group_study_sessions(id):
     try:
-      cursor = app.db.cursor()
+      cursor = learner_db(app).read_cursor()
       
       # Get pagination parameters
       page = int(request.args.get('page', 1))
@@ -210,17 +310,20 @@ def load(app):
       sort_by = request.args.get('sort_by', 'created_at')
       order = request.args.get('order', 'desc')  # Default to newest first
 
-      # Map frontend sort keys to database columns
+      # Map frontend sort keys to database columns. The summary columns are
+      # maintained on write, so each sort is a range scan of a (group_id, ...) index
       sort_mapping = {
-        'startTime': 'created_at',
-        'endTime': 'last_activity_time',
+        'startTime': 's.created_at',
+        'endTime': 's.end_time',
         'activityName': 'a.name',
         'groupName': 'g.name',
-        'reviewItemsCount': 'review_count'
+        'reviewItemsCount': 's.review_count'
       }
 
       # Use mapped sort column or default to created_at
-      sort_column = sort_mapping.get(sort_by, 'created_at')
+      sort_column = sort_mapping.get(sort_by, 's.created_at')
+      if order not in ['asc', 'desc']:
+        order = 'desc'
 
       # Get total count for pagination
       cursor.execute('''
@@ -231,30 +334,23 @@ def load(app):
       total_sessions = cursor.fetchone()[0]
       total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
 
-      # Get study sessions for this group with dynamic calculations
+      # Get study sessions for this group (id breaks ties so pages never overlap)
       cursor.execute(f'''
         SELECT 
           s.id,
           s.group_id,
           s.study_activity_id,
           s.created_at as start_time,
-          (
-            SELECT MAX(created_at)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as last_activity_time,
+          s.end_time,
+          s.ended_at,
           a.name as activity_name,
           g.name as group_name,
-          (
-            SELECT COUNT(*)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as review_count
+          s.review_count
         FROM study_sessions s
         JOIN study_activities a ON s.study_activity_id = a.id
         JOIN groups g ON s.group_id = g.id
         WHERE s.group_id = ?
-        ORDER BY {sort_column} {order}
+        ORDER BY {sort_column} {order}, s.id {order}
         LIMIT ? OFFSET ?
       ''', (id, sessions_per_page, offset))
       
@@ -262,11 +358,6 @@ def load(app):
       sessions_data = []
       
       for session in sessions:
-        # If there's no last_activity_time, use start_time + 30 minutes
-        end_time = session["last_activity_time"]
-        if not end_time:
-            end_time = cursor.execute('SELECT datetime(?, "+30 minutes")', (session["start_time"],)).fetchone()[0]
-        
         sessions_data.append({
           "id": session["id"],
           "group_id": session["group_id"],
@@ -274,7 +365,9 @@ def load(app):
           "study_activity_id": session["study_activity_id"],
           "activity_name": session["activity_name"],
           "start_time": session["start_time"],
-          "end_time": end_time,
+          "end_time": session["end_time"],
+          "duration_seconds": seconds_between(session["start_time"], session["end_time"]),
+          "ended": session["ended_at"] is not None,
           "review_items_count": session["review_count"]
         })
 
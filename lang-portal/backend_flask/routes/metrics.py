@@ -0,0 +1,21 @@
+from flask import Response
+
+from lib.metrics import render_gauges
+
+def load(app):
+  # Endpoint: GET /metrics in the Prometheus text exposition format
+  @app.route('/metrics', methods=['GET'])
+  def get_metrics():
+    body = app.metrics.render(extra=[
+      ('db_pool', 'SQLite read-only connection pool', app.db.pool_stats()),
+      ('db_writer', 'SQLite writer connection', app.db.writer_stats()),
+      ('response_cache', 'Response cache', app.cache.stats()),
+      ('cors_origins', 'Allowed CORS origins', app.allowed_origins.stats()),
+    ])
+    if app.learners is not None:
+      body += '\n'.join(render_gauges('learner_dbs', 'Open learner databases', app.learners.stats())) + '\n'
+    if app.vocabulary is not None:
+      body += '\n'.join(render_gauges('vocabulary_index', 'In-memory vocabulary index', app.vocabulary.stats())) + '\n'
+    if app.review_writer is not None:
+      body += '\n'.join(app.review_writer.render_metrics()) + '\n'
+    return Response(body, mimetype='text/plain; version=0.0.4')
@@ -1,12 +1,14 @@
 from flask import jsonify, request
-from flask_cors import cross_origin
 import math
 
+from lib.clock import seconds_between
+from lib.learners import learner_db
+
 def load(app):
     @app.route('/api/study_activities', methods=['GET'])
-    @cross_origin()
+    @app.cache.cached('study_activities')
     def get_study_activities():
-        cursor = app.db.cursor()
+        cursor = app.db.read_cursor()
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities')
         activities = cursor.fetchall()
         
@@ -18,9 +20,9 @@ def load(app):
         } for activity in activities])
 
     @app.route('/api/study_activities/<int:id>', methods=['GET'])
-    @cross_origin()
+    @app.cache.cached('study_activities')
     def get_study_activity(id):
-        cursor = app.db.cursor()
+        cursor = app.db.read_cursor()
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities WHERE id = ?', (id,))
         activity = cursor.fetchone()
         
@@ -35,9 +37,8 @@ def load(app):
         })
 
     @app.route('/api/study_activities/<int:id>/sessions', methods=['GET'])
-    @cross_origin()
     def get_study_activity_sessions(id):
-        cursor = app.db.cursor()
+        cursor = learner_db(app).read_cursor()
         
         # Verify activity exists
         cursor.execute('SELECT id FROM study_activities WHERE id = ?', (id,))
@@ -67,14 +68,14 @@ def load(app):
                 sa.name as activity_name,
                 ss.created_at,
                 ss.study_activity_id as activity_id,
-                COUNT(wri.id) as review_items_count
+                ss.end_time,
+                ss.ended_at,
+                ss.review_count as review_items_count
             FROM study_sessions ss
             JOIN groups g ON g.id = ss.group_id
             JOIN study_activities sa ON sa.id = ss.study_activity_id
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
             WHERE ss.study_activity_id = ?
-            GROUP BY ss.id, ss.group_id, g.name, sa.name, ss.created_at, ss.study_activity_id
-            ORDER BY ss.created_at DESC
+            ORDER BY ss.created_at DESC, ss.id DESC
             LIMIT ? OFFSET ?
         ''', (id, per_page, offset))
         sessions = cursor.fetchall()
@@ -87,7 +88,9 @@ def load(app):
                 'activity_id': session['activity_id'],
                 'activity_name': session['activity_name'],
                 'start_time': session['created_at'],
-                'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
+                'end_time': session['end_time'],
+                'duration_seconds': seconds_between(session['created_at'], session['end_time']),
+                'ended': session['ended_at'] is not None,
                 'review_items_count': session['review_items_count']
             } for session in sessions],
             'total': total_count,
@@ -97,9 +100,8 @@ def load(app):
         })
 
     @app.route('/api/study_activities/<int:id>/launch', methods=['GET'])
-    @cross_origin()
     def get_study_activity_launch_data(id):
-        cursor = app.db.cursor()
+        cursor = app.db.read_cursor()
         
         # Get activity details
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities WHERE id = ?', (id,))
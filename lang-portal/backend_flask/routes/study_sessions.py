@@ -1,14 +1,24 @@
 from flask import request, jsonify, g
-from flask_cors import cross_origin
-from datetime import datetime
+import json
 import math
 
+from lib.clock import seconds_between, utc_timestamp
+from lib.counters import row_count
+from lib.db import is_sql_int
+from lib.ingest import CommitTimeout, QueueFull
+from lib.learners import learner_db
+from lib.reviews import find_missing_word, invalidate_reviews, record_reviews
+from lib.srs import next_learner_words, next_words, reset_schedules
+from lib.stats import record_session, reset_study_stats
+
 def load(app):
   # Implementation of POST /api/study_sessions endpoint
   @app.route('/api/study_sessions', methods=['POST'])
-  @cross_origin()
   def create_study_session():
     try:
+      # The learner's own database with LEARNER_SHARDING, else the shared one
+      db = learner_db(app)
+
       # Get and validate required parameters
       data = request.get_json()
       
@@ -25,7 +35,7 @@ def load(app):
       study_activity_id = data['study_activity_id']
       
       # Validate that group exists
-      cursor = app.db.cursor()
+      cursor = db.read_cursor()
       cursor.execute('SELECT id FROM groups WHERE id = ?', (group_id,))
       group = cursor.fetchone()
       
@@ -39,16 +49,17 @@ def load(app):
       if not activity:
         return jsonify({"error": f"Study activity with id {study_activity_id} not found"}), 404
       
-      # Create a new study session
-      current_time = datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')
-      
-      cursor.execute(
-        'INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (?, ?, ?)',
-        (group_id, study_activity_id, current_time)
-      )
+      # Create a new study session (stored in UTC, counted on the local study day)
+      current_time = utc_timestamp()
       
-      session_id = cursor.lastrowid
-      app.db.commit()
+      with db.transaction() as cursor:
+        cursor.execute(
+          'INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (?, ?, ?)',
+          (group_id, study_activity_id, current_time)
+        )
+        session_id = cursor.lastrowid
+        record_session(cursor, group_id, db.study_day(current_time))
+      app.cache.invalidate('study_sessions', 'study_totals', 'daily_study_stats', 'daily_group_activity')
       
       # Return the created study session
       return jsonify({
@@ -64,24 +75,18 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study_sessions', methods=['GET'])
-  @cross_origin()
   def get_study_sessions():
     try:
-      cursor = app.db.cursor()
+      db = learner_db(app)
+      cursor = db.read_cursor()
       
       # Get pagination parameters
       page = request.args.get('page', 1, type=int)
       per_page = request.args.get('per_page', 10, type=int)
       offset = (page - 1) * per_page
 
-      # Get total count
-      cursor.execute('''
-        SELECT COUNT(*) as count 
-        FROM study_sessions ss
-        JOIN groups g ON g.id = ss.group_id
-        JOIN study_activities sa ON sa.id = ss.study_activity_id
-      ''')
-      total_count = cursor.fetchone()['count']
+      # Get total count, from the trigger-maintained counter
+      total_count = row_count(cursor, 'study_sessions')
 
       # Get paginated sessions
       cursor.execute('''
@@ -92,13 +97,13 @@ def load(app):
           sa.id as activity_id,
           sa.name as activity_name,
           ss.created_at,
-          COUNT(wri.id) as review_items_count
+          ss.end_time,
+          ss.ended_at,
+          ss.review_count as review_items_count
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
         JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-        GROUP BY ss.id
-        ORDER BY ss.created_at DESC
+        ORDER BY ss.created_at DESC, ss.id DESC
         LIMIT ? OFFSET ?
       ''', (per_page, offset))
       sessions = cursor.fetchall()
@@ -111,7 +116,9 @@ def load(app):
           'activity_id': session['activity_id'],
           'activity_name': session['activity_name'],
           'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
+          'end_time': session['end_time'],
+          'duration_seconds': seconds_between(session['created_at'], session['end_time']),
+          'ended': session['ended_at'] is not None,
           'review_items_count': session['review_items_count']
         } for session in sessions],
         'total': total_count,
@@ -123,10 +130,10 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study_sessions/<id>', methods=['GET'])
-  @cross_origin()
   def get_study_session(id):
     try:
-      cursor = app.db.cursor()
+      db = learner_db(app)
+      cursor = db.read_cursor()
       
       # Get session details
       cursor.execute('''
@@ -137,13 +144,13 @@ def load(app):
           sa.id as activity_id,
           sa.name as activity_name,
           ss.created_at,
-          COUNT(wri.id) as review_items_count
+          ss.end_time,
+          ss.ended_at,
+          ss.review_count as review_items_count
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
         JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
         WHERE ss.id = ?
-        GROUP BY ss.id
       ''', (id,))
       
       session = cursor.fetchone()
@@ -189,7 +196,9 @@ def load(app):
           'activity_id': session['activity_id'],
           'activity_name': session['activity_name'],
           'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time
+          'end_time': session['end_time'],
+          'duration_seconds': seconds_between(session['created_at'], session['end_time']),
+          'ended': session['ended_at'] is not None,
           'review_items_count': session['review_items_count']
         },
         'words': [{
@@ -209,7 +218,6 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study_sessions/<id>/review', methods=['POST'])
-  @cross_origin()
   def batch_submit_reviews(id):
     """
     Endpoint to submit multiple word reviews for a study session in batch.
@@ -236,11 +244,12 @@ def load(app):
         review count, and creation timestamp
     """
     try:
+      db = learner_db(app)
       # Get and validate the request data
       data = request.get_json()
       
       # Verify study session exists
-      cursor = app.db.cursor()
+      cursor = db.read_cursor()
       cursor.execute('SELECT id FROM study_sessions WHERE id = ?', (id,))
       session = cursor.fetchone()
       
@@ -254,33 +263,50 @@ def load(app):
       if not data['reviews']:
         return jsonify({"error": "Reviews array cannot be empty"}), 400
       
-      # Create word review items
-      current_time = datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')
-      reviews_count = 0
-      
+      # Validate every field before touching the database: a batch queued for
+      # the writer thread must not be able to fail its insert
+      reviews = []
       for review in data['reviews']:
-        # Validate review object
-        if 'word_id' not in review or 'is_correct' not in review:
+        if not isinstance(review, dict) or 'word_id' not in review or 'is_correct' not in review:
           return jsonify({"error": "Each review must have 'word_id' and 'is_correct' fields"}), 400
-        
-        word_id = review['word_id']
-        is_correct = review['is_correct']
-        
-        # Verify word exists
-        cursor.execute('SELECT id FROM words WHERE id = ?', (word_id,))
-        word = cursor.fetchone()
-        
-        if not word:
-          return jsonify({"error": f"Word with id {word_id} not found"}), 404
-        
-        # Insert review record
-        cursor.execute(
-          'INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)',
-          (word_id, id, 1 if is_correct else 0, current_time)
-        )
-        reviews_count += 1
+        if not is_sql_int(review['word_id']):
+          return jsonify({"error": f"Invalid word id: {review['word_id']!r}"}), 400
+        if not isinstance(review['is_correct'], bool):
+          return jsonify({"error": "'is_correct' must be true or false"}), 400
+        reviews.append((review['word_id'], review['is_correct']))
       
-      app.db.commit()
+      # Verify all words exist with one set lookup
+      missing = find_missing_word(cursor, {word_id for word_id, _ in reviews})
+      if missing is not None:
+        return jsonify({"error": f"Word with id {missing['value']} not found"}), 404
+      
+      current_time = utc_timestamp()
+      reviews_count = len(reviews)
+      if app.review_writer is not None:
+        # Write-behind: the writer thread group-commits queued batches
+        try:
+          app.review_writer.submit(session['id'], reviews, current_time, db.study_day(current_time))
+        except QueueFull:
+          response = jsonify({"error": "Too many reviews are waiting to be written, retry shortly"})
+          response.headers['Retry-After'] = '1'
+          return response, 503
+        except CommitTimeout:
+          response = jsonify({"error": "Reviews could not be written in time, retry shortly"})
+          response.headers['Retry-After'] = '1'
+          return response, 503
+        if app.review_writer.mode == 'async':
+          return jsonify({
+            "success": True,
+            "message": "Reviews accepted",
+            "study_session_id": int(id),
+            "review_count": reviews_count,
+            "created_at": current_time
+          }), 202
+      else:
+        # Insert the whole batch and its counter updates all-or-nothing
+        with db.transaction() as cursor:
+          record_reviews(cursor, session['id'], reviews, current_time, db.study_day(current_time))
+        invalidate_reviews(app.cache, app.vocabulary, {word_id for word_id, _ in reviews})
       
       return jsonify({
         "success": True,
@@ -293,19 +319,104 @@ def load(app):
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
+  @app.route('/api/study_sessions/<id>/end', methods=['POST'])
+  def end_study_session(id):
+    try:
+      db = learner_db(app)
+      # Ending twice keeps the first end time
+      with db.transaction() as cursor:
+        cursor.execute(
+          'UPDATE study_sessions SET ended_at = MAX(?, COALESCE(last_activity_at, created_at)) WHERE id = ? AND ended_at IS NULL',
+          (utc_timestamp(), id)
+        )
+        cursor.execute('''
+          SELECT id, group_id, study_activity_id, created_at, end_time, review_count
+          FROM study_sessions
+          WHERE id = ?
+        ''', (id,))
+        session = cursor.fetchone()
+
+      if not session:
+        return jsonify({"error": f"Study session with id {id} not found"}), 404
+      app.cache.invalidate('study_sessions')
+
+      return jsonify({
+        "study_session": {
+          "id": session['id'],
+          "group_id": session['group_id'],
+          "study_activity_id": session['study_activity_id'],
+          "start_time": session['created_at'],
+          "end_time": session['end_time'],
+          "duration_seconds": seconds_between(session['created_at'], session['end_time']),
+          "review_items_count": session['review_count']
+        }
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  @app.route('/api/study_sessions/<id>/next_words', methods=['GET'])
+  def get_next_words(id):
+    try:
+      db = learner_db(app)
+      cursor = db.read_cursor()
+      cursor.execute('SELECT group_id FROM study_sessions WHERE id = ?', (id,))
+      session = cursor.fetchone()
+
+      if not session:
+        return jsonify({"error": f"Study session with id {id} not found"}), 404
+
+      n = request.args.get('n', 10, type=int)
+      n = min(max(1, n), 100)
+
+      # Served straight off the (group_id, due_at) index, soonest due first;
+      # a learner database orders the group by its own schedules instead
+      now = utc_timestamp()
+      if db is app.db:
+        words = next_words(cursor, session['group_id'], n)
+      else:
+        words = next_learner_words(cursor, session['group_id'], n, now)
+
+      return jsonify({
+        "study_session_id": int(id),
+        "group_id": session['group_id'],
+        "words": [{
+          "id": word['id'],
+          "spanish": word['spanish'],
+          "pronunciation": word['pronunciation'],
+          "english": word['english'],
+          "parts": json.loads(word['parts']),
+          "ease": word['ease'],
+          "interval_days": word['interval_days'],
+          "repetitions": word['repetitions'],
+          "due_at": word['due_at'],
+          "is_due": word['due_at'] <= now
+        } for word in words]
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
   @app.route('/api/study_sessions/reset', methods=['POST'])
-  @cross_origin()
   def reset_study_sessions():
     try:
-      cursor = app.db.cursor()
-      
-      # First delete all word review items since they have foreign key constraints
-      cursor.execute('DELETE FROM word_review_items')
-      
-      # Then delete all study sessions
-      cursor.execute('DELETE FROM study_sessions')
-      
-      app.db.commit()
+      db = learner_db(app)
+      # Queued reviews belong to the sessions about to be deleted
+      if app.review_writer is not None:
+        app.review_writer.flush()
+      with db.transaction() as cursor:
+        # First delete all word review items since they have foreign key constraints
+        cursor.execute('DELETE FROM word_review_items')
+        
+        # Then delete all study sessions
+        cursor.execute('DELETE FROM study_sessions')
+        
+        # The per-word counters and rollups were derived from the deleted rows
+        cursor.execute('UPDATE word_reviews SET correct_count = 0, wrong_count = 0, last_reviewed = NULL')
+        reset_study_stats(cursor)
+        reset_schedules(cursor, utc_timestamp())
+      app.cache.invalidate(
+        'word_review_items', 'study_sessions', 'word_reviews',
+        'study_totals', 'daily_study_stats', 'daily_group_activity'
+      )
       
       return jsonify({"message": "Study history cleared successfully"}), 200
     except Exception as e:
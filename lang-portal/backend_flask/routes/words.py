@@ -1,14 +1,17 @@
 from flask import request, jsonify, g
-from flask_cors import cross_origin
 import json
 
+from lib.counters import row_count
+from lib.pagination import InvalidCursor, decode_cursor, keyset_condition, next_page
+from lib.search import fts_query
+
 def load(app):
-  # Endpoint: GET /words with pagination (50 words per page)
+  # Endpoint: GET /words with pagination (50 words per page, by page or by cursor)
   @app.route('/words', methods=['GET'])
-  @cross_origin()
+  @app.cache.cached('words', 'word_reviews')
   def get_words():
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
 
       # Get the current page number from query parameters (default is 1)
       page = int(request.args.get('page', 1))
@@ -17,33 +20,74 @@ def load(app):
       words_per_page = 50
       offset = (page - 1) * words_per_page
 
+      # An opaque cursor (even an empty one) switches to keyset pagination
+      cursor_param = request.args.get('cursor')
+
       # Get sorting parameters from the query string
       sort_by = request.args.get('sort_by', 'spanish')  # Default to sorting by 'spanish'
       order = request.args.get('order', 'asc')  # Default to ascending order
 
       # Validate sort_by and order
-      valid_columns = ['spanish', 'pronunciation', 'english', 'correct_count', 'wrong_count']
-      if sort_by not in valid_columns:
+      # Each sort maps to its (column, id) pair; the counter sorts tie-break on
+      # r.word_id so they can walk the word_reviews count indexes
+      sort_columns = {
+        'spanish': ('w.spanish', 'w.id'),
+        'pronunciation': ('w.pronunciation', 'w.id'),
+        'english': ('w.english', 'w.id'),
+        'correct_count': ('r.correct_count', 'r.word_id'),
+        'wrong_count': ('r.wrong_count', 'r.word_id')
+      }
+      if sort_by not in sort_columns:
         sort_by = 'spanish'
       if order not in ['asc', 'desc']:
         order = 'asc'
+      sort_expr, id_expr = sort_columns[sort_by]
 
-      # Query to fetch words with sorting
-      cursor.execute(f'''
-        SELECT w.id, w.spanish, w.pronunciation, w.english, 
-            COALESCE(r.correct_count, 0) AS correct_count,
-            COALESCE(r.wrong_count, 0) AS wrong_count
-        FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (words_per_page, offset))
+      after = None
+      if cursor_param:
+        try:
+          after = decode_cursor(cursor_param, sort_by, order)
+        except InvalidCursor as e:
+          return jsonify({"error": str(e)}), 400
 
-      words = cursor.fetchall()
+      # The in-memory index (when enabled and within budget) serves the page
+      # from its presorted arrays; otherwise, or for a cursor it cannot
+      # compare, the page comes from SQLite
+      vocabulary = app.vocabulary.snapshot() if app.vocabulary is not None else None
+      rows = None
+      if vocabulary is not None:
+        rows = vocabulary.page(sort_by, order, words_per_page + 1, offset=offset, after=after)
 
-      # Query the total number of words
-      cursor.execute('SELECT COUNT(*) FROM words')
-      total_words = cursor.fetchone()[0]
+      if rows is None:
+        where = ''
+        params = []
+        if after is not None:
+          where = 'WHERE ' + keyset_condition(sort_expr, id_expr, order)
+          params = list(after)
+        if cursor_param is None:
+          pagination = 'LIMIT ? OFFSET ?'
+          params += [words_per_page + 1, offset]
+        else:
+          pagination = 'LIMIT ?'
+          params += [words_per_page + 1]
+
+        # Query to fetch words with sorting (id breaks ties so pages never overlap)
+        cursor.execute(f'''
+          SELECT w.id, w.spanish, w.pronunciation, w.english, 
+              r.correct_count,
+              r.wrong_count
+          FROM words w
+          JOIN word_reviews r ON w.id = r.word_id
+          {where}
+          ORDER BY {sort_expr} {order}, {id_expr} {order}
+          {pagination}
+        ''', params)
+        rows = cursor.fetchall()
+
+      words, next_cursor = next_page(rows, words_per_page, sort_by, order)
+
+      # Total number of words, from the index or the trigger-maintained counter
+      total_words = vocabulary.words_count if vocabulary is not None else row_count(cursor, 'words')
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
       # Format the response
@@ -61,21 +105,76 @@ def load(app):
       return jsonify({
         "words": words_data,
         "total_pages": total_pages,
-        "current_page": page,
-        "total_words": total_words
+        "current_page": page if cursor_param is None else None,
+        "total_words": total_words,
+        "next_cursor": next_cursor
+      })
+
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /words/search?q= full-text search, best matches first
+  @app.route('/words/search', methods=['GET'])
+  @app.cache.cached('words', 'word_reviews')
+  def search_words():
+    try:
+      query = fts_query(request.args.get('q', ''))
+      if query is None:
+        return jsonify({"error": "q must contain at least one word"}), 400
+
+      limit = request.args.get('limit', 50, type=int)
+      limit = min(max(1, limit), 100)
+
+      cursor = app.db.read_cursor()
+
+      # Rank inside the index first (rank is bm25), then join only the hits
+      cursor.execute('''
+        SELECT w.id, w.spanish, w.pronunciation, w.english,
+            r.correct_count,
+            r.wrong_count
+        FROM (
+          SELECT rowid, rank FROM words_fts
+          WHERE words_fts MATCH ?
+          ORDER BY rank
+          LIMIT ?
+        ) hits
+        JOIN words w ON w.id = hits.rowid
+        JOIN word_reviews r ON w.id = r.word_id
+        ORDER BY hits.rank, w.id
+      ''', (query, limit))
+
+      words_data = []
+      for word in cursor.fetchall():
+        words_data.append({
+          "id": word["id"],
+          "spanish": word["spanish"],
+          "pronunciation": word["pronunciation"],
+          "english": word["english"],
+          "correct_count": word["correct_count"],
+          "wrong_count": word["wrong_count"]
+        })
+
+      return jsonify({
+        "words": words_data,
+        "query": request.args.get('q')
       })
 
     except Exception as e:
       return jsonify({"error": str(e)}), 500
-    finally:
-      app.db.close()
 
   # Endpoint: GET /words/:id to get a single word with its details
   @app.route('/words/<int:word_id>', methods=['GET'])
-  @cross_origin()
+  @app.cache.cached('words', 'word_reviews', 'word_groups', 'groups')
   def get_word(word_id):
     try:
-      cursor = app.db.cursor()
+      vocabulary = app.vocabulary.snapshot() if app.vocabulary is not None else None
+      if vocabulary is not None:
+        word = vocabulary.word(word_id)
+        if word is None:
+          return jsonify({"error": "Word not found"}), 404
+        return jsonify({"word": word})
+
+      cursor = app.db.read_cursor()
       
       # Query to fetch the word and its details
       cursor.execute('''
@@ -0,0 +1,106 @@
+-- One learner's study history (LEARNER_SHARDING), in its own database file.
+-- The shared vocabulary (words, groups, word_groups, study_activities) is
+-- attached read-only, so these tables keep the names and shapes of the shared
+-- schema and every query resolves the vocabulary tables there. Foreign keys
+-- cannot cross databases, so only the ones within this file are declared.
+
+CREATE TABLE IF NOT EXISTS study_sessions (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  group_id INTEGER NOT NULL,
+  study_activity_id INTEGER NOT NULL,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  review_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  first_activity_at TEXT,
+  last_activity_at TEXT,
+  ended_at TEXT,
+  end_time TEXT GENERATED ALWAYS AS (COALESCE(ended_at, last_activity_at, created_at)) VIRTUAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created_at ON study_sessions (created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_created_at ON study_sessions (group_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_review_count ON study_sessions (group_id, review_count, id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_end_time ON study_sessions (group_id, end_time, id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_study_activity_id_created_at ON study_sessions (study_activity_id, created_at, id);
+
+CREATE TABLE IF NOT EXISTS word_review_items (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  word_id INTEGER NOT NULL,
+  study_session_id INTEGER NOT NULL,
+  correct BOOLEAN NOT NULL,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_word_review_items_study_session_id ON word_review_items (study_session_id);
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word_id ON word_review_items (word_id);
+
+-- Counters and schedules only exist for words this learner has reviewed; the
+-- review path upserts them, and a missing row reads as never reviewed
+CREATE TABLE IF NOT EXISTS word_reviews (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  word_id INTEGER NOT NULL,
+  correct_count INTEGER DEFAULT 0,
+  wrong_count INTEGER DEFAULT 0,
+  last_reviewed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_reviews_word_id ON word_reviews (word_id);
+
+CREATE TABLE IF NOT EXISTS word_schedules (
+  word_id INTEGER PRIMARY KEY,
+  ease REAL NOT NULL DEFAULT 2.5,
+  interval_days INTEGER NOT NULL DEFAULT 0,
+  repetitions INTEGER NOT NULL DEFAULT 0,
+  due_at TEXT NOT NULL,
+  reviewed_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS daily_study_stats (
+  day TEXT PRIMARY KEY,
+  sessions_count INTEGER NOT NULL DEFAULT 0,
+  reviews_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS daily_group_activity (
+  day TEXT NOT NULL,
+  group_id INTEGER NOT NULL,
+  sessions_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, group_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS study_totals (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  sessions_count INTEGER NOT NULL DEFAULT 0,
+  reviews_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  words_studied INTEGER NOT NULL DEFAULT 0,
+  mastered_words INTEGER NOT NULL DEFAULT 0,
+  current_streak INTEGER NOT NULL DEFAULT 0,
+  longest_streak INTEGER NOT NULL DEFAULT 0,
+  last_study_day TEXT
+);
+
+INSERT OR IGNORE INTO study_totals (id) VALUES (1);
+
+-- The learner's own session count. It hides the shared table_counters, so
+-- vocabulary totals are read through the shared database
+CREATE TABLE IF NOT EXISTS table_counters (
+  name TEXT PRIMARY KEY,
+  row_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO table_counters (name, row_count) VALUES ('study_sessions', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_study_sessions_insert_counter
+AFTER INSERT ON study_sessions
+BEGIN
+  UPDATE table_counters SET row_count = row_count + 1 WHERE name = 'study_sessions';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_study_sessions_delete_counter
+AFTER DELETE ON study_sessions
+BEGIN
+  UPDATE table_counters SET row_count = row_count - 1 WHERE name = 'study_sessions';
+END;
@@ -0,0 +1,3 @@
+-- next_words walks the learner's schedules soonest due first and keeps the
+-- words of the session's group, instead of sorting the whole group
+CREATE INDEX IF NOT EXISTS idx_word_schedules_due_at ON word_schedules (due_at, word_id);
@@ -0,0 +1,31 @@
+-- Indexes for the columns every session list, dashboard and group view joins or filters on.
+
+-- Drop duplicate memberships so word_groups can carry a unique constraint,
+-- then refresh the counter cache the duplicates may have inflated.
+DELETE FROM word_groups
+WHERE rowid NOT IN (
+  SELECT MIN(rowid) FROM word_groups GROUP BY word_id, group_id
+);
+
+UPDATE groups
+SET words_count = (
+  SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_groups_word_id_group_id ON word_groups (word_id, group_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id ON word_groups (group_id, word_id);
+
+CREATE INDEX IF NOT EXISTS idx_word_review_items_study_session_id ON word_review_items (study_session_id);
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word_id ON word_review_items (word_id);
+
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id ON study_sessions (group_id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_study_activity_id ON study_sessions (study_activity_id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created_at ON study_sessions (created_at);
+
+-- Sort indexes for keyset pagination on /words and /groups/:id/words.
+-- The rowid (words.id) is implicitly the last column of each index, so
+-- (sort column, id) seeks and ordered scans need no temp b-tree.
+CREATE INDEX IF NOT EXISTS idx_words_spanish ON words (spanish);
+CREATE INDEX IF NOT EXISTS idx_words_pronunciation ON words (pronunciation);
+CREATE INDEX IF NOT EXISTS idx_words_english ON words (english);
+CREATE INDEX IF NOT EXISTS idx_word_reviews_word_id ON word_reviews (word_id);
@@ -0,0 +1,31 @@
+-- word_reviews becomes a maintained counter table: one row per word, upserted
+-- by every review batch, so listings can sort by accuracy through an index.
+
+-- Nothing wrote word_reviews before this migration, so backfill it from history
+DELETE FROM word_reviews;
+
+INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+SELECT
+  w.id,
+  COUNT(CASE WHEN wri.correct = 1 THEN 1 END),
+  COUNT(CASE WHEN wri.correct = 0 THEN 1 END),
+  MAX(wri.created_at)
+FROM words w
+LEFT JOIN word_review_items wri ON wri.word_id = w.id
+GROUP BY w.id;
+
+-- One counter row per word, which is also the upsert conflict target
+DROP INDEX IF EXISTS idx_word_reviews_word_id;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_reviews_word_id ON word_reviews (word_id);
+
+-- Sort indexes for the correct_count / wrong_count listings
+CREATE INDEX IF NOT EXISTS idx_word_reviews_correct_count ON word_reviews (correct_count, word_id);
+CREATE INDEX IF NOT EXISTS idx_word_reviews_wrong_count ON word_reviews (wrong_count, word_id);
+
+-- New words start with an empty counter row
+CREATE TRIGGER IF NOT EXISTS trg_words_insert_word_reviews
+AFTER INSERT ON words
+BEGIN
+  INSERT OR IGNORE INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+  VALUES (new.id, 0, 0, NULL);
+END;
@@ -0,0 +1,72 @@
+-- Rollups behind /dashboard/stats, maintained by lib/stats.py as sessions and
+-- review batches are written, so the dashboard reads a handful of small rows.
+
+-- Per-day activity (day is YYYY-MM-DD)
+CREATE TABLE IF NOT EXISTS daily_study_stats (
+  day TEXT PRIMARY KEY,
+  sessions_count INTEGER NOT NULL DEFAULT 0,
+  reviews_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Which groups were studied on which day, for the active groups count
+CREATE TABLE IF NOT EXISTS daily_group_activity (
+  day TEXT NOT NULL,
+  group_id INTEGER NOT NULL,
+  sessions_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, group_id)
+) WITHOUT ROWID;
+
+-- Running totals over all history, kept in a single row
+CREATE TABLE IF NOT EXISTS study_totals (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  sessions_count INTEGER NOT NULL DEFAULT 0,
+  reviews_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  words_studied INTEGER NOT NULL DEFAULT 0,  -- Words with at least one review
+  mastered_words INTEGER NOT NULL DEFAULT 0
+);
+
+-- Backfill from existing history (same statements as sql/rebuild/study_stats.sql)
+DELETE FROM daily_study_stats;
+
+INSERT INTO daily_study_stats (day, sessions_count, reviews_count, correct_count)
+SELECT day, SUM(sessions), SUM(reviews), SUM(correct)
+FROM (
+  SELECT date(created_at) AS day, 1 AS sessions, 0 AS reviews, 0 AS correct
+  FROM study_sessions
+  UNION ALL
+  SELECT date(wri.created_at), 0, 1, CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END
+  FROM word_review_items wri
+  JOIN study_sessions ss ON wri.study_session_id = ss.id
+)
+GROUP BY day;
+
+DELETE FROM daily_group_activity;
+
+INSERT INTO daily_group_activity (day, group_id, sessions_count)
+SELECT date(created_at), group_id, COUNT(*)
+FROM study_sessions
+GROUP BY date(created_at), group_id;
+
+INSERT OR IGNORE INTO study_totals (id) VALUES (1);
+
+WITH word_stats AS (
+  SELECT
+    word_id,
+    COUNT(*) AS attempts,
+    SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) AS correct_count
+  FROM word_review_items wri
+  JOIN study_sessions ss ON wri.study_session_id = ss.id
+  GROUP BY word_id
+)
+UPDATE study_totals SET
+  sessions_count = (SELECT COUNT(*) FROM study_sessions),
+  reviews_count = (SELECT COALESCE(SUM(attempts), 0) FROM word_stats),
+  correct_count = (SELECT COALESCE(SUM(correct_count), 0) FROM word_stats),
+  words_studied = (SELECT COUNT(*) FROM word_stats),
+  mastered_words = (
+    SELECT COUNT(*) FROM word_stats
+    WHERE attempts >= 5 AND correct_count * 1.0 / attempts >= 0.8
+  )
+WHERE id = 1;
@@ -0,0 +1,24 @@
+-- Streak record kept next to the running totals and updated in O(1) by
+-- lib/stats.record_study_day whenever a session or review batch lands.
+ALTER TABLE study_totals ADD COLUMN current_streak INTEGER NOT NULL DEFAULT 0;  -- Run ending on last_study_day
+ALTER TABLE study_totals ADD COLUMN longest_streak INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_totals ADD COLUMN last_study_day TEXT;  -- YYYY-MM-DD, local to STUDY_TIMEZONE
+
+-- Backfill from the existing per-day rollups: consecutive days share the same
+-- julianday(day) - row_number, which groups them into runs.
+-- (These days are UTC; run `invoke rebuild-study-stats` to regroup history in
+-- another STUDY_TIMEZONE.)
+WITH days AS (
+  SELECT day, julianday(day) - ROW_NUMBER() OVER (ORDER BY day) AS run
+  FROM daily_study_stats
+),
+runs AS (
+  SELECT MAX(day) AS last_day, COUNT(*) AS length
+  FROM days
+  GROUP BY run
+)
+UPDATE study_totals SET
+  current_streak = COALESCE((SELECT length FROM runs ORDER BY last_day DESC LIMIT 1), 0),
+  longest_streak = COALESCE((SELECT MAX(length) FROM runs), 0),
+  last_study_day = (SELECT MAX(day) FROM daily_study_stats)
+WHERE id = 1;
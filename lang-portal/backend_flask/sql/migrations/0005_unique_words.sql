@@ -0,0 +1,50 @@
+-- Words are identified by (spanish, english) so the bulk importer can upsert.
+-- Merge any existing duplicates into the lowest id first, repointing every
+-- reference to the duplicates.
+
+CREATE TEMP TABLE word_duplicates AS
+SELECT w.id AS duplicate_id, k.keep_id
+FROM words w
+JOIN (
+  SELECT spanish, english, MIN(id) AS keep_id
+  FROM words
+  GROUP BY spanish, english
+  HAVING COUNT(*) > 1
+) k ON k.spanish = w.spanish AND k.english = w.english
+WHERE w.id <> k.keep_id;
+
+-- Memberships: move to the kept word, dropping ones it already has
+UPDATE OR IGNORE word_groups
+SET word_id = (SELECT keep_id FROM word_duplicates WHERE duplicate_id = word_groups.word_id)
+WHERE word_id IN (SELECT duplicate_id FROM word_duplicates);
+DELETE FROM word_groups WHERE word_id IN (SELECT duplicate_id FROM word_duplicates);
+
+UPDATE word_review_items
+SET word_id = (SELECT keep_id FROM word_duplicates WHERE duplicate_id = word_review_items.word_id)
+WHERE word_id IN (SELECT duplicate_id FROM word_duplicates);
+
+-- Counters: fold the duplicates' counts into the kept word's row
+UPDATE word_reviews SET
+  correct_count = correct_count + (
+    SELECT COALESCE(SUM(r.correct_count), 0)
+    FROM word_duplicates d JOIN word_reviews r ON r.word_id = d.duplicate_id
+    WHERE d.keep_id = word_reviews.word_id
+  ),
+  wrong_count = wrong_count + (
+    SELECT COALESCE(SUM(r.wrong_count), 0)
+    FROM word_duplicates d JOIN word_reviews r ON r.word_id = d.duplicate_id
+    WHERE d.keep_id = word_reviews.word_id
+  )
+WHERE word_id IN (SELECT keep_id FROM word_duplicates);
+DELETE FROM word_reviews WHERE word_id IN (SELECT duplicate_id FROM word_duplicates);
+
+DELETE FROM words WHERE id IN (SELECT duplicate_id FROM word_duplicates);
+
+UPDATE groups
+SET words_count = (
+  SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id
+);
+
+DROP TABLE temp.word_duplicates;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_words_spanish_english ON words (spanish, english);
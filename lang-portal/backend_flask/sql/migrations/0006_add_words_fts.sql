@@ -0,0 +1,38 @@
+-- Full-text index over the vocabulary for /words/search. It is an external
+-- content table: the text stays in words and only the index lives here.
+-- unicode61 with remove_diacritics 2 folds accents, so "nino" matches "niño".
+CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+  spanish,
+  english,
+  pronunciation,
+  content = 'words',
+  content_rowid = 'id',
+  tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- Keep the index in step with every write to words
+CREATE TRIGGER IF NOT EXISTS trg_words_insert_fts
+AFTER INSERT ON words
+BEGIN
+  INSERT INTO words_fts (rowid, spanish, english, pronunciation)
+  VALUES (new.id, new.spanish, new.english, new.pronunciation);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_delete_fts
+AFTER DELETE ON words
+BEGIN
+  INSERT INTO words_fts (words_fts, rowid, spanish, english, pronunciation)
+  VALUES ('delete', old.id, old.spanish, old.english, old.pronunciation);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_update_fts
+AFTER UPDATE OF spanish, english, pronunciation ON words
+BEGIN
+  INSERT INTO words_fts (words_fts, rowid, spanish, english, pronunciation)
+  VALUES ('delete', old.id, old.spanish, old.english, old.pronunciation);
+  INSERT INTO words_fts (rowid, spanish, english, pronunciation)
+  VALUES (new.id, new.spanish, new.english, new.pronunciation);
+END;
+
+-- Index the words that already exist
+INSERT INTO words_fts (words_fts) VALUES ('rebuild');
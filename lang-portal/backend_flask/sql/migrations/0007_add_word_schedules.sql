@@ -0,0 +1,45 @@
+-- SM-2 spaced-repetition state, one row per word (see lib/srs.py). Each review
+-- batch updates ease, interval and due_at for the words it contains.
+CREATE TABLE IF NOT EXISTS word_schedules (
+  word_id INTEGER PRIMARY KEY,
+  ease REAL NOT NULL DEFAULT 2.5,
+  interval_days INTEGER NOT NULL DEFAULT 0,
+  repetitions INTEGER NOT NULL DEFAULT 0,
+  due_at TEXT NOT NULL,
+  reviewed_at TEXT,
+  FOREIGN KEY (word_id) REFERENCES words(id) ON DELETE CASCADE
+);
+
+-- Words that were never scheduled are due now
+INSERT OR IGNORE INTO word_schedules (word_id, due_at)
+SELECT id, strftime('%Y-%m-%dT%H:%M:%SZ', 'now') FROM words;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_insert_word_schedules
+AFTER INSERT ON words
+BEGIN
+  INSERT OR IGNORE INTO word_schedules (word_id, due_at)
+  VALUES (new.id, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'));
+END;
+
+-- The due queue of a group is read from word_groups, so each membership
+-- carries a copy of its word's due_at and (group_id, due_at) is one index seek
+ALTER TABLE word_groups ADD COLUMN due_at TEXT;
+
+UPDATE word_groups
+SET due_at = (SELECT due_at FROM word_schedules s WHERE s.word_id = word_groups.word_id);
+
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id_due_at ON word_groups (group_id, due_at, word_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_insert_due_at
+AFTER INSERT ON word_groups
+BEGIN
+  UPDATE word_groups
+  SET due_at = (SELECT due_at FROM word_schedules WHERE word_id = new.word_id)
+  WHERE rowid = new.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_schedules_update_due_at
+AFTER UPDATE OF due_at ON word_schedules
+BEGIN
+  UPDATE word_groups SET due_at = new.due_at WHERE word_id = new.word_id;
+END;
@@ -0,0 +1,30 @@
+-- Per-session summary columns, advanced by every review batch (see
+-- lib/reviews.py), so session listings never aggregate word_review_items.
+ALTER TABLE study_sessions ADD COLUMN review_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_sessions ADD COLUMN correct_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_sessions ADD COLUMN first_activity_at TEXT;
+ALTER TABLE study_sessions ADD COLUMN last_activity_at TEXT;
+
+-- Backfill the existing history
+UPDATE study_sessions
+SET
+  review_count = summary.review_count,
+  correct_count = summary.correct_count,
+  first_activity_at = summary.first_activity_at,
+  last_activity_at = summary.last_activity_at
+FROM (
+  SELECT
+    study_session_id,
+    COUNT(*) AS review_count,
+    COUNT(CASE WHEN correct = 1 THEN 1 END) AS correct_count,
+    MIN(created_at) AS first_activity_at,
+    MAX(created_at) AS last_activity_at
+  FROM word_review_items
+  GROUP BY study_session_id
+) summary
+WHERE summary.study_session_id = study_sessions.id;
+
+-- One range scan per sort of /groups/<id>/study_sessions
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_created_at ON study_sessions (group_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_last_activity_at ON study_sessions (group_id, last_activity_at, id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_review_count ON study_sessions (group_id, review_count, id);
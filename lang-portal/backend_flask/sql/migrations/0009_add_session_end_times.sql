@@ -0,0 +1,11 @@
+-- Sessions end explicitly through POST /api/study_sessions/<id>/end. Until
+-- then a session lasts until its latest review, and review batches arriving
+-- after the end push ended_at forward (see lib/reviews.py).
+ALTER TABLE study_sessions ADD COLUMN ended_at TEXT;
+
+-- The end every listing reports, and sorts /groups/<id>/study_sessions by
+ALTER TABLE study_sessions ADD COLUMN end_time TEXT
+  GENERATED ALWAYS AS (COALESCE(ended_at, last_activity_at, created_at)) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_end_time ON study_sessions (group_id, end_time, id);
+DROP INDEX IF EXISTS idx_study_sessions_group_id_last_activity_at;
@@ -0,0 +1,7 @@
+-- Sort indexes for listings that still sorted through a temp B-tree
+-- (caught by tests/test_query_plans.py)
+CREATE INDEX IF NOT EXISTS idx_groups_name ON groups (name, id);
+CREATE INDEX IF NOT EXISTS idx_groups_words_count ON groups (words_count, id);
+
+-- /api/study_activities/<id>/sessions, newest first
+CREATE INDEX IF NOT EXISTS idx_study_sessions_study_activity_id_created_at ON study_sessions (study_activity_id, created_at, id);
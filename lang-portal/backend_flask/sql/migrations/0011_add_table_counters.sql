@@ -0,0 +1,75 @@
+-- Exact row totals for the paginated tables, kept by triggers so listings
+-- read one row instead of running COUNT(*) on every page (see lib/counters.py)
+CREATE TABLE IF NOT EXISTS table_counters (
+  name TEXT PRIMARY KEY,
+  row_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR REPLACE INTO table_counters (name, row_count)
+SELECT 'words', COUNT(*) FROM words
+UNION ALL SELECT 'groups', COUNT(*) FROM groups
+UNION ALL SELECT 'word_groups', COUNT(*) FROM word_groups
+UNION ALL SELECT 'study_sessions', COUNT(*) FROM study_sessions;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_insert_counter
+AFTER INSERT ON words
+BEGIN
+  UPDATE table_counters SET row_count = row_count + 1 WHERE name = 'words';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_delete_counter
+AFTER DELETE ON words
+BEGIN
+  UPDATE table_counters SET row_count = row_count - 1 WHERE name = 'words';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_insert_counter
+AFTER INSERT ON groups
+BEGIN
+  UPDATE table_counters SET row_count = row_count + 1 WHERE name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_delete_counter
+AFTER DELETE ON groups
+BEGIN
+  UPDATE table_counters SET row_count = row_count - 1 WHERE name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_study_sessions_insert_counter
+AFTER INSERT ON study_sessions
+BEGIN
+  UPDATE table_counters SET row_count = row_count + 1 WHERE name = 'study_sessions';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_study_sessions_delete_counter
+AFTER DELETE ON study_sessions
+BEGIN
+  UPDATE table_counters SET row_count = row_count - 1 WHERE name = 'study_sessions';
+END;
+
+-- groups.words_count was only set by the importer; from here on every
+-- membership change keeps it exact
+UPDATE groups
+SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id);
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_insert_counter
+AFTER INSERT ON word_groups
+BEGIN
+  UPDATE table_counters SET row_count = row_count + 1 WHERE name = 'word_groups';
+  UPDATE groups SET words_count = words_count + 1 WHERE id = new.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_delete_counter
+AFTER DELETE ON word_groups
+BEGIN
+  UPDATE table_counters SET row_count = row_count - 1 WHERE name = 'word_groups';
+  UPDATE groups SET words_count = words_count - 1 WHERE id = old.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_update_counter
+AFTER UPDATE OF group_id ON word_groups
+WHEN new.group_id IS NOT old.group_id
+BEGIN
+  UPDATE groups SET words_count = words_count - 1 WHERE id = old.group_id;
+  UPDATE groups SET words_count = words_count + 1 WHERE id = new.group_id;
+END;
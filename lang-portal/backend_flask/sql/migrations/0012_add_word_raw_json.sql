@@ -0,0 +1,35 @@
+-- Each word's JSON as served by /groups/:id/words/raw, serialized once when
+-- the word is written, so the endpoint splices rows into the response
+-- instead of decoding parts and re-encoding every word on each request.
+
+-- Store parts minified, the form json() produces
+UPDATE words SET parts = json(parts) WHERE parts <> json(parts);
+
+ALTER TABLE words ADD COLUMN raw_json TEXT;
+
+UPDATE words
+SET raw_json = json_object(
+  'id', id, 'spanish', spanish, 'pronunciation', pronunciation, 'english', english, 'parts', json(parts)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_words_insert_raw_json
+AFTER INSERT ON words
+BEGIN
+  UPDATE words
+  SET raw_json = json_object(
+    'id', new.id, 'spanish', new.spanish, 'pronunciation', new.pronunciation, 'english', new.english,
+    'parts', json(new.parts)
+  )
+  WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_update_raw_json
+AFTER UPDATE OF spanish, pronunciation, english, parts ON words
+BEGIN
+  UPDATE words
+  SET raw_json = json_object(
+    'id', new.id, 'spanish', new.spanish, 'pronunciation', new.pronunciation, 'english', new.english,
+    'parts', json(new.parts)
+  )
+  WHERE id = new.id;
+END;
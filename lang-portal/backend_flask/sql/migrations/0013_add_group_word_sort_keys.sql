@@ -0,0 +1,85 @@
+-- /groups/:id/words sorted through a temp B-tree over the whole group: its
+-- sort columns live in words and word_reviews, so no index on word_groups
+-- could serve them. Each membership now carries a copy of its word's sort
+-- keys, like due_at (migration 0007), and every sort is a (group_id, key,
+-- word_id) index seek that reads one page of rows.
+ALTER TABLE word_groups ADD COLUMN spanish TEXT;
+ALTER TABLE word_groups ADD COLUMN pronunciation TEXT;
+ALTER TABLE word_groups ADD COLUMN english TEXT;
+ALTER TABLE word_groups ADD COLUMN correct_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE word_groups ADD COLUMN wrong_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE word_groups
+SET (spanish, pronunciation, english) = (
+  SELECT spanish, pronunciation, english FROM words w WHERE w.id = word_groups.word_id
+);
+
+-- A word without a counter row keeps the zero defaults
+UPDATE word_groups
+SET (correct_count, wrong_count) = (
+  SELECT correct_count, wrong_count FROM word_reviews wr WHERE wr.word_id = word_groups.word_id
+)
+WHERE EXISTS (SELECT 1 FROM word_reviews wr WHERE wr.word_id = word_groups.word_id);
+
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id_spanish ON word_groups (group_id, spanish, word_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id_pronunciation ON word_groups (group_id, pronunciation, word_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id_english ON word_groups (group_id, english, word_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id_correct_count ON word_groups (group_id, correct_count, word_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id_wrong_count ON word_groups (group_id, wrong_count, word_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_insert_sort_keys
+AFTER INSERT ON word_groups
+BEGIN
+  UPDATE word_groups
+  SET (spanish, pronunciation, english) = (
+    SELECT spanish, pronunciation, english FROM words WHERE id = new.word_id
+  ),
+  (correct_count, wrong_count) = (
+    SELECT COALESCE(MAX(correct_count), 0), COALESCE(MAX(wrong_count), 0) FROM word_reviews WHERE word_id = new.word_id
+  )
+  WHERE rowid = new.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_update_sort_keys
+AFTER UPDATE OF word_id ON word_groups
+WHEN new.word_id IS NOT old.word_id
+BEGIN
+  UPDATE word_groups
+  SET (spanish, pronunciation, english) = (
+    SELECT spanish, pronunciation, english FROM words WHERE id = new.word_id
+  ),
+  (correct_count, wrong_count) = (
+    SELECT COALESCE(MAX(correct_count), 0), COALESCE(MAX(wrong_count), 0) FROM word_reviews WHERE word_id = new.word_id
+  )
+  WHERE rowid = new.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_update_group_sort_keys
+AFTER UPDATE OF spanish, pronunciation, english ON words
+BEGIN
+  UPDATE word_groups
+  SET spanish = new.spanish, pronunciation = new.pronunciation, english = new.english
+  WHERE word_id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_insert_group_sort_keys
+AFTER INSERT ON word_reviews
+BEGIN
+  UPDATE word_groups
+  SET correct_count = new.correct_count, wrong_count = new.wrong_count
+  WHERE word_id = new.word_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_update_group_sort_keys
+AFTER UPDATE OF correct_count, wrong_count ON word_reviews
+BEGIN
+  UPDATE word_groups
+  SET correct_count = new.correct_count, wrong_count = new.wrong_count
+  WHERE word_id = new.word_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_delete_group_sort_keys
+AFTER DELETE ON word_reviews
+BEGIN
+  UPDATE word_groups SET correct_count = 0, wrong_count = 0 WHERE word_id = old.word_id;
+END;
@@ -0,0 +1,82 @@
+-- Recompute the dashboard rollups from study_sessions and word_review_items.
+-- Mastery uses the same thresholds as lib/stats.py (>= 5 attempts, >= 80% correct).
+-- study_day() is registered on every connection by lib/db.Db and maps a UTC
+-- timestamp to its local day in STUDY_TIMEZONE.
+DELETE FROM daily_study_stats;
+
+INSERT INTO daily_study_stats (day, sessions_count, reviews_count, correct_count)
+SELECT day, SUM(sessions), SUM(reviews), SUM(correct)
+FROM (
+  SELECT study_day(created_at) AS day, 1 AS sessions, 0 AS reviews, 0 AS correct
+  FROM study_sessions
+  UNION ALL
+  SELECT study_day(wri.created_at), 0, 1, CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END
+  FROM word_review_items wri
+  JOIN study_sessions ss ON wri.study_session_id = ss.id
+)
+GROUP BY day;
+
+DELETE FROM daily_group_activity;
+
+INSERT INTO daily_group_activity (day, group_id, sessions_count)
+SELECT study_day(created_at), group_id, COUNT(*)
+FROM study_sessions
+GROUP BY study_day(created_at), group_id;
+
+INSERT OR IGNORE INTO study_totals (id) VALUES (1);
+
+WITH word_stats AS (
+  SELECT
+    word_id,
+    COUNT(*) AS attempts,
+    SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) AS correct_count
+  FROM word_review_items wri
+  JOIN study_sessions ss ON wri.study_session_id = ss.id
+  GROUP BY word_id
+)
+UPDATE study_totals SET
+  sessions_count = (SELECT COUNT(*) FROM study_sessions),
+  reviews_count = (SELECT COALESCE(SUM(attempts), 0) FROM word_stats),
+  correct_count = (SELECT COALESCE(SUM(correct_count), 0) FROM word_stats),
+  words_studied = (SELECT COUNT(*) FROM word_stats),
+  mastered_words = (
+    SELECT COUNT(*) FROM word_stats
+    WHERE attempts >= 5 AND correct_count * 1.0 / attempts >= 0.8
+  )
+WHERE id = 1;
+
+-- Streaks: consecutive days share the same julianday(day) - row_number
+WITH days AS (
+  SELECT day, julianday(day) - ROW_NUMBER() OVER (ORDER BY day) AS run
+  FROM daily_study_stats
+),
+runs AS (
+  SELECT MAX(day) AS last_day, COUNT(*) AS length
+  FROM days
+  GROUP BY run
+)
+UPDATE study_totals SET
+  current_streak = COALESCE((SELECT length FROM runs ORDER BY last_day DESC LIMIT 1), 0),
+  longest_streak = COALESCE((SELECT MAX(length) FROM runs), 0),
+  last_study_day = (SELECT MAX(day) FROM daily_study_stats)
+WHERE id = 1;
+
+-- Per-session summaries behind the session listings
+UPDATE study_sessions
+SET
+  review_count = summary.review_count,
+  correct_count = summary.correct_count,
+  first_activity_at = summary.first_activity_at,
+  last_activity_at = summary.last_activity_at
+FROM (
+  SELECT
+    ss.id AS study_session_id,
+    COUNT(wri.id) AS review_count,
+    COUNT(CASE WHEN wri.correct = 1 THEN 1 END) AS correct_count,
+    MIN(wri.created_at) AS first_activity_at,
+    MAX(wri.created_at) AS last_activity_at
+  FROM study_sessions ss
+  LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
+  GROUP BY ss.id
+) summary
+WHERE summary.study_session_id = study_sessions.id;
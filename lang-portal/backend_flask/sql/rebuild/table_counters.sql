@@ -0,0 +1,10 @@
+-- Recompute the row totals and per-group word counts kept by the
+-- 0011_add_table_counters triggers.
+INSERT OR REPLACE INTO table_counters (name, row_count)
+SELECT 'words', COUNT(*) FROM words
+UNION ALL SELECT 'groups', COUNT(*) FROM groups
+UNION ALL SELECT 'word_groups', COUNT(*) FROM word_groups
+UNION ALL SELECT 'study_sessions', COUNT(*) FROM study_sessions;
+
+UPDATE groups
+SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id);
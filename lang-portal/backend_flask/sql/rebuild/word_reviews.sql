@@ -0,0 +1,13 @@
+-- Recompute the per-word review counters from the full review history.
+-- Every word gets a row, reviewed or not, so listings can inner join it.
+DELETE FROM word_reviews;
+
+INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+SELECT
+  w.id,
+  COUNT(CASE WHEN wri.correct = 1 THEN 1 END),
+  COUNT(CASE WHEN wri.correct = 0 THEN 1 END),
+  MAX(wri.created_at)
+FROM words w
+LEFT JOIN word_review_items wri ON wri.word_id = w.id
+GROUP BY w.id;
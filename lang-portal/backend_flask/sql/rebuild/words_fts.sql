@@ -0,0 +1,4 @@
+-- Re-index every word for /words/search, e.g. after editing words with the
+-- triggers disabled or changing the tokenizer.
+INSERT INTO words_fts (words_fts) VALUES ('rebuild');
+INSERT INTO words_fts (words_fts) VALUES ('optimize');
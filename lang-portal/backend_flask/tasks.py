@@ -1,9 +1,126 @@
 from invoke import task
-from lib.db import db
+
+# Tasks run against the app the server would create, so they see the same
+# config (DATABASE_PATH, FLASK_STUDY_TIMEZONE, ...) and open the same database
+def task_app():
+  from app import create_app
+  return create_app()
 
 @task
 def init_db(c):
-  from flask import Flask
-  app = Flask(__name__)
-  db.init(app)
-  print("Database initialized successfully.")
\ No newline at end of file
+  app = task_app()
+  app.db.init(app)
+  print("Database initialized successfully.")
+
+@task
+def migrate(c):
+  from migrate import run_migrations
+  run_migrations()
+
+@task
+def rebuild_word_reviews(c):
+  app = task_app()
+  with app.app_context():
+    app.db.rebuild(app.db.cursor(), 'word_reviews')
+  print("Rebuilt word_reviews from word_review_items.")
+
+@task
+def bench_reviews(c):
+  from benchmarks.bench_reviews import main
+  main()
+
+@task
+def rebuild_study_stats(c):
+  app = task_app()
+  with app.app_context():
+    app.db.rebuild(app.db.cursor(), 'study_stats')
+  print("Rebuilt dashboard rollups from study_sessions and word_review_items.")
+
+@task(help={
+  'path': 'JSON array or NDJSON file of {spanish, pronunciation, english, parts} objects',
+  'group': 'name of a new group to create for the words',
+  'group_id': 'id of an existing group to add the words to instead',
+  'batch_size': 'rows merged per statement (default 5000)',
+})
+def import_words(c, path, group=None, group_id=None, batch_size=5000):
+  import time
+  from lib import importer
+
+  if (group is None) == (group_id is None):
+    raise SystemExit('Pass exactly one of --group or --group-id')
+
+  def progress(count, elapsed):
+    print(f"{count} words, {count / max(elapsed, 1e-9):,.0f} words/s")
+
+  app = task_app()
+  with app.app_context():
+    started_at = time.perf_counter()
+    if group is not None:
+      app.db.import_word_json(app.db.cursor(), group, path, batch_size=int(batch_size), progress=progress)
+    else:
+      with open(path, 'r', encoding='utf-8') as file:
+        count = importer.import_words(app.db.get(), importer.iter_json_objects(file), int(group_id), batch_size=int(batch_size), progress=progress)
+      print(f"Successfully added {count} words to group {group_id}.")
+    print(f"Finished in {time.perf_counter() - started_at:.2f}s")
+
+@task
+def rebuild_words_fts(c):
+  app = task_app()
+  with app.app_context():
+    app.db.rebuild(app.db.cursor(), 'words_fts')
+  print("Rebuilt the words_fts search index from words.")
+
+@task
+def rebuild_table_counters(c):
+  app = task_app()
+  with app.app_context():
+    app.db.rebuild(app.db.cursor(), 'table_counters')
+  print("Rebuilt table_counters and groups.words_count.")
+
+@task(help={
+  'scale': 'database scale to run against, generated on first use',
+  'path': 'run against this database file instead',
+  'iterations': 'timed runs of each path, best one reported (default 10)',
+})
+def bench_raw_words(c, scale='small', path=None, iterations=10):
+  from benchmarks.bench_raw_words import main
+  main(scale, path, int(iterations))
+
+@task(help={
+  'learners': 'concurrent worker processes, one learner each (default 8)',
+  'batches': 'review batches per learner (default 100)',
+})
+def bench_learners(c, learners=8, batches=100):
+  from benchmarks.bench_learners import main
+  main(int(learners), int(batches))
+
+@task(help={'samples': 'fresh interpreters to time (default 10)'})
+def bench_startup(c, samples=10):
+  from benchmarks.bench_startup import main
+  main(int(samples))
+
+@task(help={
+  'scale': 'tiny, small, medium or large (see benchmarks/generate.py)',
+  'path': 'database file to write (default benchmarks/data/<scale>.db)',
+  'force': 'regenerate even if the file exists',
+  'words': 'override the number of words',
+  'groups': 'override the number of groups',
+  'sessions': 'override the number of study sessions',
+  'review_items': 'override the number of review items',
+})
+def bench_generate(c, scale='small', path=None, force=False, words=None, groups=None, sessions=None, review_items=None):
+  from benchmarks.generate import main
+  main(scale, path, force, words=words and int(words), groups=groups and int(groups),
+       sessions=sessions and int(sessions), review_items=review_items and int(review_items))
+
+@task(help={
+  'scale': 'database scale to run against, generated on first use',
+  'path': 'run against this database file instead',
+  'iterations': 'timed requests per route (default 50)',
+  'cache': 'keep the response cache enabled',
+  'output': 'also write the JSON report to this file',
+  'baseline': 'earlier JSON report to flag p95 regressions against',
+})
+def bench_routes(c, scale='small', path=None, iterations=50, cache=False, output=None, baseline=None):
+  from benchmarks.bench_routes import main
+  main(scale, path, int(iterations), cache, output, baseline)
@@ -5,17 +5,30 @@ import json
 import sqlite3
 
 from app import create_app
+from migrate import run_migrations
 
 
 @pytest.fixture
-def app():
-    """Create and configure a Flask app for testing."""
+def app_config():
+    """Extra app config for every test in a module; override this fixture there."""
+    return {}
+
+
+@pytest.fixture
+def app(request, app_config):
+    """Create and configure a Flask app for testing.
+
+    Config from `app_config`, updated with the test's own when the fixture is
+    parametrized indirectly: @pytest.mark.parametrize('app', [{...}], indirect=True)
+    """
     # Create a temporary file to isolate the database for each test
     db_fd, db_path = tempfile.mkstemp()
     
     app = create_app({
         'TESTING': True,
         'DATABASE': db_path,
+        **app_config,
+        **getattr(request, 'param', {}),
     })
 
     # Create the database and load test data
@@ -24,7 +37,12 @@ def app():
     
     yield app
     
-    # Close and remove the temporary database
+    # Write or drop anything still queued, then close and remove the databases
+    if app.review_writer is not None:
+        app.review_writer.close()
+    if app.learners is not None:
+        app.learners.close_all()
+    app.db.close_all()
     os.close(db_fd)
     os.unlink(db_path)
 
@@ -35,6 +53,18 @@ def client(app):
     return app.test_client()
 
 
+def submit_reviews(client, reviews, session_id=1, headers=None):
+    """POST a review batch; each review is a {word_id, is_correct} dict or a (word_id, is_correct) pair."""
+    reviews = [
+        review if isinstance(review, dict) else {"word_id": review[0], "is_correct": review[1]}
+        for review in reviews
+    ]
+    return client.post(f'/api/study_sessions/{session_id}/review',
+                       data=json.dumps({"reviews": reviews}),
+                       content_type='application/json',
+                       headers=headers)
+
+
 def init_test_database(app):
     """Initialize the test database with schema and test data."""
     conn = sqlite3.connect(app.config['DATABASE'])
@@ -51,6 +81,17 @@ def init_test_database(app):
     )
     ''')
     
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS word_reviews (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      word_id INTEGER NOT NULL,
+      correct_count INTEGER DEFAULT 0,
+      wrong_count INTEGER DEFAULT 0,
+      last_reviewed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      FOREIGN KEY (word_id) REFERENCES words(id)
+    )
+    ''')
+    
     conn.execute('''
     CREATE TABLE IF NOT EXISTS groups (
       id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -72,7 +113,8 @@ def init_test_database(app):
     CREATE TABLE IF NOT EXISTS study_activities (
       id INTEGER PRIMARY KEY AUTOINCREMENT,
       name TEXT NOT NULL,
-      url TEXT NOT NULL
+      url TEXT NOT NULL,
+      preview_url TEXT
     )
     ''')
     
@@ -99,10 +141,13 @@ def init_test_database(app):
     )
     ''')
     
+    # Apply the versioned migrations (indexes, constraints) on top of the base tables
+    conn.commit()
+    run_migrations(app.config['DATABASE'])
+    
     # Insert test data
-    # Add a group
-    conn.execute("INSERT INTO groups (name, words_count) VALUES (?, ?)", 
-                 ("Test Group", 2))
+    # Add a group (its words_count follows the word_groups rows below)
+    conn.execute("INSERT INTO groups (name) VALUES (?)", ("Test Group",))
     
     # Add words with parts as JSON
     word1_parts = json.dumps([
@@ -142,6 +187,9 @@ def init_test_database(app):
     
     conn.commit()
     conn.close()
+    
+    # The fixture rows above bypass the app's write path, so derive the rollups from them
+    app.db.rebuild(app.db.cursor(), 'study_stats')
 
 
 @pytest.fixture
@@ -0,0 +1,60 @@
+import sqlite3
+
+import app as app_module
+from app import create_app
+
+
+def test_create_app_does_not_touch_the_database(tmp_path):
+    path = tmp_path / 'missing.db'
+    app = create_app({'TESTING': True, 'DATABASE': str(path)})
+    assert not path.exists()
+    assert app.db.pool_stats()['opened'] == 0
+    assert app.db.writer_stats()['opened'] == 0
+
+
+def test_importing_app_does_not_create_one():
+    assert 'app' not in vars(app_module)
+
+
+def test_activity_origins_are_allowed(client):
+    response = client.get('/metrics', headers={'Origin': 'http://example.com'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://example.com'
+    assert 'Origin' in response.headers['Vary']
+
+    response = client.get('/metrics', headers={'Origin': 'http://evil.example'})
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+
+def test_origins_are_cached_until_activities_change(client, app):
+    for _ in range(3):
+        client.get('/metrics', headers={'Origin': 'http://example.com'})
+    assert app.allowed_origins.stats()['loads'] == 1
+
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.execute("INSERT INTO study_activities (name, url) VALUES ('Typing', 'https://typing.example/play')")
+    conn.commit()
+    conn.close()
+    assert 'Access-Control-Allow-Origin' not in client.get('/metrics', headers={'Origin': 'https://typing.example'}).headers
+
+    app.cache.invalidate('study_activities')
+    response = client.get('/metrics', headers={'Origin': 'https://typing.example'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'https://typing.example'
+    assert app.allowed_origins.stats()['loads'] == 2
+
+
+def test_api_routes_follow_the_allowed_origins(client):
+    for url in ['/words', '/api/study_activities', '/api/study_sessions']:
+        response = client.get(url, headers={'Origin': 'http://evil.example'})
+        assert response.status_code == 200
+        assert 'Access-Control-Allow-Origin' not in response.headers
+
+        response = client.get(url, headers={'Origin': 'http://example.com'})
+        assert response.headers['Access-Control-Allow-Origin'] == 'http://example.com'
+
+    response = client.options('/api/study_sessions', headers={'Origin': 'http://example.com',
+                                                               'Access-Control-Request-Method': 'POST'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://example.com'
+    assert 'POST' in response.headers['Access-Control-Allow-Methods']
+    response = client.options('/api/study_sessions', headers={'Origin': 'http://evil.example',
+                                                               'Access-Control-Request-Method': 'POST'})
+    assert 'Access-Control-Allow-Origin' not in response.headers
@@ -0,0 +1,71 @@
+import json
+
+from tests.conftest import submit_reviews
+
+
+def get_stats(client):
+    response = client.get('/dashboard/stats')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+
+def test_stats_follow_sessions_and_reviews(client):
+    """Totals, mastery and active groups move with each write."""
+    stats = get_stats(client)
+    assert stats['total_vocabulary'] == 2
+    assert stats['total_sessions'] == 1
+    assert stats['total_words_studied'] == 0
+    assert stats['success_rate'] == 0
+
+    response = client.post('/api/study_sessions', json={'group_id': 1, 'study_activity_id': 1})
+    session_id = json.loads(response.data)['study_session']['id']
+
+    assert submit_reviews(client, [(1, True)] * 4 + [(2, False)], session_id=session_id).status_code == 201
+    stats = get_stats(client)
+    assert stats['total_sessions'] == 2
+    assert stats['total_words_studied'] == 2
+    assert stats['mastered_words'] == 0
+    assert stats['success_rate'] == 0.8
+    assert stats['active_groups'] == 1
+
+    # The fifth correct attempt masters word 1; a later miss keeps it at 5/6
+    assert submit_reviews(client, [(1, True)], session_id=session_id).status_code == 201
+    assert get_stats(client)['mastered_words'] == 1
+    assert submit_reviews(client, [(1, False)], session_id=session_id).status_code == 201
+    assert get_stats(client)['mastered_words'] == 1
+    assert submit_reviews(client, [(1, False)], session_id=session_id).status_code == 201
+    assert get_stats(client)['mastered_words'] == 0
+
+
+def test_rebuild_matches_maintained_rollups(client, app):
+    """Rebuilding from history reproduces the incrementally maintained rollups."""
+    response = client.post('/api/study_sessions', json={'group_id': 1, 'study_activity_id': 2})
+    session_id = json.loads(response.data)['study_session']['id']
+    assert submit_reviews(client, [(1, True)] * 6 + [(2, False), (2, True)], session_id=session_id).status_code == 201
+    assert submit_reviews(client, [(2, True)] * 3).status_code == 201
+
+    def snapshot():
+        with app.app_context():
+            cursor = app.db.cursor()
+            return (
+                [tuple(row) for row in cursor.execute('SELECT * FROM study_totals')],
+                [tuple(row) for row in cursor.execute('SELECT * FROM daily_study_stats ORDER BY day')],
+                [tuple(row) for row in cursor.execute('SELECT * FROM daily_group_activity ORDER BY day, group_id')],
+            )
+
+    maintained = snapshot()
+    with app.app_context():
+        app.db.rebuild(app.db.cursor(), 'study_stats')
+    assert snapshot() == maintained
+
+
+def test_reset_clears_rollups(client):
+    """Clearing the study history empties the dashboard."""
+    assert submit_reviews(client, [(1, True)]).status_code == 201
+    client.post('/api/study_sessions/reset')
+
+    stats = get_stats(client)
+    assert stats['total_sessions'] == 0
+    assert stats['total_words_studied'] == 0
+    assert stats['active_groups'] == 0
+    assert stats['current_streak'] == 0
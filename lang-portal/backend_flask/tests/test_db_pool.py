@@ -0,0 +1,100 @@
+import sqlite3
+
+import pytest
+
+from lib import db as db_module
+
+from lib.pool import ConnectionPool, PoolTimeout
+
+
+def test_app_contexts_reuse_pooled_connection(app):
+    """Each app context borrows a connection and returns it at teardown."""
+    before = app.db.pool_stats()
+    for _ in range(5):
+        with app.app_context():
+            app.db.read_cursor().execute('SELECT 1')
+
+    stats = app.db.pool_stats()
+    assert stats['opened'] == max(before['opened'], 1)
+    assert stats['acquired'] - before['acquired'] == 5
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 1
+
+
+def test_pragmas_applied_once_per_connection(app):
+    """New connections get the configured pragmas."""
+    with app.app_context():
+        cursor = app.db.cursor()
+        assert cursor.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert cursor.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+        assert cursor.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+
+
+def test_pool_is_bounded(app):
+    """Callers wait for a free connection and time out when none comes back."""
+    pool = ConnectionPool(app.config['DATABASE'], max_size=1, pragmas={'journal_mode': None}, timeout=0.05)
+    connection = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+    pool.release(connection)
+    assert pool.acquire() is connection
+    pool.release(connection)
+    pool.close_all()
+
+
+def test_release_rolls_back_pending_writes(app):
+    """A connection returned mid-transaction does not leak its writes."""
+    pool = ConnectionPool(app.config['DATABASE'], max_size=1)
+    connection = pool.acquire()
+    connection.execute("INSERT INTO groups (name) VALUES ('Uncommitted')")
+    pool.release(connection)
+
+    connection = pool.acquire()
+    assert connection.execute("SELECT COUNT(*) FROM groups WHERE name = 'Uncommitted'").fetchone()[0] == 0
+    pool.release(connection)
+    pool.close_all()
+
+
+def test_readers_are_read_only(app):
+    with app.app_context():
+        cursor = app.db.read_cursor()
+        assert cursor.execute('SELECT COUNT(*) FROM words').fetchone()[0] == 2
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            cursor.execute("INSERT INTO groups (name) VALUES ('Nope')")
+
+
+def test_reads_skip_the_writer_and_writes_release_it(client, app):
+    """GET handlers never take the writer; POST handlers hold it only for their transaction."""
+    before = app.db.writer_stats()
+    assert client.get('/dashboard/stats').status_code == 200
+    assert client.get('/words').status_code == 200
+    assert app.db.writer_stats()['acquired'] == before['acquired']
+
+    response = client.post('/api/study_sessions', json={'group_id': 1, 'study_activity_id': 1})
+    assert response.status_code == 201
+    stats = app.db.writer_stats()
+    assert (stats['acquired'], stats['in_use'], stats['max_size']) == (before['acquired'] + 1, 0, 1)
+
+
+def test_transaction_retries_while_another_process_writes(app, monkeypatch):
+    """BEGIN IMMEDIATE is retried on SQLITE_BUSY, then the error surfaces."""
+    monkeypatch.setattr(db_module, 'WRITE_RETRY_DELAY', 0)
+    other = sqlite3.connect(app.config['DATABASE'])
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        with app.app_context():
+            connection = app.db.get()
+            connection.execute('PRAGMA busy_timeout = 0')
+            attempts = []
+            connection.set_trace_callback(attempts.append)
+            with pytest.raises(sqlite3.OperationalError, match='locked'):
+                with app.db.transaction():
+                    pass
+            connection.set_trace_callback(None)
+            connection.execute('PRAGMA busy_timeout = 5000')
+    finally:
+        other.rollback()
+        other.close()
+    assert attempts.count('BEGIN IMMEDIATE') == db_module.WRITE_RETRIES + 1
@@ -0,0 +1,47 @@
+import json
+
+
+def add_words(client, group_id, word_ids):
+    return client.post(f'/groups/{group_id}/words', data=json.dumps({"word_ids": word_ids}),
+                       content_type='application/json')
+
+
+def group_member_ids(client, group_id):
+    data = json.loads(client.get(f'/groups/{group_id}/words/raw').data)
+    return sorted(word['id'] for word in data['words'])
+
+
+def test_add_words_is_idempotent(client):
+    response = add_words(client, 2, [1, 2, 2])
+    assert response.status_code == 200
+    assert json.loads(response.data) == {"group_id": 2, "word_ids_count": 2, "added": 2, "words_count": 2}
+
+    data = json.loads(add_words(client, 2, [2, 1]).data)
+    assert (data['added'], data['words_count']) == (0, 2)
+    assert group_member_ids(client, 2) == [1, 2]
+    assert json.loads(client.get('/groups/2').data)['word_count'] == 2
+
+
+def test_remove_words_from_an_id_file(client):
+    response = client.delete('/groups/1/words', data='2\n\n999\n', content_type='text/plain')
+    assert response.status_code == 200
+    assert json.loads(response.data) == {"group_id": 1, "word_ids_count": 2, "removed": 1, "words_count": 1}
+    assert group_member_ids(client, 1) == [1]
+
+
+def test_unknown_words_reject_the_whole_batch(client):
+    response = add_words(client, 2, [1, 999])
+    assert response.status_code == 404
+    assert '999' in json.loads(response.data)['error']
+    assert group_member_ids(client, 2) == []
+
+
+def test_invalid_requests(client):
+    assert add_words(client, 999, [1]).status_code == 404
+    assert add_words(client, 2, []).status_code == 400
+    assert add_words(client, 2, ["1"]).status_code == 400
+    assert add_words(client, 2, [2**70]).status_code == 400
+    assert add_words(client, 2, [-2**63 - 1]).status_code == 400
+    assert client.post('/groups/2/words', data=f'1\n{2**63}\n', content_type='text/plain').status_code == 400
+    assert client.post('/groups/2/words', data='1\nabc\n', content_type='text/plain').status_code == 400
+    assert client.post('/groups/2/words', data=json.dumps({"ids": [1]}), content_type='application/json').status_code == 400
@@ -30,6 +30,22 @@ def test_get_group_words_raw_success(client, app):
     assert word['parts'][1]['pronunciation'] == ['ar']
 
 
+def test_get_group_words_raw_follows_word_updates(client, app):
+    """The serialized word JSON is kept in step with the word's columns."""
+    with app.app_context():
+        with app.db.transaction() as cursor:
+            cursor.execute("""UPDATE words SET english = 'to pay for', parts = '[ {"spanish": "pagar"} ]' WHERE id = 1""")
+            cursor.execute('SELECT raw_json FROM words WHERE id = 1')
+            raw_json = cursor.fetchone()[0]
+
+    assert json.loads(raw_json) == {
+        "id": 1, "spanish": "pagar", "pronunciation": "pah-GAR", "english": "to pay for",
+        "parts": [{"spanish": "pagar"}]
+    }
+    word = json.loads(client.get('/groups/1/words/raw').data)['words'][0]
+    assert (word['english'], word['parts']) == ('to pay for', [{"spanish": "pagar"}])
+
+
 def test_get_group_words_raw_group_not_found(client, app):
     """Test response when group doesn't exist."""
     response = client.get('/groups/999/words/raw')
@@ -57,3 +73,85 @@ def test_get_group_words_raw_dynamic_empty_group(client, app, create_empty_group
     data = json.loads(response.data)
     assert 'words' in data
     assert len(data['words']) == 0
+
+
+def test_get_group_words_raw_stream(client, app):
+    """Test streaming the group's words as NDJSON, selected by ?stream=1 or Accept."""
+    for url, headers in [
+        ('/groups/1/words/raw?stream=1', {}),
+        ('/groups/1/words/raw', {'Accept': 'application/x-ndjson'}),
+    ]:
+        # Each stream is read to the end before the next request is made
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.is_streamed
+        lines = response.get_data(as_text=True).splitlines()
+        words = [json.loads(line) for line in lines]
+        assert [word['spanish'] for word in words] == ['pagar', 'ir']
+        assert words[0]['parts'][0] == {'spanish': 'pag', 'pronunciation': ['pah', 'g']}
+
+    # Without an explicit preference the JSON document is still returned
+    response = client.get('/groups/1/words/raw', headers={'Accept': '*/*'})
+    assert response.mimetype == 'application/json'
+    assert len(json.loads(response.data)['words']) == 2
+
+
+def test_get_group_words_raw_stream_errors(client, app):
+    """Test streaming mode still answers missing groups with a JSON 404 and empty groups with no lines."""
+    response = client.get('/groups/999/words/raw?stream=1')
+    assert response.status_code == 404
+    assert json.loads(response.data)['error'] == 'Group not found'
+
+    response = client.get('/groups/2/words/raw?stream=1')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == ''
+
+
+def test_get_group_study_sessions_uses_session_summaries(client, app):
+    """Test review counts and end times come from the summary columns kept by each review batch."""
+    response = client.post('/api/study_sessions', data=json.dumps({"group_id": 1, "study_activity_id": 2}),
+                           content_type='application/json')
+    new_session_id = json.loads(response.data)['study_session']['id']
+    client.post(f'/api/study_sessions/{new_session_id}/review',
+                data=json.dumps({"reviews": [{"word_id": 1, "is_correct": True}, {"word_id": 2, "is_correct": False}]}),
+                content_type='application/json')
+
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT review_count, correct_count, first_activity_at, last_activity_at FROM study_sessions WHERE id = ?',
+                       (new_session_id,))
+        review_count, correct_count, first_activity_at, last_activity_at = cursor.fetchone()
+    assert (review_count, correct_count) == (2, 1)
+    assert first_activity_at == last_activity_at is not None
+
+    response = client.get('/groups/1/study_sessions?sort_by=reviewItemsCount&order=desc')
+    assert response.status_code == 200
+    sessions = json.loads(response.data)['study_sessions']
+    assert [session['id'] for session in sessions] == [new_session_id, 1]
+    assert sessions[0]['review_items_count'] == 2
+    assert sessions[0]['end_time'] == last_activity_at
+
+    # A session without reviews or an explicit end ends when it started
+    assert sessions[1]['review_items_count'] == 0
+    assert sessions[1]['end_time'] == '2025-03-18T10:00:00Z'
+    assert sessions[1]['duration_seconds'] == 0
+
+
+def test_get_group_study_sessions_sorts_by_index_range_scan(app):
+    """Test each sort of the group session listing walks a (group_id, ...) index instead of sorting."""
+    with app.app_context():
+        cursor = app.db.cursor()
+        for column in ['created_at', 'end_time', 'review_count']:
+            cursor.execute(f'''
+                EXPLAIN QUERY PLAN
+                SELECT s.id FROM study_sessions s
+                JOIN study_activities a ON s.study_activity_id = a.id
+                JOIN groups g ON s.group_id = g.id
+                WHERE s.group_id = ?
+                ORDER BY s.{column} DESC, s.id DESC
+                LIMIT 10
+            ''', (1,))
+            plan = ' '.join(row['detail'] for row in cursor.fetchall())
+            assert f'idx_study_sessions_group_id_{column}' in plan
+            assert 'TEMP B-TREE' not in plan
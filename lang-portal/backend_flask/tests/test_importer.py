@@ -0,0 +1,132 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from lib.importer import import_words, iter_json_objects
+from migrate import run_migrations
+
+
+WORDS = [
+    {"spanish": "hablar", "pronunciation": "ah-BLAR", "english": "to speak, to talk",
+     "parts": [{"spanish": "habl", "pronunciation": ["ah", "bl"]}, {"spanish": "ar", "pronunciation": ["ar"]}]},
+    {"spanish": "comer", "pronunciation": "ko-MER", "english": "to eat [a meal]",
+     "parts": [{"spanish": "com", "pronunciation": ["ko", "m"]}, {"spanish": "er", "pronunciation": ["er"]}]},
+    {"spanish": "pagar", "pronunciation": "pah-GAR", "english": "to pay", "parts": []},
+]
+
+
+def group_words(app, group_id):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('''
+            SELECT w.spanish, w.pronunciation FROM words w
+            JOIN word_groups wg ON wg.word_id = w.id
+            WHERE wg.group_id = ?
+            ORDER BY w.spanish
+        ''', (group_id,))
+        words = [tuple(row) for row in cursor.fetchall()]
+        cursor.execute('SELECT words_count FROM groups WHERE id = ?', (group_id,))
+        return words, cursor.fetchone()[0]
+
+
+@pytest.mark.parametrize('read_size', [1, 7, 1 << 16])
+def test_parses_json_arrays_in_chunks(read_size):
+    """Objects split across reads, including brackets and commas inside strings, parse intact."""
+    data = io.StringIO(json.dumps(WORDS, indent=2))
+    assert list(iter_json_objects(data, read_size=read_size)) == WORDS
+
+
+def test_parses_ndjson():
+    data = io.StringIO('\n'.join(json.dumps(word) for word in WORDS) + '\n')
+    assert list(iter_json_objects(data, read_size=5)) == WORDS
+
+
+def test_truncated_array_is_an_error():
+    data = io.StringIO(json.dumps(WORDS)[:-1])
+    with pytest.raises(ValueError):
+        list(iter_json_objects(data, read_size=8))
+
+
+def test_import_into_existing_group_upserts_words(app):
+    """Existing (spanish, english) pairs are updated in place and joined to the group once."""
+    with app.app_context():
+        count = import_words(app.db.get(), iter(WORDS), group_id=2, batch_size=2)
+    assert count == 3
+
+    words, words_count = group_words(app, 2)
+    assert words == [('comer', 'ko-MER'), ('hablar', 'ah-BLAR'), ('pagar', 'pah-GAR')]
+    assert words_count == 3
+
+    # pagar already existed as word 1; its new pronunciation replaces the old one
+    renamed = dict(WORDS[2], pronunciation='pa-GAR')
+    with app.app_context():
+        import_words(app.db.get(), iter(WORDS[:2] + [renamed]), group_id=2)
+        cursor = app.db.cursor()
+        cursor.execute("SELECT id, pronunciation FROM words WHERE spanish = 'pagar'")
+        assert [tuple(row) for row in cursor.fetchall()] == [(1, 'pa-GAR')]
+        cursor.execute('SELECT COUNT(*) FROM words')
+        assert cursor.fetchone()[0] == 4
+
+    assert group_words(app, 2)[1] == 3
+    assert group_words(app, 1)[1] == 2
+
+
+def test_import_word_json_creates_group(app, tmp_path):
+    path = tmp_path / 'words.json'
+    path.write_text(json.dumps(WORDS))
+
+    with app.app_context():
+        group_id = app.db.import_word_json(app.db.cursor(), 'Imported', str(path))
+        app.db.import_word_json(app.db.cursor(), 'Imported Again', str(path))
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) FROM words')
+        assert cursor.fetchone()[0] == 4
+
+    assert group_words(app, group_id)[1] == 3
+
+
+def test_import_restores_deferred_indexes(app):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    before = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall()
+    conn.close()
+
+    with app.app_context():
+        import_words(app.db.get(), iter(WORDS), group_id=2)
+
+    conn = sqlite3.connect(app.config['DATABASE'])
+    after = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall()
+    conn.close()
+    assert after == before
+
+
+def test_failed_import_is_rolled_back(app):
+    broken = WORDS[:2] + [{"spanish": "sin"}]
+    with app.app_context():
+        with pytest.raises(KeyError):
+            import_words(app.db.get(), iter(broken), group_id=2, batch_size=1)
+
+    assert group_words(app, 2) == ([], 0)
+
+
+def test_migration_merges_duplicate_words(app):
+    """Duplicates from before the unique index are folded into the lowest id."""
+    db_path = app.config['DATABASE']
+    conn = sqlite3.connect(db_path)
+    conn.execute('DROP INDEX idx_words_spanish_english')
+    conn.execute("INSERT INTO words (spanish, pronunciation, english, parts) VALUES ('pagar', 'pah-GAR', 'to pay', '[]')")
+    conn.execute('INSERT INTO word_groups (word_id, group_id) VALUES (3, 1), (3, 2)')
+    conn.execute('UPDATE word_reviews SET correct_count = 2 WHERE word_id IN (1, 3)')
+    conn.execute("DELETE FROM schema_migrations WHERE version = '0005_unique_words'")
+    conn.commit()
+    conn.close()
+
+    assert run_migrations(db_path) == ['0005_unique_words.sql']
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT id FROM words WHERE spanish = 'pagar'").fetchall() == [(1,)]
+    assert conn.execute('SELECT group_id FROM word_groups WHERE word_id = 1 ORDER BY group_id').fetchall() == [(1,), (2,)]
+    assert conn.execute('SELECT correct_count FROM word_reviews WHERE word_id IN (1, 3)').fetchall() == [(4,)]
+    assert conn.execute('SELECT words_count FROM groups ORDER BY id').fetchall() == [(2,), (1,)]
+    conn.close()
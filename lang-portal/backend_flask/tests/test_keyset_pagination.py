@@ -0,0 +1,99 @@
+import json
+import sqlite3
+
+import pytest
+
+from lib.pagination import encode_cursor
+
+
+def add_group_words(app, count):
+    """Add `count` words to the test group (ID 1), reusing spellings so sort values repeat."""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    for i in range(count):
+        cursor = conn.execute(
+            "INSERT INTO words (spanish, pronunciation, english, parts) VALUES (?, ?, ?, ?)",
+            (f"palabra{i % 7}", f"pah-LAH-brah{i}", f"word {i}", "[]"))
+        conn.execute("INSERT INTO word_groups (word_id, group_id) VALUES (?, 1)", (cursor.lastrowid,))
+    conn.commit()
+    conn.close()
+
+
+def walk_cursor(client, url, params):
+    """Follow next_cursor from the first page until the last, returning all ids in order."""
+    ids = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(url, query_string={**params, 'cursor': cursor})
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        ids.extend(word['id'] for word in data['words'])
+        cursor = data['next_cursor']
+    return ids
+
+
+def test_group_words_cursor_matches_page_order(client, app):
+    """Walking the cursor visits the same rows, in the same order, as paging by number."""
+    add_group_words(app, 25)
+
+    for sort_by in ['spanish', 'pronunciation', 'english', 'correct_count', 'wrong_count']:
+        for order in ['asc', 'desc']:
+            params = {'sort_by': sort_by, 'order': order}
+            paged_ids = []
+            for page in range(1, 4):
+                data = json.loads(client.get('/groups/1/words', query_string={**params, 'page': page}).data)
+                paged_ids.extend(word['id'] for word in data['words'])
+
+            cursor_ids = walk_cursor(client, '/groups/1/words', params)
+            assert cursor_ids == paged_ids
+            assert len(set(cursor_ids)) == 27
+
+
+def test_words_cursor_last_page(client):
+    """A single page of words has no next cursor."""
+    response = client.get('/words?cursor=')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [word['spanish'] for word in data['words']] == ['ir', 'pagar']
+    assert data['next_cursor'] is None
+    assert data['current_page'] is None
+
+
+def test_cursor_rejected_for_other_sort(client, app):
+    """Cursors are bound to the sort they were issued for."""
+    add_group_words(app, 25)
+    data = json.loads(client.get('/groups/1/words?cursor=').data)
+    response = client.get('/groups/1/words', query_string={'cursor': data['next_cursor'], 'sort_by': 'english'})
+    assert response.status_code == 400
+
+    response = client.get('/words?cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert 'error' in json.loads(response.data)
+
+
+@pytest.mark.parametrize('value, row_id', [([1], 1), ({'a': 1}, 1), (True, 1), (2**70, 1), ('a', True), ('a', 2**63)])
+def test_crafted_cursor_values_are_rejected(client, value, row_id):
+    """A cursor whose value or id SQLite cannot bind is a 400, not a 500."""
+    for url in ['/words', '/groups/1/words']:
+        response = client.get(url, query_string={'cursor': encode_cursor('spanish', 'asc', value, row_id)})
+        assert response.status_code == 400
+        assert json.loads(response.data) == {'error': 'Invalid cursor'}
+
+
+def test_group_words_sort_keys_follow_their_words(client, app):
+    """The sort keys copied onto word_groups track reviews, word edits and resets."""
+    client.post('/api/study_sessions/1/review',
+                data=json.dumps({"reviews": [{"word_id": 2, "is_correct": True}, {"word_id": 2, "is_correct": False}]}),
+                content_type='application/json')
+    data = json.loads(client.get('/groups/1/words?sort_by=correct_count&order=desc').data)
+    assert [(word['id'], word['correct_count'], word['wrong_count']) for word in data['words']] == [(2, 1, 1), (1, 0, 0)]
+
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.execute("UPDATE words SET spanish = 'zpagar' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    data = json.loads(client.get('/groups/1/words?sort_by=spanish&order=desc').data)
+    assert [word['spanish'] for word in data['words']] == ['zpagar', 'ir']
+
+    client.post('/api/study_sessions/reset')
+    data = json.loads(client.get('/groups/1/words?sort_by=correct_count&order=desc').data)
+    assert [(word['id'], word['correct_count']) for word in data['words']] == [(2, 0), (1, 0)]
@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+from flask.globals import request_ctx
+
+from lib.learners import learner_path
+from tests.conftest import submit_reviews
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'LEARNER_SHARDING': True, 'LEARNER_DB_DIR': str(tmp_path / 'learners')}
+
+
+@pytest.fixture(autouse=True)
+def context_per_request(app):
+    """pytest-flask keeps a request context pushed around each test that uses `app`,
+    so every request would share its `g` and hold learner databases until the test
+    ends. Pop it, so that each request borrows and releases its own."""
+    ctx = request_ctx._get_current_object()
+    ctx.pop()
+    yield
+    ctx.push()
+
+
+def as_learner(learner_id):
+    return {'X-Learner-Id': learner_id}
+
+
+def start_session(client, learner_id, group_id=1):
+    response = client.post('/api/study_sessions', headers=as_learner(learner_id),
+                           data=json.dumps({"group_id": group_id, "study_activity_id": 1}),
+                           content_type='application/json')
+    assert response.status_code == 201
+    return json.loads(response.data)['study_session']['id']
+
+
+def submit_learner_reviews(client, learner_id, session_id, reviews):
+    response = submit_reviews(client, reviews, session_id=session_id, headers=as_learner(learner_id))
+    assert response.status_code == 201
+
+
+def get_json(client, url, learner_id):
+    response = client.get(url, headers=as_learner(learner_id))
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+
+def shared_count(app, table):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_each_learner_sees_only_their_history(app):
+    client = app.test_client()
+    shared_sessions = shared_count(app, 'study_sessions')
+
+    ana_session = start_session(client, 'ana')
+    submit_learner_reviews(client, 'ana', ana_session, [{"word_id": 1, "is_correct": True}, {"word_id": 2, "is_correct": True}])
+    ben_session = start_session(client, 'ben', group_id=1)
+    submit_learner_reviews(client, 'ben', ben_session, [{"word_id": 1, "is_correct": False}])
+
+    # Both learners' first session has id 1, in their own files
+    assert ana_session == ben_session == 1
+    for learner_id in ['ana', 'ben']:
+        assert os.path.exists(learner_path(app.learners.directory, learner_id))
+    assert shared_count(app, 'study_sessions') == shared_sessions
+    assert shared_count(app, 'word_review_items') == 0
+
+    sessions = get_json(client, '/api/study_sessions', 'ana')
+    assert sessions['total'] == 1
+    assert sessions['items'][0]['group_name'] == 'Test Group'
+    assert sessions['items'][0]['review_items_count'] == 2
+
+    session = get_json(client, f'/api/study_sessions/{ben_session}', 'ben')
+    assert [(word['id'], word['correct_count'], word['wrong_count']) for word in session['words']] == [(1, 0, 1)]
+
+    ana_stats = get_json(client, '/dashboard/stats', 'ana')
+    ben_stats = get_json(client, '/dashboard/stats', 'ben')
+    assert ana_stats['total_vocabulary'] == ben_stats['total_vocabulary'] == 2
+    assert (ana_stats['total_words_studied'], ana_stats['success_rate']) == (2, 1.0)
+    assert (ben_stats['total_words_studied'], ben_stats['success_rate']) == (1, 0.0)
+    assert get_json(client, '/dashboard/recent_session', 'ben')['wrong_count'] == 1
+    assert get_json(client, '/dashboard/recent_session', 'carla') is None
+
+    assert len(get_json(client, '/groups/1/study_sessions', 'ana')['study_sessions']) == 1
+    assert get_json(client, '/api/study_activities/1/sessions', 'carla')['total'] == 0
+
+
+def test_next_words_follow_the_learners_schedule(app):
+    client = app.test_client()
+    session_id = start_session(client, 'ana')
+    submit_learner_reviews(client, 'ana', session_id, [{"word_id": 1, "is_correct": True}])
+
+    words = get_json(client, f'/api/study_sessions/{session_id}/next_words', 'ana')['words']
+    assert [(word['id'], word['is_due']) for word in words] == [(2, True), (1, False)]
+    assert words[1]['repetitions'] == 1
+
+    # Another learner has not reviewed anything, so both words are due
+    other_session = start_session(client, 'ben')
+    words = get_json(client, f'/api/study_sessions/{other_session}/next_words', 'ben')['words']
+    assert [(word['id'], word['is_due'], word['repetitions']) for word in words] == [(1, True, 0), (2, True, 0)]
+
+
+def test_reset_clears_only_the_callers_history(app):
+    client = app.test_client()
+    for learner_id in ['ana', 'ben']:
+        submit_learner_reviews(client, learner_id, start_session(client, learner_id), [{"word_id": 1, "is_correct": True}])
+
+    response = client.post('/api/study_sessions/reset', headers=as_learner('ana'))
+    assert response.status_code == 200
+    assert get_json(client, '/api/study_sessions', 'ana')['total'] == 0
+    assert get_json(client, '/api/study_sessions', 'ben')['total'] == 1
+
+
+def test_cached_dashboard_is_kept_per_learner(app):
+    client = app.test_client()
+    start_session(client, 'ana')
+
+    assert get_json(client, '/dashboard/stats', 'ana')['total_sessions'] == 1
+    response = client.get('/dashboard/stats', headers=as_learner('ben'))
+    assert response.headers['X-Cache'] == 'MISS'
+    assert json.loads(response.data)['total_sessions'] == 0
+
+
+def test_invalid_learner_id_is_rejected(app):
+    response = app.test_client().get('/api/study_sessions', headers=as_learner('x' * 200))
+    assert response.status_code == 400
+
+
+def test_vocabulary_is_attached_read_only(app):
+    with app.test_request_context(headers=as_learner('ana')):
+        app.preprocess_request()
+        db = app.learners.current()
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            with db.transaction() as cursor:
+                cursor.execute("UPDATE vocabulary.words SET english = 'x' WHERE id = 1")
+        app.learners.close()
+
+
+@pytest.mark.parametrize('app', [{'LEARNER_DB_MAX_OPEN': 1}], indirect=True)
+def test_least_recently_used_learner_databases_are_closed(app):
+    client = app.test_client()
+    start_session(client, 'ana')
+    start_session(client, 'ben')
+    assert get_json(client, '/api/study_sessions', 'ana')['total'] == 1
+
+    stats = app.learners.stats()
+    assert stats['open'] == 1
+    assert stats['opened'] == 3
+    assert stats['closed'] == 2
+
+    lines = client.get('/metrics').get_data(as_text=True).splitlines()
+    assert 'learner_dbs_open 1' in lines
+
+
+def test_concurrent_first_requests_open_one_database(app):
+    learners = app.learners
+    barrier = threading.Barrier(8)
+    opened = []
+
+    def first_request():
+        barrier.wait()
+        opened.append(learners.get('ana'))
+
+    threads = [threading.Thread(target=first_request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(opened) == 8 and all(db is opened[0] for db in opened)
+    assert learners.stats()['opened'] == 1
+    with app.app_context():
+        for db in opened:
+            learners.release(db)
+    assert opened[0].users == 0
+
+
+@pytest.mark.parametrize('app', [{'LEARNER_DB_MAX_OPEN': 1}], indirect=True)
+def test_evicted_databases_close_when_their_last_user_releases_them(app):
+    learners = app.learners
+    with app.app_context():
+        ana = learners.get('ana')
+        ben = learners.get('ben')
+        # Evicted while in use, so asking again returns the same writer
+        assert learners.get('ana') is ana
+        assert learners.stats()['closed'] == 0
+
+        learners.release(ana)
+        learners.release(ana)
+        assert learners.stats()['closed'] == 0
+
+        ben_connection = ben.writer.acquire()
+        ben.writer.release(ben_connection)
+        learners.release(ben)
+    stats = learners.stats()
+    assert (stats['open'], stats['opened'], stats['closed']) == (1, 2, 1)
+    assert ben.writer.stats()['closed'] == 1
+
+
+def test_reads_by_unknown_learners_create_no_files(app, capsys):
+    client = app.test_client()
+    start_session(client, 'ana')
+    capsys.readouterr()
+
+    for n in range(50):
+        assert get_json(client, '/dashboard/stats', f'visitor-{n}')['total_sessions'] == 0
+        assert get_json(client, '/api/study_sessions', f'visitor-{n}')['total'] == 0
+    assert get_json(client, '/api/study_sessions', 'ana')['total'] == 1
+
+    directory = app.learners.directory
+    files = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    assert sorted(os.path.relpath(path, directory) for path in files if path.endswith('.db')) == \
+        sorted(['empty.db', os.path.relpath(learner_path(directory, 'ana'), directory)])
+    assert capsys.readouterr().out == ''
+
+    with app.app_context():
+        empty = app.learners.get('visitor-0', create=False)
+        with pytest.raises(sqlite3.OperationalError):
+            with empty.transaction() as cursor:
+                cursor.execute('DELETE FROM study_sessions')
+        app.learners.release(empty)
+
+
+@pytest.mark.parametrize('app', [{'LEARNER_DB_MAX_FILES': 1}], indirect=True)
+def test_writes_create_no_more_than_max_files(app):
+    client = app.test_client()
+    start_session(client, 'ana')
+    response = client.post('/api/study_sessions', headers=as_learner('ben'),
+                           data=json.dumps({"group_id": 1, "study_activity_id": 1}),
+                           content_type='application/json')
+    assert response.status_code == 403
+
+    start_session(client, 'ana')
+    assert get_json(client, '/api/study_sessions', 'ben')['total'] == 0
+    assert not os.path.exists(learner_path(app.learners.directory, 'ben'))
+    assert app.learners.stats()['created'] == 1
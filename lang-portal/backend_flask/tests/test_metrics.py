@@ -0,0 +1,61 @@
+import logging
+
+from flask import g
+
+
+def metrics_lines(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    return response.get_data(as_text=True).splitlines()
+
+
+def test_query_stats_count_statements_rows_and_slowest(app):
+    """Statements on pooled connections are counted into the current request's stats."""
+    with app.app_context():
+        app.metrics.start_request()
+        cursor = app.db.cursor()
+        cursor.execute('SELECT id FROM words')
+        assert len(cursor.fetchall()) == 2
+        cursor.execute('SELECT id FROM groups WHERE id = ?', (1,))
+        cursor.fetchone()
+        for _ in app.db.get().execute('SELECT id FROM study_activities'):
+            pass
+        stats = g.query_stats
+
+        assert stats.statements == 3
+        assert stats.rows == 5
+        assert stats.seconds > 0
+        assert stats.slowest[1].startswith('SELECT id FROM')
+
+
+def test_metrics_exposes_route_histograms(client):
+    """Each route gets latency and SQL histograms labelled by its rule, not its URL."""
+    client.get('/words')
+    client.get('/words/1')
+    client.get('/words/2')
+
+    lines = metrics_lines(client)
+    assert 'http_request_duration_seconds_count{method="GET",route="/words",status="200"} 1' in lines
+    assert 'http_request_duration_seconds_count{method="GET",route="/words/<int:word_id>",status="200"} 2' in lines
+    assert '# TYPE http_request_sql_statements histogram' in lines
+    assert any(line.startswith('http_request_sql_statements_bucket{method="GET",route="/words",le="+Inf"} 1')
+               for line in lines)
+    sums = [line for line in lines if line.startswith('http_request_sql_statements_sum{method="GET",route="/words"}')]
+    assert float(sums[0].split()[-1]) >= 2
+    assert any(line.startswith('db_pool_acquired ') for line in lines)
+    assert any(line.startswith('response_cache_misses ') for line in lines)
+
+
+def test_slow_requests_are_logged_with_statements(client, app, caplog):
+    app.metrics.slow_request_threshold = 0
+    with caplog.at_level(logging.WARNING):
+        client.get('/groups/1')
+
+    messages = [record.getMessage() for record in caplog.records if 'Slow request' in record.getMessage()]
+    assert messages
+    assert 'GET /groups/<int:id> -> 200' in messages[0]
+    assert 'FROM groups' in messages[0]
+
+    lines = metrics_lines(client)
+    assert 'http_slow_requests_total{method="GET",route="/groups/<int:id>"} 1' in lines
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+from migrate import run_migrations
+
+
+def index_names(db_path):
+    conn = sqlite3.connect(db_path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    return names
+
+
+def test_migrations_are_recorded_and_not_rerun(app):
+    """Applied migrations are recorded and skipped on the next run."""
+    db_path = app.config['DATABASE']
+
+    conn = sqlite3.connect(db_path)
+    versions = [row[0] for row in conn.execute('SELECT version FROM schema_migrations ORDER BY version')]
+    conn.close()
+    assert versions[0] == '0001_add_join_indexes'
+
+    assert run_migrations(db_path) == []
+
+
+def test_join_indexes_and_unique_word_groups(app):
+    """The first migration indexes the hot join columns and makes memberships unique."""
+    names = index_names(app.config['DATABASE'])
+    for name in [
+        'idx_word_groups_word_id_group_id',
+        'idx_word_groups_group_id',
+        'idx_word_review_items_study_session_id',
+        'idx_word_review_items_word_id',
+        'idx_study_sessions_group_id',
+        'idx_study_sessions_study_activity_id',
+        'idx_study_sessions_created_at',
+    ]:
+        assert name in names
+
+    conn = sqlite3.connect(app.config['DATABASE'])
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO word_groups (word_id, group_id) VALUES (1, 1)")
+    conn.close()
+
+
+def test_failed_migration_is_rolled_back(app, tmp_path):
+    """A failing migration leaves neither its changes nor a version row behind."""
+    (tmp_path / '9000_broken.sql').write_text(
+        "CREATE TABLE half_applied (id INTEGER);\n"
+        "INSERT INTO no_such_table VALUES (1);\n"
+    )
+
+    with pytest.raises(sqlite3.OperationalError):
+        run_migrations(app.config['DATABASE'], migrations_dir=str(tmp_path))
+
+    conn = sqlite3.connect(app.config['DATABASE'])
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    versions = {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+    conn.close()
+    assert 'half_applied' not in tables
+    assert '9000_broken' not in versions
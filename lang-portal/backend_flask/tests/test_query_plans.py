@@ -0,0 +1,115 @@
+import itertools
+import json
+
+import pytest
+
+from lib.pagination import encode_cursor
+from lib.query_plans import check_statements, plan_problems
+
+# (endpoint, problem) pairs that are accepted, with the reason
+ALLOWLIST = {
+    ('GET /words/search', 'TEMP B-TREE FOR ORDER BY'):
+        'orders at most `limit` FTS hits by rank',
+    ('GET /words/<int:word_id>', 'TEMP B-TREE FOR group_concat(DISTINCT)'):
+        'dedupes the groups of a single word',
+    ('GET /groups/<int:id>/study_sessions', 'TEMP B-TREE FOR ORDER BY'):
+        'only the activityName sort, within one group; the other sorts are range scans '
+        '(test_get_group_study_sessions_sorts_by_index_range_scan)',
+    ('GET /api/study_sessions/<id>', 'TEMP B-TREE FOR GROUP BY'):
+        'groups the review items of one session, found through idx_word_review_items_study_session_id',
+    ('GET /api/study_sessions/<id>', 'TEMP B-TREE FOR ORDER BY'):
+        'sorts the words reviewed in one session',
+    ('GET /api/study_sessions/<id>', 'TEMP B-TREE FOR count(DISTINCT)'):
+        'counts the words reviewed in one session',
+    ('GET /dashboard/stats', 'TEMP B-TREE FOR count(DISTINCT)'):
+        'counts groups over the last 30 days of daily_group_activity',
+}
+
+WORD_SORTS = ['spanish', 'pronunciation', 'english', 'correct_count', 'wrong_count']
+GROUP_SESSION_SORTS = ['startTime', 'endTime', 'activityName', 'groupName', 'reviewItemsCount']
+ORDERS = ['asc', 'desc']
+
+
+def cursor_for(sort_by, order):
+    value = 0 if sort_by.endswith('_count') else 'm'
+    return encode_cursor(sort_by, order, value, 1)
+
+
+def endpoint_requests():
+    """Every route, at every valid sort_by/order combination and pagination mode."""
+    requests = [
+        ('GET', '/words/search', {'q': 'pa'}),
+        ('GET', '/words/1', {}),
+        ('GET', '/groups/1', {}),
+        ('GET', '/groups/1/words/raw', {}),
+        ('GET', '/groups/1/words/raw', {'stream': '1'}),
+        ('GET', '/api/study_activities', {}),
+        ('GET', '/api/study_activities/1', {}),
+        ('GET', '/api/study_activities/1/sessions', {}),
+        ('GET', '/api/study_activities/1/launch', {}),
+        ('GET', '/api/study_sessions', {}),
+        ('GET', '/api/study_sessions/1', {}),
+        ('GET', '/api/study_sessions/1/next_words', {}),
+        ('GET', '/dashboard/recent_session', {}),
+        ('GET', '/dashboard/stats', {}),
+    ]
+    for sort_by, order in itertools.product(WORD_SORTS, ORDERS):
+        for path in ['/words', '/groups/1/words']:
+            requests.append(('GET', path, {'sort_by': sort_by, 'order': order, 'page': 2}))
+            requests.append(('GET', path, {'sort_by': sort_by, 'order': order, 'cursor': cursor_for(sort_by, order)}))
+    for sort_by, order in itertools.product(['name', 'words_count'], ORDERS):
+        requests.append(('GET', '/groups', {'sort_by': sort_by, 'order': order}))
+    for sort_by, order in itertools.product(GROUP_SESSION_SORTS, ORDERS):
+        requests.append(('GET', '/groups/1/study_sessions', {'sort_by': sort_by, 'order': order}))
+    return requests
+
+
+@pytest.fixture
+def capturing_app(app):
+    app.cache.enabled = False
+    app.metrics.capture_statements = True
+    return app
+
+
+def test_plan_problems_resolve_aliases():
+    sql = 'SELECT * FROM word_review_items wri JOIN words w ON w.id = wri.word_id ORDER BY wri.created_at'
+    details = ['SCAN wri', 'SEARCH w USING INTEGER PRIMARY KEY (rowid=?)', 'USE TEMP B-TREE FOR ORDER BY']
+    assert plan_problems(sql, details) == ['SCAN word_review_items', 'TEMP B-TREE FOR ORDER BY']
+    index_scan = ['SCAN words USING INDEX idx_words_spanish']
+    assert plan_problems('SELECT * FROM words ORDER BY spanish LIMIT ?', index_scan) == []
+    assert plan_problems('SELECT * FROM words ORDER BY spanish', index_scan) == ['SCAN words USING INDEX']
+    assert plan_problems('SELECT * FROM groups', ['SCAN groups']) == []
+
+
+def test_read_endpoints_use_indexes(client, capturing_app):
+    """No read endpoint scans a large table or sorts through a temp B-tree."""
+    for method, path, query in endpoint_requests():
+        response = client.open(path, method=method, query_string=query)
+        response.get_data()
+        assert response.status_code == 200, (path, query, response.get_data(as_text=True))
+
+    # Every GET route that touches the database was exercised
+    routes = {rule.rule for rule in capturing_app.url_map.iter_rules()
+              if 'GET' in rule.methods and rule.endpoint not in ('static', 'get_metrics')}
+    assert routes <= {route for _, route, _, _ in capturing_app.metrics.captured}
+
+    with capturing_app.app_context():
+        failures = check_statements(capturing_app.db.cursor(), capturing_app.metrics.captured, ALLOWLIST)
+    assert failures == []
+
+
+def test_write_endpoints_use_indexes(client, capturing_app):
+    """The session, review and group membership write paths only touch the rows they change."""
+    response = client.post('/api/study_sessions', data=json.dumps({"group_id": 1, "study_activity_id": 1}),
+                           content_type='application/json')
+    session_id = json.loads(response.data)['study_session']['id']
+    client.post(f'/api/study_sessions/{session_id}/review',
+                data=json.dumps({"reviews": [{"word_id": 1, "is_correct": True}, {"word_id": 2, "is_correct": False}]}),
+                content_type='application/json')
+    client.post(f'/api/study_sessions/{session_id}/end')
+    client.post('/groups/2/words', data=json.dumps({"word_ids": [1, 2]}), content_type='application/json')
+    client.delete('/groups/2/words', data='1\n', content_type='text/plain')
+
+    with capturing_app.app_context():
+        failures = check_statements(capturing_app.db.cursor(), capturing_app.metrics.captured, ALLOWLIST)
+    assert failures == []
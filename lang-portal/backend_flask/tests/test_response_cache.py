@@ -0,0 +1,54 @@
+import json
+
+
+def test_repeat_reads_are_served_from_cache(client, app):
+    """The second identical GET is a hit; query arg order does not matter."""
+    assert client.get('/words?sort_by=english&order=desc').headers['X-Cache'] == 'MISS'
+    assert client.get('/words?order=desc&sort_by=english').headers['X-Cache'] == 'HIT'
+
+    stats = app.cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_writes_invalidate_dependent_entries(client, app):
+    """A review batch drops cached word listings and dashboard stats."""
+    client.get('/words')
+    client.get('/dashboard/stats')
+    client.get('/api/study_activities')
+
+    client.post('/api/study_sessions/1/review',
+                data=json.dumps({"reviews": [{"word_id": 1, "is_correct": True}]}),
+                content_type='application/json')
+
+    response = client.get('/words')
+    assert response.headers['X-Cache'] == 'MISS'
+    pagar = next(word for word in json.loads(response.data)['words'] if word['spanish'] == 'pagar')
+    assert pagar['correct_count'] == 1
+
+    assert client.get('/dashboard/stats').headers['X-Cache'] == 'MISS'
+    # Activities do not depend on reviews
+    assert client.get('/api/study_activities').headers['X-Cache'] == 'HIT'
+    assert app.cache.stats()['invalidations'] == 2
+
+
+def test_cache_is_bounded_and_expires(client, app):
+    """Least recently used entries are evicted and entries past their TTL are refetched."""
+    app.cache.max_entries = 2
+    for page in [1, 2, 3]:
+        client.get(f'/words?page={page}')
+    assert app.cache.stats()['evictions'] == 1
+    assert client.get('/words?page=1').headers['X-Cache'] == 'MISS'
+
+    app.cache.ttl = 0
+    client.get('/groups')
+    assert client.get('/groups').headers['X-Cache'] == 'MISS'
+    assert app.cache.stats()['expirations'] == 1
+
+
+def test_errors_are_not_cached(client):
+    """Only successful responses are cached."""
+    assert client.get('/groups/999/words/raw').status_code == 404
+    response = client.get('/groups/999/words/raw')
+    assert response.status_code == 404
+    assert response.headers['X-Cache'] == 'MISS'
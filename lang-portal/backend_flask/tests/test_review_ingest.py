@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from tests.conftest import submit_reviews
+
+
+@pytest.fixture
+def app_config():
+    return {'REVIEW_INGEST_MODE': 'async'}
+
+
+def review_count(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) AS count FROM word_review_items')
+        return cursor.fetchone()['count']
+
+
+def test_async_mode_acknowledges_with_202(app):
+    client = app.test_client()
+    response = submit_reviews(client, [{"word_id": 1, "is_correct": True}, {"word_id": 2, "is_correct": False}])
+    assert response.status_code == 202
+    assert json.loads(response.data)['review_count'] == 2
+
+    app.review_writer.flush()
+    assert review_count(app) == 2
+    stats = json.loads(client.get('/api/study_sessions/1').data)['session']
+    assert stats['review_items_count'] == 2
+
+
+@pytest.mark.parametrize('app', [{'REVIEW_INGEST_MODE': 'durable'}], indirect=True)
+def test_durable_mode_acknowledges_after_commit(app):
+    response = submit_reviews(app.test_client(), [{"word_id": 1, "is_correct": True}])
+    assert response.status_code == 201
+    assert review_count(app) == 1
+
+
+def test_invalid_batches_are_rejected_before_queueing(app):
+    client = app.test_client()
+    assert submit_reviews(client, [{"word_id": 999, "is_correct": True}]).status_code == 404
+    assert submit_reviews(client, [{"word_id": 1, "is_correct": True}], session_id=999).status_code == 404
+    assert app.review_writer.stats()['enqueued'] == 0
+
+
+@pytest.mark.parametrize('app', [{'REVIEW_INGEST_MODE': 'async', 'REVIEW_INGEST_QUEUE_SIZE': 1,
+                                   'REVIEW_INGEST_ENQUEUE_TIMEOUT': 0}], indirect=True)
+def test_full_queue_sheds_load_with_503(app):
+    app.review_writer.autostart = False
+    client = app.test_client()
+    assert submit_reviews(client, [{"word_id": 1, "is_correct": True}]).status_code == 202
+
+    response = submit_reviews(client, [{"word_id": 2, "is_correct": True}])
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert app.review_writer.stats()['rejected'] == 1
+
+
+def test_queued_batches_share_one_commit(app):
+    writer = app.review_writer
+    writer.autostart = False
+    client = app.test_client()
+    for word_id in (1, 2, 1):
+        assert submit_reviews(client, [{"word_id": word_id, "is_correct": True}]).status_code == 202
+
+    writer.flush()
+    stats = writer.stats()
+    assert (stats['flushes'], stats['batches_written'], stats['reviews_written']) == (1, 3, 3)
+    assert stats['queue_depth'] == 0
+
+    lines = app.test_client().get('/metrics').get_data(as_text=True).splitlines()
+    assert 'review_ingest_batches_per_flush_count 1' in lines
+    assert 'review_ingest_queue_depth 0' in lines
+
+
+def test_close_writes_queued_batches(app):
+    writer = app.review_writer
+    writer.autostart = False
+    submit_reviews(app.test_client(), [{"word_id": 1, "is_correct": False}])
+    writer.close()
+    assert review_count(app) == 1
+
+
+def test_reset_flushes_the_queue_first(app):
+    app.review_writer.autostart = False
+    client = app.test_client()
+    submit_reviews(client, [{"word_id": 1, "is_correct": True}])
+    assert client.post('/api/study_sessions/reset').status_code == 200
+    assert review_count(app) == 0
+    assert app.review_writer.stats()['batches_failed'] == 0
+
+
+def test_bad_batches_are_rejected_synchronously(app):
+    client = app.test_client()
+    for review in [{"word_id": None, "is_correct": True}, {"word_id": 1, "is_correct": None},
+                   {"word_id": "1", "is_correct": True}]:
+        assert submit_reviews(client, [{"word_id": 2, "is_correct": True}, review]).status_code == 400
+    assert app.review_writer.stats()['enqueued'] == 0
+
+
+@pytest.mark.parametrize('app', [{'REVIEW_INGEST_MODE': 'durable', 'REVIEW_INGEST_COMMIT_TIMEOUT': 0.05}], indirect=True)
+def test_durable_mode_times_out_with_503(app):
+    writer = app.review_writer
+    writer.autostart = False
+    response = submit_reviews(app.test_client(), [{"word_id": 1, "is_correct": True}])
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert writer.stats()['timed_out'] == 1
+
+    # The abandoned batch is dropped rather than written behind the client's back
+    writer.flush()
+    assert review_count(app) == 0
+    assert writer.stats()['queue_depth'] == 0
@@ -0,0 +1,61 @@
+import json
+
+from lib.clock import utc_timestamp
+from tests.conftest import submit_reviews
+
+
+def set_times(app, session_id, created_at, last_activity_at=None):
+    with app.app_context():
+        with app.db.transaction() as cursor:
+            cursor.execute('UPDATE study_sessions SET created_at = ?, last_activity_at = ? WHERE id = ?',
+                           (created_at, last_activity_at, session_id))
+    app.cache.clear()
+
+
+def test_listings_report_end_time_and_duration(client, app):
+    """Every session listing reports the latest activity as the end until the session is ended."""
+    set_times(app, 1, '2025-03-18T10:00:00Z', '2025-03-18T10:12:30Z')
+
+    items = json.loads(client.get('/api/study_sessions').data)['items']
+    assert (items[0]['end_time'], items[0]['duration_seconds'], items[0]['ended']) == ('2025-03-18T10:12:30Z', 750, False)
+
+    session = json.loads(client.get('/api/study_sessions/1').data)['session']
+    assert (session['end_time'], session['duration_seconds']) == ('2025-03-18T10:12:30Z', 750)
+
+    items = json.loads(client.get('/api/study_activities/1/sessions').data)['items']
+    assert items[0]['duration_seconds'] == 750
+
+    recent = json.loads(client.get('/dashboard/recent_session').data)
+    assert recent['duration_seconds'] == 750
+
+
+def test_end_session(client, app):
+    """Ending a session fixes its end time; ending again keeps the first one."""
+    response = client.post('/api/study_sessions/1/end')
+    assert response.status_code == 200
+    ended = json.loads(response.data)['study_session']
+    assert ended['end_time'] <= utc_timestamp()
+    assert ended['duration_seconds'] > 0
+
+    again = json.loads(client.post('/api/study_sessions/1/end').data)['study_session']
+    assert again['end_time'] == ended['end_time']
+
+    items = json.loads(client.get('/api/study_sessions').data)['items']
+    assert items[0]['ended'] is True
+    assert items[0]['end_time'] == ended['end_time']
+
+
+def test_late_reviews_extend_an_ended_session(client, app):
+    set_times(app, 1, '2025-03-18T10:00:00Z')
+    with app.app_context():
+        with app.db.transaction() as cursor:
+            cursor.execute("UPDATE study_sessions SET ended_at = '2025-03-18T10:05:00Z' WHERE id = 1")
+
+    submit_reviews(client, [{"word_id": 1, "is_correct": True}])
+    session = json.loads(client.get('/api/study_sessions/1').data)['session']
+    assert session['end_time'] > '2025-03-18T10:05:00Z'
+    assert session['review_items_count'] == 1
+
+
+def test_end_unknown_session(client):
+    assert client.post('/api/study_sessions/999/end').status_code == 404
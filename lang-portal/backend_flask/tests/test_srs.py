@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from lib.srs import DEFAULT_EASE, MAX_INTERVAL_DAYS, MIN_EASE, next_schedule
+from tests.conftest import submit_reviews
+
+
+def next_words(client, n=10):
+    return json.loads(client.get('/api/study_sessions/1/next_words', query_string={'n': n}).data)
+
+
+def test_sm2_intervals_grow_and_reset_on_lapse():
+    state = (DEFAULT_EASE, 0, 0)
+    intervals = []
+    for _ in range(4):
+        state = next_schedule(*state, True)
+        intervals.append(state[1])
+    assert intervals == [1, 6, 15, 38]
+    assert state[0] == pytest.approx(DEFAULT_EASE)
+
+    ease, interval_days, repetitions = next_schedule(*state, False)
+    assert (interval_days, repetitions) == (1, 0)
+    assert ease == pytest.approx(DEFAULT_EASE - 0.54)
+
+
+def test_ease_never_drops_below_minimum():
+    state = (DEFAULT_EASE, 0, 0)
+    for _ in range(10):
+        state = next_schedule(*state, False)
+    assert state[0] == MIN_EASE
+
+
+def test_interval_is_capped():
+    state = (DEFAULT_EASE, 0, 0)
+    for _ in range(50):
+        state = next_schedule(*state, True)
+    assert state[1] == MAX_INTERVAL_DAYS
+
+
+def test_reviews_push_words_back_in_the_queue(client, app):
+    """New words are due now; a reviewed word is due later than the unreviewed ones."""
+    data = next_words(client)
+    assert [word['id'] for word in data['words']] == [1, 2]
+    assert data['group_id'] == 1
+    assert all(word['is_due'] for word in data['words'])
+    assert data['words'][0]['parts'][0]['spanish'] == 'pag'
+
+    submit_reviews(client, [{"word_id": 1, "is_correct": True}, {"word_id": 1, "is_correct": True}])
+
+    data = next_words(client)
+    assert [word['id'] for word in data['words']] == [2, 1]
+    reviewed = data['words'][1]
+    assert (reviewed['interval_days'], reviewed['repetitions']) == (6, 2)
+    assert not reviewed['is_due']
+
+    assert [word['id'] for word in next_words(client, n=1)['words']] == [2]
+
+
+def test_reset_makes_every_word_due_again(client):
+    submit_reviews(client, [{"word_id": 1, "is_correct": True}])
+    client.post('/api/study_sessions/reset')
+
+    # The reset removes session 1, so read the queue through a new session
+    session = json.loads(client.post('/api/study_sessions',
+                                     data=json.dumps({"group_id": 1, "study_activity_id": 1}),
+                                     content_type='application/json').data)['study_session']
+    data = json.loads(client.get(f"/api/study_sessions/{session['id']}/next_words").data)
+    assert all(word['repetitions'] == 0 and word['is_due'] for word in data['words'])
+
+
+def test_next_words_is_an_index_seek(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT wg.word_id FROM word_groups wg
+            WHERE wg.group_id = ?
+            ORDER BY wg.due_at, wg.word_id
+            LIMIT 10
+        ''', (1,))
+        plan = ' '.join(row['detail'] for row in cursor.fetchall())
+    assert 'idx_word_groups_group_id_due_at' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_next_words_for_unknown_session(client):
+    response = client.get('/api/study_sessions/999/next_words')
+    assert response.status_code == 404
@@ -0,0 +1,88 @@
+import json
+import sqlite3
+from datetime import timedelta
+
+from invoke import Context
+
+import tasks
+from lib.clock import get_timezone, study_day, today
+from lib.stats import current_streak, record_study_day
+
+
+def streak_record(cursor):
+    cursor.execute('SELECT current_streak, longest_streak, last_study_day FROM study_totals WHERE id = 1')
+    return tuple(cursor.fetchone())
+
+
+def test_record_study_day_extends_and_restarts(app):
+    """Consecutive days extend the run, a gap restarts it, repeats change nothing."""
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("UPDATE study_totals SET current_streak = 0, longest_streak = 0, last_study_day = NULL")
+
+        for day in ['2026-01-01', '2026-01-02', '2026-01-02', '2026-01-03']:
+            record_study_day(cursor, day)
+        assert streak_record(cursor) == (3, 3, '2026-01-03')
+
+        record_study_day(cursor, '2026-01-05')
+        assert streak_record(cursor) == (1, 3, '2026-01-05')
+
+        # A late write for an earlier day does not rewrite the current run
+        record_study_day(cursor, '2026-01-04')
+        assert streak_record(cursor) == (1, 3, '2026-01-05')
+
+
+def test_current_streak_survives_until_a_day_is_missed():
+    """A run ending yesterday is still current; one ending earlier is broken."""
+    tz = get_timezone('UTC')
+    yesterday = (today(tz) - timedelta(days=1)).isoformat()
+    two_days_ago = (today(tz) - timedelta(days=2)).isoformat()
+
+    assert current_streak({'current_streak': 4, 'last_study_day': yesterday}, tz) == 4
+    assert current_streak({'current_streak': 4, 'last_study_day': two_days_ago}, tz) == 0
+    assert current_streak({'current_streak': 0, 'last_study_day': None}, tz) == 0
+
+
+def test_study_day_uses_local_timezone():
+    """A late-evening session in New York belongs to the New York calendar day."""
+    new_york = get_timezone('America/New_York')
+    assert study_day('2026-03-10T03:30:00Z', new_york) == '2026-03-09'
+    assert study_day('2026-03-10T03:30:00Z', get_timezone('UTC')) == '2026-03-10'
+
+
+def test_rebuild_task_groups_by_configured_timezone(app, monkeypatch):
+    """rebuild-study-stats regroups history in the STUDY_TIMEZONE set in the environment."""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, '2026-03-10T03:30:00Z')")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setenv('DATABASE_PATH', app.config['DATABASE'])
+    monkeypatch.setenv('FLASK_STUDY_TIMEZONE', 'America/New_York')
+    tasks.rebuild_study_stats(Context())
+
+    with app.app_context():
+        cursor = app.db.read_cursor()
+        cursor.execute('SELECT day FROM daily_study_stats ORDER BY day')
+        assert [row['day'] for row in cursor.fetchall()] == ['2025-03-18', '2026-03-09']
+
+
+def test_old_runs_do_not_count_as_current(client, app):
+    """History with an old three-day run and nothing recent has no current streak."""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    for created_at in ['2025-03-19T10:00:00Z', '2025-03-20T10:00:00Z', '2025-04-02T10:00:00Z']:
+        conn.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, ?)",
+                     (created_at,))
+    conn.commit()
+    conn.close()
+    with app.app_context():
+        app.db.rebuild(app.db.cursor(), 'study_stats')
+
+    stats = json.loads(client.get('/dashboard/stats').data)
+    assert stats['current_streak'] == 0
+    assert stats['longest_streak'] == 3
+
+    client.post('/api/study_sessions', json={'group_id': 1, 'study_activity_id': 1})
+    stats = json.loads(client.get('/dashboard/stats').data)
+    assert stats['current_streak'] == 1
+    assert stats['longest_streak'] == 3
@@ -114,3 +114,46 @@ def test_batch_submit_reviews_invalid_format(client, app):
     assert response.status_code == 400
     data = json.loads(response.data)
     assert 'error' in data
+
+def test_batch_submit_reviews_is_all_or_nothing(client, app):
+    """A batch with an unknown word writes nothing, even for its valid items"""
+    review_data = {
+        "reviews": [
+            {"word_id": 1, "is_correct": True},
+            {"word_id": 2, "is_correct": True},
+            {"word_id": 999, "is_correct": False}
+        ]
+    }
+    
+    response = client.post('/api/study_sessions/1/review', 
+                          data=json.dumps(review_data),
+                          content_type='application/json')
+    assert response.status_code == 404
+    
+    # A later valid batch must not commit leftovers from the rejected one
+    response = client.post('/api/study_sessions/1/review', 
+                          data=json.dumps({"reviews": [{"word_id": 2, "is_correct": False}]}),
+                          content_type='application/json')
+    assert response.status_code == 201
+    
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT word_id, correct FROM word_review_items WHERE study_session_id = 1')
+        assert [tuple(row) for row in cursor.fetchall()] == [(2, 0)]
+
+def test_batch_submit_reviews_invalid_word_id(client, app):
+    """Test submitting reviews whose word_id is not an integer"""
+    for word_id in [None, "1", True, 1.5, 2**70, -2**63 - 1]:
+        review_data = {"reviews": [{"word_id": 1, "is_correct": True}, {"word_id": word_id, "is_correct": True}]}
+
+        response = client.post('/api/study_sessions/1/review',
+                              data=json.dumps(review_data),
+                              content_type='application/json')
+
+        assert response.status_code == 400
+        assert 'Invalid word id' in json.loads(response.data)['error']
+
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) as count FROM word_review_items')
+        assert cursor.fetchone()['count'] == 0
@@ -0,0 +1,67 @@
+import json
+
+from lib.importer import import_words
+
+
+def counters(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT name, row_count FROM table_counters ORDER BY name')
+        return dict(cursor.fetchall())
+
+
+def exact_counts(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        return {
+            table: cursor.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in ('groups', 'study_sessions', 'word_groups', 'words')
+        }
+
+
+def group_word_counts(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('''
+            SELECT g.id, g.words_count, (SELECT COUNT(*) FROM word_groups WHERE group_id = g.id)
+            FROM groups g ORDER BY g.id
+        ''')
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def test_counters_follow_inserts_and_deletes(client, app):
+    assert counters(app) == exact_counts(app) == {'groups': 2, 'study_sessions': 1, 'word_groups': 2, 'words': 2}
+
+    client.post('/api/study_sessions', data=json.dumps({"group_id": 1, "study_activity_id": 1}),
+                content_type='application/json')
+    with app.app_context():
+        import_words(app.db.get(), iter([
+            {"spanish": "hablar", "pronunciation": "ah-BLAR", "english": "to speak", "parts": []},
+        ]), group_id=2)
+    assert counters(app) == exact_counts(app) == {'groups': 2, 'study_sessions': 2, 'word_groups': 3, 'words': 3}
+
+    client.post('/api/study_sessions/reset')
+    assert counters(app) == exact_counts(app)
+
+
+def test_group_words_count_follows_memberships(app):
+    assert group_word_counts(app) == [(1, 2, 2), (2, 0, 0)]
+    with app.app_context():
+        with app.db.transaction() as cursor:
+            cursor.execute('INSERT INTO word_groups (word_id, group_id) VALUES (2, 2)')
+            cursor.execute('DELETE FROM word_groups WHERE word_id = 2 AND group_id = 1')
+            cursor.execute('UPDATE word_groups SET group_id = 2 WHERE word_id = 1 AND group_id = 1')
+    assert group_word_counts(app) == [(1, 0, 0), (2, 2, 2)]
+
+
+def test_listings_report_counter_totals(client, app):
+    with app.app_context():
+        with app.db.transaction() as cursor:
+            # Drift the counter to prove the listing reads it rather than counting
+            cursor.execute("UPDATE table_counters SET row_count = 101 WHERE name = 'words'")
+    data = json.loads(client.get('/words').data)
+    assert (data['total_words'], data['total_pages']) == (101, 3)
+
+    with app.app_context():
+        app.db.rebuild(app.db.cursor(), 'table_counters')
+    assert counters(app) == exact_counts(app)
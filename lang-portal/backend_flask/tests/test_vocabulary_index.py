@@ -0,0 +1,163 @@
+import json
+import random
+import sqlite3
+from array import array
+
+import pytest
+
+from lib.pagination import encode_cursor
+from lib.vocabulary import COUNT_COLUMNS, VocabularySnapshot
+from tests.conftest import submit_reviews
+from tests.test_keyset_pagination import add_group_words, walk_cursor
+
+SORTS = ['spanish', 'pronunciation', 'english', 'correct_count', 'wrong_count']
+
+
+@pytest.fixture
+def app_config():
+    return {'VOCABULARY_INDEX_ENABLED': True, 'RESPONSE_CACHE_ENABLED': False}
+
+
+def add_vocabulary(app, count):
+    """Add words to group 1 (and every third to group 2) with repeating review counts."""
+    add_group_words(app, count)
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.execute("INSERT INTO word_groups (word_id, group_id) SELECT id, 2 FROM words WHERE id % 3 = 0")
+    conn.execute("UPDATE word_reviews SET correct_count = word_id % 4, wrong_count = word_id % 3")
+    conn.commit()
+    conn.close()
+    app.cache.invalidate('words', 'word_reviews', 'word_groups', 'groups')
+
+
+def get_json(client, url, **params):
+    response = client.get(url, query_string=params)
+    return response.status_code, json.loads(response.data)
+
+
+def from_sqlite(app, fetch):
+    """Run `fetch` with the index switched off, i.e. against SQLite."""
+    vocabulary, app.vocabulary = app.vocabulary, None
+    try:
+        return fetch()
+    finally:
+        app.vocabulary = vocabulary
+
+
+def test_index_matches_sqlite_listings(app):
+    """Pages, cursors and single words are identical with and without the index."""
+    add_vocabulary(app, 60)
+    client = app.test_client()
+
+    for url in ['/words', '/groups/1/words', '/groups/2/words']:
+        for sort_by in SORTS:
+            for order in ['asc', 'desc']:
+                params = {'sort_by': sort_by, 'order': order}
+                for page in [1, 2, 7]:
+                    indexed = get_json(client, url, page=page, **params)
+                    assert indexed == from_sqlite(app, lambda: get_json(client, url, page=page, **params))
+                indexed_ids = walk_cursor(client, url, params)
+                assert indexed_ids == from_sqlite(app, lambda: walk_cursor(client, url, params))
+
+    for word_id in [1, 3, 30, 999]:
+        status, indexed = get_json(client, f'/words/{word_id}')
+        expected_status, expected = from_sqlite(app, lambda: get_json(client, f'/words/{word_id}'))
+        assert status == expected_status
+        if status == 200:
+            groups = indexed['word'].pop('groups')
+            assert sorted(groups, key=lambda group: group['id']) == \
+                sorted(expected['word'].pop('groups'), key=lambda group: group['id'])
+        assert indexed == expected
+
+    assert get_json(client, '/groups/99/words')[0] == 404
+    stats = app.vocabulary.stats()
+    assert stats['loads'] == 1
+    assert stats['words'] == 62
+    assert stats['memory_bytes'] > 0
+
+
+def test_index_refreshes_after_writes(app):
+    """Reviews refresh only the counters; membership changes reload the index."""
+    client = app.test_client()
+    assert get_json(client, '/words/1')[1]['word']['correct_count'] == 0
+
+    assert submit_reviews(client, [{"word_id": 1, "is_correct": True}]).status_code == 201
+    assert get_json(client, '/words/1')[1]['word']['correct_count'] == 1
+    words = get_json(client, '/words', sort_by='correct_count', order='desc')[1]['words']
+    assert words[0]['id'] == 1
+    assert app.vocabulary.stats()['count_refreshes'] == 1
+
+    response = client.post('/groups/2/words', data=json.dumps({"word_ids": [1]}), content_type='application/json')
+    assert response.status_code == 200
+    status, data = get_json(client, '/groups/2/words')
+    assert [word['id'] for word in data['words']] == [1]
+    assert data['total_pages'] == 1
+    assert {'id': 2, 'name': 'Empty Group'} in get_json(client, '/words/1')[1]['word']['groups']
+    assert app.vocabulary.stats()['loads'] == 2
+
+
+@pytest.mark.parametrize('app', [{}, {'REVIEW_INGEST_MODE': 'durable'}], indirect=True)
+def test_review_refresh_reads_only_the_reviewed_counters(app):
+    """A review batch re-reads its own words' counters; a reset re-reads them all."""
+    add_vocabulary(app, 60)
+    client = app.test_client()
+    get_json(client, '/words')
+    read = app.vocabulary.stats()['counters_read']
+
+    assert submit_reviews(client, [(5, True), (7, False), (5, True)]).status_code == 201
+    params = {'sort_by': 'correct_count', 'order': 'desc'}
+    assert walk_cursor(client, '/words', params) == from_sqlite(app, lambda: walk_cursor(client, '/words', params))
+    stats = app.vocabulary.stats()
+    assert (stats['loads'], stats['count_refreshes'], stats['counters_read'] - read) == (1, 1, 2)
+
+    assert client.post('/api/study_sessions/reset').status_code == 200
+    assert walk_cursor(client, '/words', params) == from_sqlite(app, lambda: walk_cursor(client, '/words', params))
+    assert app.vocabulary.stats()['counters_read'] - read == 2 + 62
+
+
+@pytest.mark.parametrize('changes', [3, 200])
+def test_counter_refresh_moves_only_changed_words(changes):
+    """Moving the changed positions gives the same count orders as sorting from scratch."""
+    rng = random.Random(changes)
+    size = 500
+    text = {column: [f'{column}{i}' for i in range(size)] for column in ('spanish', 'pronunciation', 'english')}
+    counts = {column: array('q', (rng.randrange(5) for _ in range(size))) for column in COUNT_COLUMNS}
+    memberships = ((array('q'), array('l')), (array('q'), array('l')))
+    snapshot = VocabularySnapshot(array('q', range(1, size + 1)), text, counts, {}, memberships)
+
+    new_counts = {column: array('q', values) for column, values in counts.items()}
+    changed = sorted(rng.sample(range(size), changes))
+    for position in changed:
+        new_counts[rng.choice(COUNT_COLUMNS)][position] = rng.randrange(5)
+
+    refreshed = snapshot.with_counts(new_counts, changed)
+    expected = VocabularySnapshot(snapshot.ids, text, new_counts, {}, memberships)
+    for column in COUNT_COLUMNS:
+        assert refreshed.orders[column] == expected.orders[column]
+    assert snapshot.orders['correct_count'] == VocabularySnapshot(snapshot.ids, text, counts, {}, memberships).orders['correct_count']
+
+
+def test_index_falls_back_to_sqlite_for_mismatched_cursor(app):
+    """A cursor value of the wrong type for the column is left to SQLite to compare."""
+    client = app.test_client()
+    cursor = encode_cursor('spanish', 'asc', 5, 0)
+    indexed = get_json(client, '/words', sort_by='spanish', cursor=cursor)
+    assert indexed == from_sqlite(app, lambda: get_json(client, '/words', sort_by='spanish', cursor=cursor))
+    assert len(indexed[1]['words']) == 2
+
+
+@pytest.mark.parametrize('app', [{'VOCABULARY_INDEX_MAX_BYTES': 1024}], indirect=True)
+def test_index_over_budget_serves_from_sqlite(app):
+    client = app.test_client()
+    status, data = get_json(client, '/words')
+    assert status == 200
+    assert data['total_words'] == 2
+
+    with app.app_context():
+        assert app.vocabulary.snapshot() is None
+    stats = app.vocabulary.stats()
+    assert stats['over_budget'] == 1
+    assert stats['memory_bytes'] == 0
+
+    lines = client.get('/metrics').get_data(as_text=True).splitlines()
+    assert 'vocabulary_index_over_budget 1' in lines
+    assert 'vocabulary_index_max_bytes 1024' in lines
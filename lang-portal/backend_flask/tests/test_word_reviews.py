@@ -0,0 +1,57 @@
+import json
+
+from tests.conftest import submit_reviews
+
+
+def word_review_counts(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT word_id, correct_count, wrong_count FROM word_reviews ORDER BY word_id')
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def test_every_word_has_a_counter_row(app):
+    """Words get an empty counter row as soon as they are inserted."""
+    assert word_review_counts(app) == [(1, 0, 0), (2, 0, 0)]
+
+
+def test_review_batches_update_counters(client, app):
+    """Each batch is folded into the per-word counters."""
+    submit_reviews(client, [
+        {"word_id": 1, "is_correct": True},
+        {"word_id": 1, "is_correct": True},
+        {"word_id": 2, "is_correct": False},
+    ])
+    submit_reviews(client, [
+        {"word_id": 1, "is_correct": False},
+        {"word_id": 2, "is_correct": False},
+    ])
+
+    assert word_review_counts(app) == [(1, 2, 1), (2, 0, 2)]
+
+    data = json.loads(client.get('/words?sort_by=wrong_count&order=desc').data)
+    assert [word['spanish'] for word in data['words']] == ['ir', 'pagar']
+    assert data['words'][0]['wrong_count'] == 2
+
+
+def test_rebuild_matches_incremental_counters(client, app):
+    """Rebuilding from word_review_items reproduces the maintained counters."""
+    submit_reviews(client, [
+        {"word_id": 1, "is_correct": True},
+        {"word_id": 2, "is_correct": False},
+        {"word_id": 2, "is_correct": True},
+    ])
+    maintained = word_review_counts(app)
+
+    with app.app_context():
+        app.db.rebuild(app.db.cursor(), 'word_reviews')
+
+    assert word_review_counts(app) == maintained
+
+
+def test_reset_clears_counters(client, app):
+    """Clearing the study history also zeroes the counters derived from it."""
+    submit_reviews(client, [{"word_id": 1, "is_correct": True}])
+    client.post('/api/study_sessions/reset')
+
+    assert word_review_counts(app) == [(1, 0, 0), (2, 0, 0)]
@@ -0,0 +1,76 @@
+import json
+
+from lib.search import fts_query
+
+
+def add_word(app, spanish, pronunciation, english):
+    with app.app_context():
+        with app.db.transaction() as cursor:
+            cursor.execute("INSERT INTO words (spanish, pronunciation, english, parts) VALUES (?, ?, ?, '[]')",
+                           (spanish, pronunciation, english))
+            word_id = cursor.lastrowid
+    app.cache.invalidate('words', 'word_reviews')
+    return word_id
+
+
+def search(client, q, **params):
+    response = client.get('/words/search', query_string={'q': q, **params})
+    return response.status_code, json.loads(response.data)
+
+
+def test_fts_query_quotes_terms_and_prefixes_the_last():
+    assert fts_query('to pay') == '"to" "pay"*'
+    assert fts_query('pay ') == '"pay"'
+    assert fts_query('"ir" OR (') == '"ir" "OR"*'
+    assert fts_query('  ') is None
+
+
+def test_search_matches_prefixes_and_folds_accents(client, app):
+    add_word(app, 'niño', 'NEE-nyo', 'boy, child')
+    add_word(app, 'árbol', 'AR-bol', 'tree')
+
+    status, data = search(client, 'nino')
+    assert status == 200
+    assert [word['spanish'] for word in data['words']] == ['niño']
+
+    _, data = search(client, 'arb')
+    assert [word['spanish'] for word in data['words']] == ['árbol']
+
+    _, data = search(client, 'pa')
+    assert [word['spanish'] for word in data['words']] == ['pagar']
+    assert data['words'][0]['correct_count'] == 0
+
+
+def test_search_ranks_closer_matches_first(client, app):
+    add_word(app, 'pagar la cuenta', 'pah-GAR la KWEN-ta', 'to pay the bill, to settle up and go home')
+
+    _, data = search(client, 'pay ')
+    assert [word['spanish'] for word in data['words']] == ['pagar', 'pagar la cuenta']
+
+    _, data = search(client, 'pay', limit=1)
+    assert len(data['words']) == 1
+
+
+def test_search_index_follows_updates_and_deletes(client, app):
+    word_id = add_word(app, 'gato', 'GAH-to', 'cat')
+    with app.app_context():
+        with app.db.transaction() as cursor:
+            cursor.execute("UPDATE words SET english = 'tomcat' WHERE id = ?", (word_id,))
+    app.cache.invalidate('words')
+
+    assert search(client, 'cat ')[1]['words'] == []
+    assert [word['id'] for word in search(client, 'tomcat')[1]['words']] == [word_id]
+
+    with app.app_context():
+        with app.db.transaction() as cursor:
+            cursor.execute("DELETE FROM word_reviews WHERE word_id = ?", (word_id,))
+            cursor.execute("DELETE FROM words WHERE id = ?", (word_id,))
+    app.cache.invalidate('words', 'word_reviews')
+
+    assert search(client, 'tomcat')[1]['words'] == []
+
+
+def test_search_requires_a_term(client):
+    status, data = search(client, '*"')
+    assert status == 400
+    assert 'error' in data